@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import signal
+import sys
+import time
+from roast_controller import RoastController
+from utils.timing import AsyncPeriodicTimer
+from utils.console import post
+from utils.dashboard import CursesDashboard, format_status
+
+class AsyncRoastController(RoastController):
+    """
+    RoastController run as tasks on a single asyncio event loop.
+
+    Sensing, the control step, SSR time-proportioning, the status line and
+    keyboard input are scheduled on one loop instead of separate threads, so
+    controller state is only touched from the loop thread. Keyboard input comes
+    from a reader callback on stdin rather than a polling thread. Blocking
+    shutdown work (flushing the power supply, closing the log) runs in the
+    default executor, and stopping cancels every task.
+    """
+    threaded_sampling = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None
+        self.tasks = []
+        self._stop_requested = None
+        self._tty_settings = None
+
+    def start(self):
+        """Run the roast on a new event loop until it finishes or is stopped"""
+        asyncio.run(self.run())
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._stop_requested = asyncio.Event()
+        self.running = True
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, self.shutdown)
+        self._attach_keyboard()
+        self.start_dashboard()
+
+        # The PWM task goes first so the SSR is driven before the first control step
+        run_pwm = getattr(self.ssr, "run_async", None)
+        if run_pwm:
+            self._spawn(run_pwm(), "ssr-pwm")
+        sampler = self.temp_controller.sampler
+        if sampler:
+            self._spawn(self._sample_task(sampler), "sensor-sampler")
+        if self.dashboard_mode == "line":
+            self._spawn(self._status_line_task(), "dashboard")
+        control = self._spawn(self._control_task(), "control")
+        stop = asyncio.ensure_future(self._stop_requested.wait())
+
+        try:
+            done, _ = await asyncio.wait(self.tasks + [stop], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not stop and not task.cancelled() and task.exception():
+                    post(f"[ERROR] {task.get_name()}: {task.exception()}")
+                elif task is not stop and task is not control:
+                    post(f"[ERROR] {task.get_name()} stopped unexpectedly")
+        finally:
+            stop.cancel()
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
+            self._detach_keyboard()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                self.loop.remove_signal_handler(sig)
+            await self.loop.run_in_executor(None, RoastController.shutdown, self)
+            self.loop = None
+
+    def _spawn(self, coro, name):
+        task = asyncio.ensure_future(coro)
+        task.set_name(name)
+        self.tasks.append(task)
+        return task
+
+    async def _sample_task(self, sampler):
+        timer = AsyncPeriodicTimer(sampler.period)
+        while True:
+            sampler.poll(time.monotonic())
+            await timer.wait()
+
+    async def _fresh_sample(self):
+        """Yield to the sampler task until it has published a sample that is not stale"""
+        temp_controller = self.temp_controller
+        sampler = temp_controller.sampler
+        if not sampler:
+            return
+        deadline = time.monotonic() + temp_controller.stale_after
+        while sampler.latest is None or time.monotonic() - sampler.latest[0] > temp_controller.stale_after:
+            if time.monotonic() > deadline:
+                post(f"[ERROR] Temperature sampler stalled: {sampler.last_error}")
+                raise RuntimeError(f"No temperature sample within {temp_controller.stale_after}s")
+            await asyncio.sleep(sampler.period)
+
+    async def _control_task(self):
+        timer = AsyncPeriodicTimer(self.profile.control_period, self.clock.monotonic)
+
+        if self.profile.preheat:
+            preheat_temp = self.begin_preheat()
+            target_reached = False
+            timer.reset()
+            while self.running and not self.preheat_complete:
+                await self._fresh_sample()
+                if self.preheat_step(preheat_temp) and not target_reached:
+                    self.set_fan_speed(self.profile.preheat_hold_fan_pct)  # Reduce airflow once the target is reached
+                    target_reached = True
+                await timer.wait()
+
+        if not self.running:
+            return
+        self.begin_roast()
+        timer.reset()
+        while self.running:
+            await self._fresh_sample()
+            self.control_step()
+            await timer.wait()
+
+    async def _status_line_task(self, fps=2.0):
+        last = None
+        while True:
+            await asyncio.sleep(1.0 / fps)
+            status = self.status
+            if status is not None and status is not last:
+                post(format_status(status))
+                last = status
+
+    def start_dashboard(self):
+        """The status line is a task on the loop; curses keeps its own thread and hands keys to the loop"""
+        if self.dashboard_mode == "curses":
+            self.dashboard = CursesDashboard(lambda: self.status, on_key=self.submit_key)
+            self.dashboard.start()
+
+    def submit_key(self, key):
+        """Keys from other threads are handled on the loop"""
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.handle_key, key)
+        else:
+            self.handle_key(key)
+
+    def _attach_keyboard(self):
+        if not self.keyboard or self.dashboard_mode == "curses":
+            return
+        fd = sys.stdin.fileno()
+        try:
+            self.loop.add_reader(fd, self._read_keys, fd)
+        except (OSError, ValueError):
+            return  # e.g. stdin redirected from a regular file, which cannot be watched
+        if sys.stdin.isatty():
+            import termios, tty
+            self._tty_settings = termios.tcgetattr(fd)
+            tty.setraw(fd)
+
+    def _detach_keyboard(self):
+        if not self.keyboard or self.dashboard_mode == "curses":
+            return
+        fd = sys.stdin.fileno()
+        self.loop.remove_reader(fd)
+        if self._tty_settings is not None:
+            import termios
+            termios.tcsetattr(fd, termios.TCSADRAIN, self._tty_settings)
+            self._tty_settings = None
+
+    def _read_keys(self, fd):
+        data = os.read(fd, 64)
+        if not data:
+            # stdin closed: stop watching it, and give up during preheat as the threaded runtime does
+            self.loop.remove_reader(fd)
+            if self.profile.preheat and not self.preheat_complete:
+                self.shutdown()
+            return
+        for key in data.decode(errors="ignore"):
+            # A line-buffered (non-tty) stdin delivers ENTER as a newline
+            self.handle_key("\r" if key == "\n" else key)
+
+    def shutdown(self):
+        """Stop the roast; on the loop this cancels the tasks and shutdown completes in run()"""
+        if self.loop is not None and self._stop_requested is not None:
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            if running_loop is self.loop:
+                self._stop_requested.set()
+                return
+        super().shutdown()
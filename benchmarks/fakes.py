@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import os
+import sys
+import tempfile
+import time
+import types
+
+def fake_gpio():
+    """In-memory RPi.GPIO: records the last level per pin"""
+    gpio = types.ModuleType("RPi.GPIO")
+    gpio.BCM, gpio.OUT, gpio.LOW, gpio.HIGH = 11, 0, 0, 1
+    gpio.levels = {}
+    gpio.writes = 0
+
+    def output(pin, level):
+        gpio.levels[pin] = level
+        gpio.writes += 1
+
+    gpio.setmode = lambda mode: None
+    gpio.setwarnings = lambda flag: None
+    gpio.setup = lambda pin, mode, **kwargs: None
+    gpio.output = output
+    gpio.cleanup = lambda *pins: None
+    return gpio
+
+
+class FakeInstrument:
+    """pyvisa resource for an SPD1168X that answers every query instantly"""
+    def __init__(self, address):
+        self.address = address
+        self.write_termination = self.read_termination = None
+        self.commands = 0
+
+    def write(self, command):
+        self.commands += 1
+
+    def query(self, command):
+        if command == "*IDN?":
+            return "Siglent Technologies,SPD1168X"
+        return "0.000"
+
+    def close(self):
+        pass
+
+
+def fake_pyvisa():
+    pyvisa = types.ModuleType("pyvisa")
+
+    class VisaIOError(Exception):
+        pass
+
+    class ResourceManager:
+        def list_resources(self, query="?*::INSTR"):
+            return ("USB0::0xF4EC::0x1410::BENCH::INSTR",)
+
+        def open_resource(self, address):
+            return FakeInstrument(address)
+
+        def close(self):
+            pass
+
+    pyvisa.errors = types.SimpleNamespace(VisaIOError=VisaIOError)
+    pyvisa.ResourceManager = ResourceManager
+    return pyvisa
+
+
+def install():
+    """Put the fake RPi.GPIO and pyvisa in sys.modules (before anything imports the real ones)"""
+    gpio = fake_gpio()
+    rpi = types.ModuleType("RPi")
+    rpi.GPIO = gpio
+    sys.modules["RPi"] = rpi
+    sys.modules["RPi.GPIO"] = gpio
+    sys.modules["pyvisa"] = fake_pyvisa()
+    return gpio
+
+
+class FakeIIODevice:
+    """
+    IIO sysfs temperature attributes in a temporary directory (on tmpfs where
+    available), read through the real SysfsTemperatureSource.
+    """
+    def __init__(self, temp_c=180.0, scale=1.0):
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self.directory = tempfile.mkdtemp(prefix="iio-bench-", dir=base)
+        self.raw_path = os.path.join(self.directory, "in_temp_raw")
+        self.scale_path = os.path.join(self.directory, "in_temp_scale")
+        with open(self.scale_path, "w") as f:
+            f.write(f"{scale}\n")
+        self.set_temperature(temp_c, scale)
+
+    def set_temperature(self, temp_c, scale=1.0):
+        # SysfsTemperatureSource reads raw * scale / 1000 (millidegrees)
+        with open(self.raw_path, "w") as f:
+            f.write(f"{int(temp_c * 1000 / scale)}\n")
+
+    def close(self):
+        for path in (self.raw_path, self.scale_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        os.rmdir(self.directory)
+
+
+class BenchClock:
+    """
+    Controller clock for benchmarks: monotonic() is real, so the profiler and
+    loop timer see true step costs, while sleep() returns at once and moves the
+    roast clock on instead. A paced loop then runs flat out and still sweeps the
+    whole profile.
+    """
+    def __init__(self, epoch=1_700_000_000.0):
+        self.epoch = epoch
+        self.offset = 0.0
+
+    def time(self):
+        return self.epoch + time.monotonic() + self.offset
+
+    def monotonic(self):
+        return time.monotonic() + self.offset
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.offset += seconds
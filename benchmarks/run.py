@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from . import fakes
+
+PROFILE_SIZES = (10, 100, 1000, 10000)
+QUICK_PROFILE_SIZES = (10, 1000)
+ROAST_LENGTH_S = 900.0
+# Allowed slowdown (current / baseline) per metric before --compare reports a regression
+DEFAULT_THRESHOLDS = {"p50_us": 1.5, "p99_us": 3.0, "bytes_per_call": 1.5, "steps_per_s": 1.5}
+# ...and the smallest absolute increase that counts: sub-microsecond calls and tails jitter by
+# more than their ratio between runs, and a few bytes per call are free lists and interned values
+ABSOLUTE_FLOORS = {"p50_us": 0.5, "p99_us": 20.0, "bytes_per_call": 16.0}
+
+def generate_profile_data(points, interpolation="linear"):
+    """An S-shaped roast curve (25°C to 225°C over 15 minutes) sampled at the given number of points"""
+    curve = []
+    for i in range(points):
+        t = ROAST_LENGTH_S * i / (points - 1)
+        x = t / ROAST_LENGTH_S
+        curve.append([round(t, 3), round(25.0 + 200.0 * x * x * (3 - 2 * x), 2)])
+    return {
+        "name": f"Benchmark {points} points",
+        "pwm_period": 0.5,
+        "interpolation": interpolation,
+        "roast_profile": curve,
+        "fan": {"curve": [[0, 100], [ROAST_LENGTH_S / 2, 70], [ROAST_LENGTH_S, 50]], "step_pct": 5},
+    }
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(fn, args, between=None):
+    """
+    Call fn(*a) for each a in args, timing every call with perf_counter_ns.
+    between() runs untimed after each call (e.g. to move the clock on).
+    Returns latency statistics in microseconds.
+    """
+    warmup = min(len(args) // 10, 100)
+    for a in args[:warmup]:
+        fn(*a)
+        if between:
+            between()
+    samples = []
+    record = samples.append
+    clock = time.perf_counter_ns
+    gc.collect()
+    for a in args:
+        started = clock()
+        fn(*a)
+        record(clock() - started)
+        if between:
+            between()
+    samples.sort()
+    return {
+        "calls": len(samples),
+        "mean_us": sum(samples) / len(samples) / 1000,
+        "p50_us": _percentile(samples, 0.50) / 1000,
+        "p99_us": _percentile(samples, 0.99) / 1000,
+        "max_us": samples[-1] / 1000,
+    }
+
+
+def measure_allocations(fn, args, between=None, settle=None):
+    """
+    Memory retained per call and the peak traced while calling fn(*a) for each a in args (tracemalloc).
+    settle runs before the final reading, e.g. to let a writer thread drain what the calls queued.
+    """
+    for a in args[:min(len(args) // 10, 100)]:
+        fn(*a)
+        if between:
+            between()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for a in args:
+            fn(*a)
+            if between:
+                between()
+        if settle:
+            settle()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"bytes_per_call": (after - before) / len(args), "peak_kib": (peak - before) / 1024}
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def median_runs(runs):
+    """Per-metric median over repeated runs of the same benchmark"""
+    return {key: statistics.median([run[key] for run in runs]) for key in runs[0]}
+
+
+def benchmark(results, name, fn, args, between=None, repeats=5, settle=None):
+    stats = median_runs([measure(fn, args, between) for _ in range(repeats)])
+    stats.update(median_runs([measure_allocations(fn, args, between, settle) for _ in range(repeats)]))
+    results[name] = stats
+    print(f"  {name:<50} p50 {stats['p50_us']:8.2f}us  p99 {stats['p99_us']:8.2f}us  "
+          f"{stats['bytes_per_call']:7.1f} B/call")
+
+
+def timer_overhead_ns(calls=100000):
+    """Cost of the timing itself, included in every per-call figure"""
+    clock = time.perf_counter_ns
+    samples = []
+    for _ in range(calls):
+        started = clock()
+        samples.append(clock() - started)
+    samples.sort()
+    return _percentile(samples, 0.5)
+
+
+class Rig:
+    """The real SSR, sensor, fan and logger classes on fake GPIO, IIO sysfs files and pyvisa"""
+    def __init__(self, log_dir):
+        from controller.ssr import SSRController
+        from controller.temperature import TemperatureController
+        from controller.fan import FanController
+        from utils.logging import RoastLogger
+        self.clock = fakes.BenchClock()
+        self.iio = fakes.FakeIIODevice(temp_c=180.0)
+        # Never start()ed: set_duty only stores the duty, so no PWM thread competes with the timed steps
+        self.ssr = SSRController(26, 0.5)
+        self.temp_controller = TemperatureController(self.iio.raw_path, self.iio.scale_path, pwm_period=0.5,
+                                                     time_fn=self.clock.monotonic)
+        self.fan = FanController(resource_address="USB0::0xF4EC::0x1410::BENCH::INSTR")
+        self.logger = RoastLogger(os.path.join(log_dir, "bench-roast.csv"), "Benchmark")
+
+    def controller(self, profile):
+        from roast_controller import RoastController
+        controller = RoastController(profile=profile, ssr=self.ssr, temp_controller=self.temp_controller,
+                                     fan=self.fan, logger=self.logger, clock=self.clock, dashboard=None,
+                                     keyboard=False, watchdog=False)
+        controller.begin_roast()
+        return controller
+
+    def close(self):
+        self.logger.close()
+        self.temp_controller.close()
+        self.fan.shutdown()
+        self.ssr.cleanup()
+        self.iio.close()
+
+
+def sustained_rate(controller, duration):
+    """Paced control loop (control_step + loop_timer.wait) run flat out; restarts the roast at the end of the profile"""
+    end = controller.profile.profile_data[-1][0]
+    steps = 0
+    controller.loop_timer.reset()
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            controller.control_step()
+            controller.loop_timer.wait()
+        steps += 100
+        if controller.clock.time() - controller.roast_start_time > end:
+            controller.begin_roast()
+    elapsed = time.perf_counter() - started
+    return {"steps": steps, "steps_per_s": steps / elapsed, "us_per_step": elapsed / steps * 1e6}
+
+
+def run_benchmarks(sizes, calls, loop_seconds, repeats=5):
+    from profiles.profile_loader import RoastProfile
+    from profiles.trajectory import INTERPOLATIONS
+    from utils.helpers import format_elapsed_time
+    from utils.logging import RoastLogger
+
+    results = {}
+    rng = random.Random(0)
+    log_dir = tempfile.mkdtemp(prefix="aetherroast-bench-")
+    rig = Rig(log_dir)
+    try:
+        elapsed = [(rng.uniform(0, 1200),) for _ in range(calls)]
+        benchmark(results, "format_elapsed_time", format_elapsed_time, elapsed, repeats=repeats)
+
+        benchmark(results, "read_temperature[sysfs]", rig.temp_controller.read_temperature, [()] * calls, repeats=repeats)
+        sampled = fakes.FakeIIODevice(temp_c=180.0)
+        sampling = type(rig.temp_controller)(sampled.raw_path, sampled.scale_path)
+        sampling.start_sampling(sample_rate_hz=20.0)
+        try:
+            benchmark(results, "read_temperature[sampler]", sampling.read_temperature, [()] * calls, repeats=repeats)
+        finally:
+            sampling.close()
+            sampled.close()
+
+        for log_name in ("bench-log.csv", "bench-log.rlog"):
+            logger = RoastLogger(os.path.join(log_dir, log_name), "Benchmark")
+            row = (312.5, "Maillard", 42.0, 188.2, 187.9, 0.21, 60)
+            try:
+                # Retained memory is counted once the writer has caught up, not as whatever backlog it had
+                benchmark(results, f"log_step[{logger.log_format}]", logger.log_step, [row] * calls,
+                          repeats=repeats, settle=lambda: wait_until(logger.records.empty))
+            finally:
+                logger.close()
+
+        for size in sizes:
+            for interpolation in INTERPOLATIONS:
+                profile = RoastProfile.from_data(generate_profile_data(size, interpolation))
+                sweep = [(ROAST_LENGTH_S * i / calls,) for i in range(calls)]
+                shuffled = [(rng.uniform(0, ROAST_LENGTH_S),) for _ in range(calls)]
+                benchmark(results, f"interpolate_setpoint[{interpolation},{size},sweep]",
+                          profile.interpolate_setpoint, sweep, repeats=repeats)
+                benchmark(results, f"interpolate_setpoint[{interpolation},{size},random]",
+                          profile.interpolate_setpoint, shuffled, repeats=repeats)
+
+            controller = rig.controller(RoastProfile.from_data(generate_profile_data(size)))
+            period = controller.profile.control_period
+            benchmark(results, f"control_step[{size}]", controller.control_step, [()] * calls,
+                      between=lambda: rig.clock.sleep(period), repeats=repeats)
+            rate = median_runs([sustained_rate(controller, loop_seconds) for _ in range(repeats)])
+            results[f"control_loop[{size}]"] = rate
+            print(f"  {f'control_loop[{size}]':<50} {rate['steps_per_s']:10.0f} steps/s  "
+                  f"{rate['us_per_step']:8.2f}us/step")
+    finally:
+        rig.close()
+        shutil.rmtree(log_dir, ignore_errors=True)
+    return results
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timer_overhead_ns": timer_overhead_ns(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold=None):
+    """
+    Regressions against a saved baseline, as (benchmark, metric, baseline, current, ratio).
+    Latency and memory regress when they grow past the threshold factor and by
+    more than their absolute floor, loop rate when it falls by the factor. threshold overrides the baseline's latency factors.
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS, **baseline.get("thresholds", {}))
+    floors = dict(ABSOLUTE_FLOORS, **baseline.get("floors", {}))
+    if threshold:
+        thresholds.update(p50_us=threshold, p99_us=threshold, steps_per_s=threshold)
+    regressions = []
+    for name, old in baseline["results"].items():
+        new = results.get(name)
+        if new is None:
+            continue
+        for metric, factor in thresholds.items():
+            if metric not in old or metric not in new:
+                continue
+            if metric == "steps_per_s":
+                ratio = old[metric] / new[metric] if new[metric] else float("inf")
+            else:
+                if new[metric] - max(old[metric], 0.0) <= floors.get(metric, 0.0):
+                    continue
+                ratio = new[metric] / old[metric] if old[metric] > 0 else float("inf")
+            if ratio > factor:
+                regressions.append((name, metric, old[metric], new[metric], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the control loop hot path on fake hardware")
+    parser.add_argument("--quick", action="store_true", help="Fewer calls and profile sizes (smoke test)")
+    parser.add_argument("--calls", type=int, default=None, help="Calls per benchmark (default 20000, quick 2000)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="Profile sizes (points)")
+    parser.add_argument("--loop-seconds", type=float, default=None, help="Duration of each sustained loop run (s)")
+    parser.add_argument("--repeats", type=int, default=None,
+                        help="Runs per benchmark; the median is reported (default 5, quick 3)")
+    parser.add_argument("--save", metavar="FILE", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Allowed latency/rate factor against the baseline (default: the baseline's own)")
+    args = parser.parse_args()
+
+    calls = args.calls or (2000 if args.quick else 20000)
+    sizes = args.sizes or (QUICK_PROFILE_SIZES if args.quick else PROFILE_SIZES)
+    loop_seconds = args.loop_seconds or (0.5 if args.quick else 1.0)
+    repeats = args.repeats or (3 if args.quick else 5)
+
+    fakes.install()
+    from utils.console import console
+    # Keep the controller's own messages (fan changes, connections) out of the report
+    messages = []
+    console.sink = messages.append
+
+    info = machine_info()
+    print(f"[INFO] Python {info['python']} on {info['machine']}, {info['cpus']} CPUs; "
+          f"timer overhead {info['timer_overhead_ns']}ns per call")
+    results = run_benchmarks(sizes, calls, loop_seconds, repeats)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"machine": info, "calls": calls, "repeats": repeats, "thresholds": DEFAULT_THRESHOLDS,
+                       "floors": ABSOLUTE_FLOORS, "results": results}, f, indent=2)
+        print(f"[INFO] Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if baseline.get("machine", {}).get("machine") != info["machine"]:
+            print(f"[WARN] Baseline is from a {baseline['machine'].get('machine')} machine; ratios are indicative only")
+        for name, metric, old, new, ratio in regressions:
+            print(f"[REGRESSION] {name} {metric}: {old:.2f} -> {new:.2f} ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"[INFO] No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
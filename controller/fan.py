@@ -1,45 +1,78 @@
 #!/usr/bin/env python3
-from .spd1168x import SPD1168X
+from .spd1168x import SPD1168X, SCPIWorker
+from utils.console import post
 
 class FanController:
-    def __init__(self, channel=1, voltage=16.0, max_current=1.0):
+    def __init__(self, channel=1, voltage=16.0, max_current=1.0, resource_address=None, serial=None):
         self.channel = channel
         self.voltage = voltage
         self.max_current = max_current
         self.power_supply = None
+        self.worker = None
         self.is_on = False
+        self.speed = None
         
         try:
-            self.power_supply = SPD1168X(max_current=max_current)
-            if self.power_supply.is_connected():
-                self.power_supply.set_output(channel, voltage, current_pct=0)
-                print(f"[INFO] Fan controller initialized on channel {channel}")
+            self.power_supply = SPD1168X(resource_address, max_current=max_current, serial=serial)
+            # SCPI writes run on the worker thread so callers never wait on USB; a supply that
+            # is not reachable yet is retried in the background and gets the queued settings
+            self.worker = SCPIWorker(self.power_supply)
+            self.worker.start()
+            self.worker.submit_output(channel, voltage, current_pct=0)
+            if self.worker.connected:
+                post(f"[INFO] Fan controller initialized on channel {channel}")
+            else:
+                post(f"[WARN] Power supply not reachable; fan channel {channel} will be set up when it connects")
         except Exception as e:
-            print(f"[WARN] Fan controller not available: {e}")
+            post(f"[WARN] Fan controller not available: {e}")
             self.power_supply = None
     
+    def available(self):
+        """True when fan requests are accepted; while the supply is (re)connecting they are replayed once it is up"""
+        return self.worker is not None
+
+    def connected(self):
+        return self.worker is not None and self.worker.connected
+
     def set_speed(self, percentage):
-        """Set fan speed as percentage (0-100)"""
-        if not self.power_supply or not self.power_supply.is_connected():
-            print(f"[WARN] Fan control unavailable - requested {percentage}%")
+        """Set fan speed as percentage (0-100); returns without waiting for the power supply"""
+        if not self.available():
+            post(f"[WARN] Fan control unavailable - requested {percentage}%")
             return
+        if percentage == self.speed and self.is_on:
+            return  # already requested; nothing to send
             
-        try:
-            self.power_supply.set_output(self.channel, self.voltage, current_pct=percentage)
-            if not self.is_on:
-                self.power_supply.output_on(self.channel)
-                self.is_on = True
-            print(f"[INFO] Fan speed set to {percentage}%")
-        except Exception as e:
-            print(f"[ERROR] Fan/Power supply control failed: {e}")
-            self.power_supply = None  # Mark as disconnected
+        self.worker.submit_output(self.channel, self.voltage, current_pct=percentage)
+        self.speed = percentage
+        if not self.is_on:
+            self.worker.submit_state(self.channel, True)
+            self.is_on = True
+        if self.worker.connected:
+            post(f"[INFO] Fan speed set to {percentage}%")
+        else:
+            post(f"[WARN] Fan speed {percentage}% queued until the power supply reconnects")
     
+    def applied_current(self):
+        """Last current setting read back from the power supply (A), if any"""
+        if not self.worker:
+            return None
+        return self.worker.readback.get(self.channel)
+
+    def measured_current(self):
+        """Output current from the latest health probe (A), if any"""
+        if not self.worker:
+            return None
+        return self.worker.measured.get(self.channel)
+
     def shutdown(self):
         """Turn off fan and close connection"""
         try:
+            if self.worker:
+                self.worker.submit_state(self.channel, False)
+                self.worker.stop()
+                self.worker = None
             if self.power_supply and self.power_supply.is_connected():
-                self.power_supply.output_off(self.channel)
                 self.power_supply.close()
-                print("[INFO] Fan controller shut down")
+                post("[INFO] Fan controller shut down")
         except Exception as e:
-            print(f"[WARN] Fan shutdown failed: {e}")
\ No newline at end of file
+            post(f"[WARN] Fan shutdown failed: {e}")
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+import os
+import select
+import time
+from utils.ring import SampleRing
+
+IIO_DEVICE_DIR = "/sys/bus/iio/devices/iio:device0"
+IIO_DEVICE_NODE = "/dev/iio:device0"
+
+def _read_attr(path, default=None):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        if default is None:
+            raise
+        return default
+
+def _write_attr(path, value):
+    with open(path, "w") as f:
+        f.write(str(value))
+
+
+class SysfsTemperatureSource:
+    """Polls the IIO temperature channel through a persistent sysfs file descriptor"""
+    def __init__(self, raw_path=f"{IIO_DEVICE_DIR}/in_temp_raw", scale_path=f"{IIO_DEVICE_DIR}/in_temp_scale"):
+        self.raw_path = raw_path
+        self.scale_path = scale_path
+        self.scale = None
+        self.fd = None
+
+    def open(self):
+        # The scale is fixed for the channel, so it is only parsed once
+        if self.scale is None:
+            self.scale = float(_read_attr(self.scale_path))
+        if self.fd is None:
+            self.fd = os.open(self.raw_path, os.O_RDONLY)
+
+    def reopen(self):
+        self.close()
+        self.open()
+
+    def read(self):
+        """Read temperature in °C"""
+        if self.fd is None:
+            self.open()
+        # sysfs regenerates the attribute on every read from offset 0
+        raw = int(os.pread(self.fd, 32, 0))
+        return raw * self.scale / 1000.0
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class ScanChannel:
+    """Layout of one enabled channel inside an IIO buffer scan"""
+    def __init__(self, name, index, type_spec):
+        self.name = name
+        self.index = index
+        # Format: [be|le]:[s|u]bits/storagebits[Xrepeat]>>shift
+        endian, rest = type_spec.split(":")
+        self.byteorder = "big" if endian == "be" else "little"
+        self.signed = rest[0] == "s"
+        bits, rest = rest[1:].split("/")
+        storage, shift = rest.split(">>")
+        self.realbits = int(bits)
+        self.storagebytes = int(storage.split("X")[0]) // 8
+        self.shift = int(shift)
+        self.offset = 0
+
+    def decode(self, record):
+        value = int.from_bytes(record[self.offset:self.offset + self.storagebytes], self.byteorder)
+        value = (value >> self.shift) & ((1 << self.realbits) - 1)
+        if self.signed and value & (1 << (self.realbits - 1)):
+            value -= 1 << self.realbits
+        return value
+
+
+class IIOBufferedTemperatureSource:
+    """
+    Streams temperature samples in bulk from the IIO triggered buffer.
+
+    The kernel fills the buffer at the trigger rate; read() drains everything
+    available into an array-backed ring and returns the newest sample, so the
+    caller pays one syscall per control step regardless of sample rate. A
+    buffer that stops delivering raises instead of repeating the last sample.
+    """
+    def __init__(self, device_dir=IIO_DEVICE_DIR, device_node=IIO_DEVICE_NODE, channel="in_temp",
+                 trigger=None, buffer_length=128, ring_size=1024, timeout=1.0, stale_after=1.0):
+        self.device_dir = device_dir
+        self.device_node = device_node
+        self.channel_name = channel
+        self.trigger = trigger
+        self.buffer_length = buffer_length
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.ring = SampleRing(ring_size)
+        self.last_sample_time = None
+        self.scale = None
+        self.offset = 0.0
+        self.channel = None
+        self.record_size = 0
+        self.partial = b""
+        self.fd = None
+
+    def _scan_layout(self):
+        scan_dir = os.path.join(self.device_dir, "scan_elements")
+        _write_attr(os.path.join(scan_dir, f"{self.channel_name}_en"), 1)
+
+        channels = []
+        for entry in os.listdir(scan_dir):
+            if not entry.endswith("_en") or _read_attr(os.path.join(scan_dir, entry)) != "1":
+                continue
+            name = entry[:-3]
+            index = int(_read_attr(os.path.join(scan_dir, f"{name}_index")))
+            type_spec = _read_attr(os.path.join(scan_dir, f"{name}_type"))
+            channels.append(ScanChannel(name, index, type_spec))
+        channels.sort(key=lambda c: c.index)
+
+        # Each element is naturally aligned; the scan is padded to its largest element
+        offset = 0
+        largest = 1
+        for channel in channels:
+            size = channel.storagebytes
+            offset = (offset + size - 1) // size * size
+            channel.offset = offset
+            offset += size
+            largest = max(largest, size)
+            if channel.name == self.channel_name:
+                self.channel = channel
+        self.record_size = (offset + largest - 1) // largest * largest
+
+    def open(self):
+        self.scale = float(_read_attr(os.path.join(self.device_dir, f"{self.channel_name}_scale")))
+        self.offset = float(_read_attr(os.path.join(self.device_dir, f"{self.channel_name}_offset"), "0"))
+
+        buffer_dir = os.path.join(self.device_dir, "buffer")
+        _write_attr(os.path.join(buffer_dir, "enable"), 0)
+        if self.trigger:
+            _write_attr(os.path.join(self.device_dir, "trigger", "current_trigger"), self.trigger)
+        self._scan_layout()
+        _write_attr(os.path.join(buffer_dir, "length"), self.buffer_length)
+        _write_attr(os.path.join(buffer_dir, "enable"), 1)
+
+        self.fd = os.open(self.device_node, os.O_RDONLY | os.O_NONBLOCK)
+
+    def reopen(self):
+        self.close()
+        self.open()
+
+    def poll(self):
+        """Drain all buffered scans into the ring; returns the number of new samples"""
+        if self.fd is None:
+            self.open()
+        try:
+            data = os.read(self.fd, self.record_size * self.buffer_length)
+        except BlockingIOError:
+            return 0
+
+        data = self.partial + data
+        usable = len(data) - len(data) % self.record_size
+        self.partial = data[usable:]
+        scale = self.scale / 1000.0
+        count = 0
+        for start in range(0, usable, self.record_size):
+            raw = self.channel.decode(data[start:start + self.record_size])
+            self.ring.append((raw + self.offset) * scale)
+            count += 1
+        if count:
+            self.last_sample_time = time.monotonic()
+        return count
+
+    def read(self):
+        """Read the newest temperature in °C, waiting for the first sample if needed"""
+        self.poll()
+        if not len(self.ring):
+            ready, _, _ = select.select([self.fd], [], [], self.timeout)
+            if not ready or not self.poll():
+                raise TimeoutError(f"No samples from {self.device_node}")
+        age = time.monotonic() - self.last_sample_time
+        if age > self.stale_after:
+            # A stalled trigger must not leave the PID running on a frozen reading
+            raise TimeoutError(f"No new samples from {self.device_node} for {age:.1f}s")
+        return self.ring.latest()
+
+    def samples(self, n=None):
+        """Most recent buffered samples, oldest first"""
+        return self.ring.last(n)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            self.partial = b""
+            try:
+                _write_attr(os.path.join(self.device_dir, "buffer", "enable"), 0)
+            except OSError:
+                pass
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import time
+import threading
+from collections import deque
+
+class MedianFilter:
+    """Sliding-window median, rejects single-sample spikes"""
+    def __init__(self, window=5):
+        self.samples = deque(maxlen=window)
+
+    def update(self, value):
+        self.samples.append(value)
+        ordered = sorted(self.samples)
+        return ordered[len(ordered) // 2]
+
+
+class EMAFilter:
+    """Exponential moving average"""
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class KalmanFilter1D:
+    """Scalar Kalman filter with a random-walk temperature model"""
+    def __init__(self, process_var=0.05, measurement_var=0.5):
+        self.process_var = process_var
+        self.measurement_var = measurement_var
+        self.estimate = None
+        self.error_var = 1.0
+
+    def update(self, value):
+        if self.estimate is None:
+            self.estimate = value
+            self.error_var = self.measurement_var
+            return self.estimate
+        self.error_var += self.process_var
+        gain = self.error_var / (self.error_var + self.measurement_var)
+        self.estimate += gain * (value - self.estimate)
+        self.error_var *= (1.0 - gain)
+        return self.estimate
+
+
+FILTER_TYPES = {
+    "median": MedianFilter,
+    "ema": EMAFilter,
+    "kalman": KalmanFilter1D,
+}
+
+
+class FilterChain:
+    """Applies filters in order to each sample"""
+    def __init__(self, filters=None):
+        self.filters = filters or []
+
+    def update(self, value):
+        for f in self.filters:
+            value = f.update(value)
+        return value
+
+
+def build_filter_chain(specs):
+    """Build a FilterChain from profile JSON, e.g. [{"type": "median", "window": 5}, {"type": "ema", "alpha": 0.3}]"""
+    filters = []
+    for spec in specs or []:
+        params = dict(spec)
+        kind = params.pop("type")
+        if kind not in FILTER_TYPES:
+            raise ValueError(f"Unknown filter type '{kind}' (expected one of {', '.join(FILTER_TYPES)})")
+        filters.append(FILTER_TYPES[kind](**params))
+    return FilterChain(filters)
+
+
+class RateOfRise:
+    """Least-squares slope over a sliding time window, O(1) per sample via running sums"""
+    def __init__(self, window_s=15.0):
+        self.window_s = window_s
+        self.samples = deque()
+        self.t0 = None
+        self.sum_t = self.sum_x = self.sum_tt = self.sum_tx = 0.0
+
+    def update(self, t, value):
+        """Add a sample; returns the rate of rise in °C/min (None until two samples)"""
+        if self.t0 is None:
+            self.t0 = t
+        t -= self.t0
+        self.samples.append((t, value))
+        self.sum_t += t
+        self.sum_x += value
+        self.sum_tt += t * t
+        self.sum_tx += t * value
+
+        while self.samples and t - self.samples[0][0] > self.window_s:
+            old_t, old_x = self.samples.popleft()
+            self.sum_t -= old_t
+            self.sum_x -= old_x
+            self.sum_tt -= old_t * old_t
+            self.sum_tx -= old_t * old_x
+
+        n = len(self.samples)
+        denominator = n * self.sum_tt - self.sum_t * self.sum_t
+        if n < 2 or denominator <= 0:
+            return None
+        return (n * self.sum_tx - self.sum_t * self.sum_x) / denominator * 60.0
+
+
+class SensorSampler:
+    """
+    Samples the temperature source on its own thread, faster than the control rate.
+
+    Each sample is filtered and the newest (timestamp, filtered, rate_of_rise, raw)
+    tuple is published by a single attribute assignment, so readers never take a lock.
+    """
+    def __init__(self, source, sample_rate_hz=20.0, filters=None, ror_window_s=15.0):
+        self.source = source
+        self.period = 1.0 / sample_rate_hz
+        self.chain = filters if isinstance(filters, FilterChain) else build_filter_chain(filters)
+        self.ror = RateOfRise(ror_window_s)
+        self.latest = None
+        self.samples = 0
+        self.errors = 0
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="sensor-sampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def sample(self, now):
+        """Take and publish one sample"""
+        raw = self.source.read()
+        filtered = self.chain.update(raw)
+        ror = self.ror.update(now, filtered)
+        self.latest = (now, filtered, ror, raw)
+        self.samples += 1
+
+    def poll(self, now):
+        """Take one sample; a failed read is counted and the source reopened for the next one"""
+        try:
+            self.sample(now)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            try:
+                self.source.reopen()
+            except Exception:
+                pass
+
+    def _run(self):
+        next_deadline = time.monotonic()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            self.poll(now)
+
+            next_deadline += self.period
+            if next_deadline < now:
+                next_deadline = now + self.period
+            self._stop_event.wait(max(0.0, next_deadline - time.monotonic()))
@@ -1,45 +1,132 @@
+import json
+import os
 import time
-import pyvisa
+import threading
+from utils.console import post
+
+# Resource address each power supply (by serial number) was last reached at
+ADDRESS_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "aetherroast", "visa_addresses.json")
+
+def read_address_cache(path=ADDRESS_CACHE):
+    """{"last": serial, "devices": {serial: address}}; empty if missing or unreadable"""
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+        return cache if isinstance(cache.get("devices"), dict) else {"devices": {}}
+    except (OSError, ValueError, AttributeError):
+        return {"devices": {}}
+
+
+def write_address_cache(serial, address, path=ADDRESS_CACHE):
+    cache = read_address_cache(path)
+    if cache.get("last") == serial and cache["devices"].get(serial) == address:
+        return
+    cache["last"] = serial
+    cache["devices"][serial] = address
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        post(f"[WARN] Could not cache power supply address: {e}")
+
 
 class SPD1168X:
     """
     A Python class for controlling the Siglent SPD1168X power supply via USB.
     Supports controlling current as an absolute value or percentage of max_current.
     """
-    def __init__(self, resource_address=None, max_current=1.0):
+    def __init__(self, resource_address=None, max_current=1.0, command_gap=0.1, serial=None,
+                 address_cache=ADDRESS_CACHE):
         """
         Initializes the power supply object.
 
         Args:
             resource_address (str, optional): The specific VISA resource address.
-                                              If None, it will attempt to find a USB instrument automatically.
+                                              If None, the cached address is tried first, then USB instruments are scanned.
             max_current (float, optional): Maximum current allowed for percentage control (A). Default 1.0A.
+            command_gap (float, optional): Settle time after each SCPI write or batch of writes (s). Default 0.1s.
+            serial (str, optional): Serial number of the supply to use when several are attached.
+            address_cache (str, optional): File remembering the address per serial; None disables caching.
         """
+        import pyvisa
         self.rm = pyvisa.ResourceManager()
         self.power_supply = None
         self.resource_address = resource_address
         self.max_current = max_current
+        self.command_gap = command_gap
+        self.serial = serial
+        self.address_cache = address_cache
+        self.identity = None
 
         try:
-            if not self.resource_address:
-                usb_resources = self.rm.list_resources("USB?*INSTR")
-                if not usb_resources:
-                    raise pyvisa.errors.VisaIOError("No USB instruments found.")
-                self.resource_address = usb_resources[0]
-
-            self.power_supply = self.rm.open_resource(self.resource_address)
-            self.power_supply.write_termination = '\n'
-            self.power_supply.read_termination = '\n'
-            print(f"Connected to: {self.idn().strip()}")
+            if self.resource_address:
+                self._open(self.resource_address)
+            else:
+                # Opening a known address directly skips the USB enumeration, the slow part of startup
+                cached = self._cached_address()
+                if cached:
+                    try:
+                        self._open(cached)
+                    except Exception as e:
+                        post(f"[INFO] Cached power supply address {cached} failed ({e}); rescanning")
+                        self._close_handle()
+                if not self.power_supply:
+                    self._open(self._scan(pyvisa))
+            post(f"Connected to: {self.identity}")
+            if self.address_cache and self.serial:
+                write_address_cache(self.serial, self.resource_address, self.address_cache)
 
         except (pyvisa.errors.VisaIOError, Exception) as e:
-            print(f"Failed to connect to the instrument: {e}")
-            self.power_supply = None
+            post(f"Failed to connect to the instrument: {e}")
+            self._close_handle()
             if hasattr(self, 'rm'):
                 try:
                     self.rm.close()
                 except:
                     pass
+            self.rm = None  # reconnect() opens a new one
+
+    def _cached_address(self):
+        if not self.address_cache:
+            return None
+        cache = read_address_cache(self.address_cache)
+        return cache["devices"].get(self.serial or cache.get("last"))
+
+    def _scan(self, pyvisa):
+        usb_resources = self.rm.list_resources("USB?*INSTR")
+        if not usb_resources:
+            raise pyvisa.errors.VisaIOError("No USB instruments found.")
+        if self.serial:
+            # USB resource names carry the serial number: USB0::<vendor>::<product>::<serial>::INSTR
+            matching = [address for address in usb_resources if self.serial in address]
+            if matching:
+                return matching[0]
+        return usb_resources[0]
+
+    def _open(self, address):
+        """Open a resource and check it is the expected supply; sets serial from *IDN? when unknown"""
+        self.power_supply = self.rm.open_resource(address)
+        self.power_supply.write_termination = '\n'
+        self.power_supply.read_termination = '\n'
+        self.identity = self.idn().strip()
+        # *IDN? answers "<maker>,<model>,<serial>,<firmware>,<hardware>"
+        fields = [field.strip() for field in self.identity.split(",")]
+        device_serial = fields[2] if len(fields) > 2 else None
+        if self.serial and device_serial and device_serial != self.serial:
+            raise ValueError(f"{address} is {device_serial}, expected {self.serial}")
+        self.serial = self.serial or device_serial
+        self.resource_address = address
+
+    def _close_handle(self):
+        if self.power_supply:
+            try:
+                self.power_supply.close()
+            except Exception:
+                pass
+        self.power_supply = None
 
     def __enter__(self):
         return self
@@ -56,6 +143,29 @@ class SPD1168X:
             return "Not Connected"
         return self.power_supply.query('*IDN?')
 
+    def current_for(self, current=None, current_pct=None):
+        """Resolve an absolute current (A) from either amps or a percentage of max_current"""
+        if current_pct is not None:
+            current = (current_pct / 100.0) * self.max_current
+        if current is None:
+            current = self.max_current  # default to max if nothing provided
+        return current
+
+    def write_batch(self, commands):
+        """
+        Writes a sequence of SCPI commands back-to-back with no queries in between,
+        then waits command_gap once for the supply to settle before the next query.
+
+        Args:
+            commands (list[str]): Commands to send in order
+        """
+        if not self.is_connected():
+            return
+        for command in commands:
+            self.power_supply.write(command)
+        if commands:
+            time.sleep(self.command_gap)
+
     def set_output(self, channel, voltage, current=None, current_pct=None):
         """
         Sets voltage and current. Either provide 'current' in Amps or 'current_pct' 0-100% of max_current.
@@ -69,31 +179,22 @@ class SPD1168X:
         if not self.is_connected():
             return
 
-        if current_pct is not None:
-            current = (current_pct / 100.0) * self.max_current
-
-        if current is None:
-            current = self.max_current  # default to max if nothing provided
+        current = self.current_for(current, current_pct)
 
-        print(f"Setting Channel {channel}: {voltage}V, {current:.3f}A ({current_pct if current_pct else 100}%)")
-        self.power_supply.write(f'CH{channel}:VOLT {voltage}')
-        time.sleep(0.1)
-        self.power_supply.write(f'CH{channel}:CURR {current}')
-        time.sleep(0.1)
+        post(f"Setting Channel {channel}: {voltage}V, {current:.3f}A ({current_pct if current_pct else 100}%)")
+        self.write_batch([f'CH{channel}:VOLT {voltage}', f'CH{channel}:CURR {current}'])
 
     def output_on(self, channel):
         if not self.is_connected():
             return
-        print(f"Turning ON Channel {channel}...")
-        self.power_supply.write(f'OUTP CH{channel},ON')
-        time.sleep(0.1)
+        post(f"Turning ON Channel {channel}...")
+        self.write_batch([f'OUTP CH{channel},ON'])
 
     def output_off(self, channel):
         if not self.is_connected():
             return
-        print(f"Turning OFF Channel {channel}...")
-        self.power_supply.write(f'OUTP CH{channel},OFF')
-        time.sleep(0.1)
+        post(f"Turning OFF Channel {channel}...")
+        self.write_batch([f'OUTP CH{channel},OFF'])
 
     def measure_voltage(self, channel):
         if not self.is_connected():
@@ -105,9 +206,254 @@ class SPD1168X:
             return None
         return float(self.power_supply.query(f'MEASure:CURRent? CH{channel}'))
 
+    def query_current_setting(self, channel):
+        if not self.is_connected():
+            return None
+        return float(self.power_supply.query(f'CH{channel}:CURRent?'))
+
+    def reconnect(self):
+        """Reopen the connection: the known address first, then a USB rescan. Raises if the supply is unreachable."""
+        import pyvisa
+        self._close_handle()
+        if self.rm is None:
+            self.rm = pyvisa.ResourceManager()
+        try:
+            self._open(self.resource_address or self._cached_address())
+        except Exception:
+            self._close_handle()
+            self._open(self._scan(pyvisa))
+        if self.address_cache and self.serial:
+            write_address_cache(self.serial, self.resource_address, self.address_cache)
+
     def close(self):
         if self.power_supply:
             self.power_supply.close()
-            print("Connection closed.")
+            post("Connection closed.")
             self.power_supply = None
 
+
+class SCPIWorker:
+    """
+    Background command queue and connection manager for an SPD1168X.
+
+    Callers submit the desired state and return immediately. Pending values are
+    keyed by (channel, setting) so only the latest request is sent, commands that
+    would not change the applied state are dropped, and the applied current is
+    read back on its own schedule. The connection's health is probed with a cheap
+    MEASure:CURRent? query; when a write or probe fails the worker reconnects in
+    the background with exponential backoff and then replays the last requested
+    state. Callers are never blocked by any of this.
+    """
+    # Order commands are sent within a batch
+    _ORDER = {"VOLT": 0, "CURR": 1, "OUTP": 2}
+
+    def __init__(self, power_supply, readback_interval=2.0, probe_interval=1.0,
+                 backoff_initial=0.5, backoff_max=30.0):
+        """
+        Args:
+            power_supply (SPD1168X): Power supply; if it is not connected yet the worker starts out reconnecting
+            readback_interval (float, optional): Seconds between applied-current readbacks. 0 disables.
+            probe_interval (float, optional): Seconds between health probes. 0 disables.
+            backoff_initial (float, optional): Delay before the first reconnect attempt (s)
+            backoff_max (float, optional): Longest delay between reconnect attempts (s)
+        """
+        self.power_supply = power_supply
+        self.readback_interval = readback_interval
+        self.probe_interval = probe_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.pending = {}
+        self.applied = {}
+        self.requested = {}  # latest value per (channel, setting), replayed after a reconnect
+        self.readback = {}
+        self.measured = {}
+        self.connected = power_supply.is_connected()
+        self.last_error = None
+
+        self.commands_sent = 0
+        self.commands_skipped = 0
+        self.requests_coalesced = 0
+        self.disconnects = 0
+        self.reconnects = 0
+        self.probe_failures = 0
+
+        self._backoff = backoff_initial
+        # A supply that was not there at startup (e.g. unplugged at boot) is brought up by the backoff loop
+        self._next_attempt = None if self.connected else time.monotonic() + backoff_initial
+        self._cond = threading.Condition()
+        self._busy = False
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="scpi-worker")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _submit(self, channel, setting, value):
+        with self._cond:
+            key = (channel, setting)
+            if key in self.pending:
+                self.requests_coalesced += 1
+            self.pending[key] = value
+            self.requested[key] = value
+            self._cond.notify_all()
+
+    def submit_output(self, channel, voltage, current=None, current_pct=None):
+        """Queue a voltage/current setting; never blocks on the instrument"""
+        current = self.power_supply.current_for(current, current_pct)
+        self._submit(channel, "VOLT", voltage)
+        self._submit(channel, "CURR", round(current, 4))
+
+    def submit_state(self, channel, on):
+        """Queue an output on/off change"""
+        self._submit(channel, "OUTP", "ON" if on else "OFF")
+
+    def _build_commands(self, batch):
+        commands = []
+        for key in sorted(batch, key=lambda k: (k[0], self._ORDER[k[1]])):
+            value = batch[key]
+            if self.applied.get(key) == value:
+                self.commands_skipped += 1
+                continue
+            channel, setting = key
+            if setting == "OUTP":
+                commands.append((key, value, f'OUTP CH{channel},{value}'))
+            else:
+                commands.append((key, value, f'CH{channel}:{setting} {value}'))
+        return commands
+
+    def _send(self, batch):
+        commands = self._build_commands(batch)
+        if not commands:
+            return
+        try:
+            self.power_supply.write_batch([command for _, _, command in commands])
+        except Exception as e:
+            self._lost(e, "command batch failed")
+            return
+        for key, value, _ in commands:
+            self.applied[key] = value
+        self.commands_sent += len(commands)
+
+    def _channels(self):
+        # requested is updated by submitting threads
+        with self._cond:
+            return sorted({channel for channel, _ in self.requested})
+
+    def _probe(self):
+        """Cheap health check: measure the output current of every channel in use"""
+        for channel in self._channels():
+            try:
+                self.measured[channel] = self.power_supply.measure_current(channel)
+            except Exception as e:
+                self.probe_failures += 1
+                self._lost(e, "health probe failed")
+                return
+
+    def _read_back(self):
+        channels = {channel for channel, setting in self.applied if setting == "CURR"}
+        for channel in channels:
+            try:
+                self.readback[channel] = self.power_supply.query_current_setting(channel)
+            except Exception as e:
+                self.last_error = e
+
+    def _lost(self, error, what):
+        """Mark the connection down; the worker thread reconnects with backoff"""
+        self.last_error = error
+        self.connected = False
+        self.disconnects += 1
+        self._backoff = self.backoff_initial
+        self._next_attempt = time.monotonic() + self._backoff
+        post(f"[ERROR] Power supply {what}: {error}; reconnecting in the background")
+
+    def _reconnect(self):
+        try:
+            self.power_supply.reconnect()
+        except Exception as e:
+            self.last_error = e
+            self._backoff = min(self._backoff * 2.0, self.backoff_max)
+            self._next_attempt = time.monotonic() + self._backoff
+            post(f"[WARN] Power supply reconnect failed: {e}; retrying in {self._backoff:.1f}s")
+            return
+        self.reconnects += 1
+        with self._cond:
+            # The supply's state is unknown after a reconnect: resend everything last requested
+            self.applied.clear()
+            self.pending = dict(self.requested)
+            restoring = len(self.pending)
+            self.connected = True
+        post(f"[INFO] Power supply reconnected; restoring {restoring} settings")
+
+    def _next_deadline(self, next_probe, next_readback):
+        if not self.connected:
+            return self._next_attempt
+        deadlines = [t for t, interval in ((next_probe, self.probe_interval), (next_readback, self.readback_interval))
+                     if interval > 0]
+        return min(deadlines) if deadlines else None
+
+    def _run(self):
+        next_probe = time.monotonic() + self.probe_interval
+        next_readback = time.monotonic() + self.readback_interval
+        while True:
+            with self._cond:
+                while self._running and not (self.connected and self.pending):
+                    deadline = self._next_deadline(next_probe, next_readback)
+                    if deadline is None:
+                        self._cond.wait()
+                        continue
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if not self._running and not (self.connected and self.pending):
+                    break
+                batch = {}
+                if self.connected:
+                    batch = self.pending
+                    self.pending = {}
+                self._busy = True
+
+            if not self.connected:
+                if time.monotonic() >= self._next_attempt:
+                    self._reconnect()
+            elif batch:
+                self._send(batch)
+
+            now = time.monotonic()
+            if self.probe_interval > 0 and now >= next_probe:
+                if self.connected:
+                    self._probe()
+                next_probe = time.monotonic() + self.probe_interval
+            if self.readback_interval > 0 and now >= next_readback:
+                if self.connected:
+                    self._read_back()
+                next_readback = time.monotonic() + self.readback_interval
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def flush(self, timeout=2.0):
+        """Wait until all pending commands have been sent; False if that did not happen in time"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.pending or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running or not self.connected:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=2.0):
+        """Send anything still pending (if connected), then stop the worker thread"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._thread = None
@@ -1,35 +1,232 @@
 #!/usr/bin/env python3
 import time
-import RPi.GPIO as GPIO
+import threading
+from utils.console import post
+
+class PigpioOutput:
+    """Hardware-timed SSR output using pigpio DMA waveforms"""
+    def __init__(self, ssr_pin):
+        import pigpio
+        self.pigpio = pigpio
+        self.ssr_pin = ssr_pin
+        self.pi = pigpio.pi()
+        if not self.pi.connected:
+            raise RuntimeError("pigpio daemon not running")
+        self.pi.set_mode(ssr_pin, pigpio.OUTPUT)
+        self.pi.write(ssr_pin, 0)
+        self.on_time = None
+        self.wave_id = None
+        self.previous_wave_id = None
+
+    def apply(self, on_time, pwm_period):
+        """Switch to a repeating waveform for the given duty (takes effect at the next window)"""
+        if on_time == self.on_time:
+            return
+        mask = 1 << self.ssr_pin
+        on_us = int(on_time * 1e6)
+        off_us = int((pwm_period - on_time) * 1e6)
+        pulses = []
+        if on_us > 0:
+            pulses.append(self.pigpio.pulse(mask, 0, on_us))
+        if off_us > 0:
+            pulses.append(self.pigpio.pulse(0, mask, off_us))
+
+        self.pi.wave_add_new()
+        self.pi.wave_add_generic(pulses)
+        wave_id = self.pi.wave_create()
+        self.pi.wave_send_using_mode(wave_id, self.pigpio.WAVE_MODE_REPEAT_SYNC)
+
+        # The wave before the current one has finished at least one full window by now
+        if self.previous_wave_id is not None:
+            self.pi.wave_delete(self.previous_wave_id)
+        self.previous_wave_id = self.wave_id
+        self.wave_id = wave_id
+        self.on_time = on_time
+
+    def off(self):
+        self.pi.wave_tx_stop()
+        self.pi.write(self.ssr_pin, 0)
+        self.on_time = None
+
+    def cleanup(self):
+        self.off()
+        # Only this output's waveforms; wave_clear() would also drop other pins' waves on the same daemon
+        for wave_id in (self.previous_wave_id, self.wave_id):
+            if wave_id is not None:
+                self.pi.wave_delete(wave_id)
+        self.previous_wave_id = self.wave_id = None
+        self.pi.stop()
+
 
 class SSRController:
-    def __init__(self, ssr_pin=26, pwm_period=0.5):
+    def __init__(self, ssr_pin=26, pwm_period=0.5, backend="gpio"):
         self.ssr_pin = ssr_pin
         self.pwm_period = pwm_period
-        
-        # GPIO setup
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.ssr_pin, GPIO.OUT)
-        GPIO.output(self.ssr_pin, GPIO.LOW)
-    
-    def control_output(self, on_time):
-        """Control SSR with PWM-like behavior"""
+        self.backend = backend
+        self.on_time = 0.0
+        self.level = None
+        self.hardware = None
+        self.gpio = None
+
+        # Per-cycle timing statistics (seconds)
+        self.cycles = 0
+        self.missed_cycles = 0
+        self.last_cycle_error = 0.0
+        self.max_cycle_error = 0.0
+        self.total_cycle_error = 0.0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Optional callable; while it returns true every window is OFF (e.g. a tripped watchdog)
+        self.interlock = None
+        # Latched by turn_off()/stop(): a step still finishing on another thread cannot switch the heater back on
+        self.stopped = False
+
+        if backend == "pigpio":
+            self.hardware = PigpioOutput(ssr_pin)
+        else:
+            # GPIO setup (imported here so the module loads without RPi.GPIO, e.g. in simulation)
+            import RPi.GPIO as GPIO
+            self.gpio = GPIO
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setup(self.ssr_pin, GPIO.OUT)
+            self._set_level(GPIO.LOW)
+
+    def _set_level(self, level):
+        if level != self.level:
+            self.gpio.output(self.ssr_pin, level)
+            self.level = level
+
+    def _sleep_until(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            self._stop_event.wait(remaining)
+
+    def _record_cycle(self, error):
+        self.cycles += 1
+        self.last_cycle_error = error
+        self.total_cycle_error += error
+        if error > self.max_cycle_error:
+            self.max_cycle_error = error
+
+    def _begin_cycle(self, cycle_start, now):
+        """Account for the wakeup error of a window; returns the (possibly resynced) start and its ON time"""
+        error = now - cycle_start
+        if error >= self.pwm_period:
+            # Fell behind by whole windows: resync instead of bursting
+            skipped = int(error // self.pwm_period)
+            self.missed_cycles += skipped
+            cycle_start += skipped * self.pwm_period
+            error = now - cycle_start
+        self._record_cycle(error)
+        if self.stopped or (self.interlock is not None and self.interlock()):
+            return cycle_start, 0.0
+        return cycle_start, min(max(self.on_time, 0.0), self.pwm_period)
+
+    def _pwm_loop(self):
+        """Time-proportioning loop on absolute monotonic deadlines"""
+        cycle_start = time.monotonic()
         try:
-            if on_time > 0:
-                GPIO.output(self.ssr_pin, GPIO.HIGH)
-                time.sleep(on_time)
-            if on_time < self.pwm_period:
-                GPIO.output(self.ssr_pin, GPIO.LOW)
-                time.sleep(self.pwm_period - on_time)
+            while not self._stop_event.is_set():
+                cycle_start, on_time = self._begin_cycle(cycle_start, time.monotonic())
+                cycle_end = cycle_start + self.pwm_period
+
+                if self.hardware:
+                    self.hardware.apply(on_time, self.pwm_period)
+                else:
+                    # Edges are anchored to the window start, so a late wakeup
+                    # shortens this window's ON phase rather than shifting later ones
+                    if on_time > 0:
+                        self._set_level(self.gpio.HIGH)
+                        self._sleep_until(cycle_start + on_time)
+                    if on_time < self.pwm_period:
+                        self._set_level(self.gpio.LOW)
+
+                self._sleep_until(cycle_end)
+                cycle_start = cycle_end
         except Exception as e:
-            print(f"[ERROR] SSR/GPIO control failed: {e}")
-            raise
-    
+            post(f"[ERROR] SSR/GPIO control failed: {e}")
+        finally:
+            self._drive_low()
+
+    async def run_async(self):
+        """
+        The same time-proportioning loop as an asyncio task, used instead of the
+        PWM thread by the asyncio runtime. Cancel the task to stop; the SSR is left off.
+        """
+        import asyncio  # only the asyncio runtime pays for the import
+        cycle_start = time.monotonic()
+        try:
+            while True:
+                cycle_start, on_time = self._begin_cycle(cycle_start, time.monotonic())
+                cycle_end = cycle_start + self.pwm_period
+
+                if self.hardware:
+                    self.hardware.apply(on_time, self.pwm_period)
+                else:
+                    if on_time > 0:
+                        self._set_level(self.gpio.HIGH)
+                        await asyncio.sleep(max(0.0, cycle_start + on_time - time.monotonic()))
+                    if on_time < self.pwm_period:
+                        self._set_level(self.gpio.LOW)
+
+                await asyncio.sleep(max(0.0, cycle_end - time.monotonic()))
+                cycle_start = cycle_end
+        finally:
+            self._drive_low()
+
+    def _drive_low(self):
+        if self.hardware:
+            self.hardware.off()
+        else:
+            self._set_level(self.gpio.LOW)
+
+    def start(self):
+        """Start the PWM output thread (not after the SSR has been stopped)"""
+        if self.stopped or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._pwm_loop, name="ssr-pwm")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the PWM output thread and leave the SSR off for good"""
+        self.stopped = True
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.pwm_period + 1.0)
+        self._thread = None
+
+    def set_duty(self, on_time):
+        """Set ON time per PWM window; picked up at the next window without blocking (ignored once stopped)"""
+        if not self.stopped:
+            self.on_time = on_time
+
+    def control_output(self, on_time):
+        """Control SSR with PWM-like behavior (non-blocking, see set_duty)"""
+        self.set_duty(on_time)
+
+    def timing_stats(self):
+        """Per-cycle timing error summary"""
+        return {
+            "cycles": self.cycles,
+            "missed_cycles": self.missed_cycles,
+            "last_error_s": self.last_cycle_error,
+            "max_error_s": self.max_cycle_error,
+            "mean_error_s": self.total_cycle_error / self.cycles if self.cycles else 0.0,
+        }
+
     def turn_off(self):
         """Turn off SSR"""
-        GPIO.output(self.ssr_pin, GPIO.LOW)
-    
+        self.on_time = 0.0
+        self.stop()
+        self._drive_low()
+
     def cleanup(self):
-        """Clean up GPIO"""
-        GPIO.output(self.ssr_pin, GPIO.LOW)
-        GPIO.cleanup()
\ No newline at end of file
+        """Release this SSR's pin (other pins, e.g. a second roaster's SSR, are left alone)"""
+        self.turn_off()
+        if self.hardware:
+            self.hardware.cleanup()
+        else:
+            self.gpio.cleanup(self.ssr_pin)
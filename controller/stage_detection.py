@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+import argparse
+import math
+from collections import namedtuple
+from .sensing import RateOfRise
+from utils.helpers import ROAST_STAGES
+
+# time: when the stage is estimated to have started; detected_at: when the detector could tell
+StageEvent = namedtuple("StageEvent", "stage time detected_at temp ror confidence reason")
+
+# Per stage: (lowest probe temperature at which an RoR change point counts, temperature
+# that triggers the stage on its own, RoR change that marks it: "dip", "flick" or None).
+# Crack is endothermic then exothermic, so the RoR crashes at first crack and flicks up at its end
+# and again at second crack.
+DEFAULT_RULES = {
+    "Maillard": (150.0, 160.0, None),
+    "First Crack": (190.0, 205.0, "dip"),
+    "First Crack End": (200.0, 215.0, "flick"),
+    "Second Crack": (220.0, 230.0, "flick"),
+    "Second Crack End": (230.0, 240.0, None),
+}
+
+# Confidence reported for a stage triggered by temperature alone
+THRESHOLD_CONFIDENCE = 0.5
+
+class StageDetector:
+    """
+    Streaming roast stage detector, O(1) per sample.
+
+    Combines three signals over a fixed window: probe temperature thresholds,
+    the least-squares rate of rise (turning point after the charge) and a
+    two-sided CUSUM on the RoR's deviation from its linear trend, which picks up
+    the RoR dip at first crack and the flick when exothermic cracking takes over.
+    Stages are only ever detected in order, one after the other. update()
+    returns the StageEvents detected with that sample (usually none).
+    """
+    def __init__(self, rules=None, ror_window_s=30.0, trend_time_constant=20.0,
+                 cusum_slack=1.0, cusum_threshold=6.0, min_stage_s=20.0, turning_point_rise=2.0,
+                 stages=ROAST_STAGES):
+        """
+        Args:
+            rules (dict): Per-stage (min_temp, fallback_temp[, signal]) overriding DEFAULT_RULES
+            ror_window_s (float): RoR regression window (s)
+            trend_time_constant (float): Smoothing time constant of the RoR trend the CUSUM compares against (s)
+            cusum_slack (float): RoR deviation ignored per sample (°C/min)
+            cusum_threshold (float): Accumulated deviation that signals a change point (°C/min)
+            min_stage_s (float): Minimum time between two stage events (s)
+            turning_point_rise (float): Rise above the post-charge minimum that confirms the turning point (°C)
+        """
+        self.rules = dict(DEFAULT_RULES)
+        for stage, rule in (rules or {}).items():
+            rule = tuple(rule)
+            self.rules[stage] = rule if len(rule) == 3 else rule + (DEFAULT_RULES.get(stage, (0, 0, None))[2],)
+        self.stages = stages
+        self.ror_window_s = ror_window_s
+        self.trend_time_constant = trend_time_constant
+        self.cusum_slack = cusum_slack
+        self.cusum_threshold = cusum_threshold
+        self.min_stage_s = min_stage_s
+        self.turning_point_rise = turning_point_rise
+        self.reset()
+
+    def reset(self):
+        """Start a new roast (call at the charge)"""
+        self.ror = RateOfRise(self.ror_window_s)
+        self.stage_index = 0
+        self.last_event_time = None
+        self.turning_point = None
+        self.min_temp = None
+        self.min_time = None
+        self.last_t = None
+        self.trend = None
+        self.trend_slope = 0.0
+        self._reset_cusum()
+        self.events = []
+
+    def _reset_cusum(self):
+        self.cusum_low = 0.0
+        self.cusum_high = 0.0
+        self.dip_start = None
+        self.flick_start = None
+
+    def current_stage(self):
+        return self.stages[self.stage_index]
+
+    def _update_cusum(self, t, ror, dt):
+        if self.trend is None or dt <= 0:
+            self.trend, self.trend_slope = ror, 0.0
+            return
+        # Linear (Holt) trend: a steadily declining RoR is predicted, only a change in its course deviates
+        predicted = self.trend + self.trend_slope * dt
+        deviation = ror - predicted
+        # Brown's critically damped gains, so the trend settles after the charge without ringing
+        discount = math.exp(-dt / self.trend_time_constant)
+        self.trend = predicted + (1.0 - discount * discount) * deviation
+        self.trend_slope += (1.0 - discount) ** 2 * deviation / dt
+        # Scores are capped so an old excursion decays within seconds instead of masking later ones
+        cap = 2.0 * self.cusum_threshold
+        low = min(cap, max(0.0, self.cusum_low - deviation - self.cusum_slack))
+        high = min(cap, max(0.0, self.cusum_high + deviation - self.cusum_slack))
+        # Remember where each excursion began: that is the change point, not where it was confirmed
+        if low > 0.0 and self.cusum_low == 0.0:
+            self.dip_start = t
+        if high > 0.0 and self.cusum_high == 0.0:
+            self.flick_start = t
+        self.cusum_low, self.cusum_high = low, high
+
+    def _change_point(self, signal):
+        """(start time, confidence) if the given RoR change has been detected, else None"""
+        if signal == "dip":
+            score, start = self.cusum_low, self.dip_start
+        elif signal == "flick":
+            score, start = self.cusum_high, self.flick_start
+        else:
+            return None
+        if score < self.cusum_threshold:
+            return None
+        return start, min(0.99, 0.5 + 0.5 * min(1.0, score / (2.0 * self.cusum_threshold)))
+
+    def _emit(self, stage, time, t, temp, ror, confidence, reason):
+        event = StageEvent(stage, time, t, temp, ror, confidence, reason)
+        self.events.append(event)
+        return event
+
+    def update(self, t, temp):
+        """Feed one (elapsed seconds, °C) sample; returns newly detected StageEvents"""
+        events = []
+        ror = self.ror.update(t, temp)
+        dt = t - self.last_t if self.last_t is not None else 0.0
+        self.last_t = t
+        if ror is None:
+            return events
+
+        # Turning point: the minimum after the charge, confirmed once the probe has risen past it
+        if self.turning_point is None:
+            if self.min_temp is None or temp < self.min_temp:
+                self.min_temp, self.min_time = temp, t
+            elif temp - self.min_temp >= self.turning_point_rise and ror > 0:
+                self.turning_point = self._emit("Turning Point", self.min_time, t, self.min_temp, ror, 0.9,
+                                                "probe minimum after charge")
+                events.append(self.turning_point)
+            return events
+
+        self._update_cusum(t, ror, dt)
+        if self.stage_index + 1 >= len(self.stages):
+            return events
+        if self.last_event_time is not None and t - self.last_event_time < self.min_stage_s:
+            return events
+
+        stage = self.stages[self.stage_index + 1]
+        rule = self.rules.get(stage)
+        if rule is None:
+            return events
+        min_temp, fallback_temp, signal = rule
+
+        if temp < min_temp:
+            # Only RoR changes that start inside the stage's temperature window count
+            self._reset_cusum()
+        event = None
+        change = self._change_point(signal) if temp >= min_temp else None
+        if change:
+            start, confidence = change
+            event = self._emit(stage, start, t, temp, ror, confidence, f"RoR {signal} at {temp:.1f}°C")
+        elif temp >= fallback_temp:
+            confidence = THRESHOLD_CONFIDENCE
+            if signal is None and ror > 0:
+                confidence = 0.8  # a plain threshold stage reached while still heating
+            event = self._emit(stage, t, t, temp, ror, confidence, f"temperature {temp:.1f}°C ≥ {fallback_temp:.0f}°C")
+        if event:
+            events.append(event)
+            self.stage_index += 1
+            self.last_event_time = t
+            self._reset_cusum()
+        return events
+
+
+def manual_marks(columns):
+    """Elapsed time each stage was first entered in a logged roast (the operator's ENTER presses)"""
+    marks = {}
+    for code, t in zip(columns.stage_codes, columns.elapsed):
+        stage = columns.stage_names[code]
+        if stage not in marks:
+            marks[stage] = t
+    return marks
+
+
+def backtest_roast(columns, detector):
+    """Run the detector over one logged roast; returns (events, manual marks)"""
+    detector.reset()
+    for t, temp in zip(columns.elapsed, columns.actual):
+        detector.update(t, temp)
+    return list(detector.events), manual_marks(columns)
+
+
+def backtest(paths, **detector_args):
+    """
+    Detection latency against manual marks over historical logs.
+
+    Returns per-stage lists of (file, latency_s) where latency is detected_at
+    minus the manual mark (negative when the detector was earlier), plus the
+    stages detected without a mark and marked without a detection.
+    """
+    from utils.analytics import RoastColumns
+    from utils.logging import read_log
+
+    detector = StageDetector(**detector_args)
+    latencies = {stage: [] for stage in detector.stages[1:]}
+    missed = {stage: 0 for stage in detector.stages[1:]}
+    unmarked = {stage: 0 for stage in detector.stages[1:]}
+    for path in paths:
+        _, records = read_log(path)
+        events, marks = backtest_roast(RoastColumns(records), detector)
+        detected = {event.stage: event for event in events}
+        for stage in detector.stages[1:]:
+            if stage in marks and stage in detected:
+                latencies[stage].append((path, detected[stage].detected_at - marks[stage]))
+            elif stage in marks:
+                missed[stage] += 1
+            elif stage in detected:
+                unmarked[stage] += 1
+    return latencies, missed, unmarked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest automatic stage detection against manually marked roast logs")
+    parser.add_argument("logs", nargs="+", help="Roast logs (*-roast.csv or *.rlog)")
+    parser.add_argument("--verbose", action="store_true", help="Show every detected event per roast")
+    args = parser.parse_args()
+
+    if args.verbose:
+        from utils.analytics import RoastColumns
+        from utils.logging import read_log
+        detector = StageDetector()
+        for path in args.logs:
+            events, marks = backtest_roast(RoastColumns(read_log(path)[1]), detector)
+            print(path)
+            for event in events:
+                mark = marks.get(event.stage)
+                manual = f"manual {mark:6.1f}s" if mark is not None else "no manual mark"
+                print(f"  {event.stage:<17} at {event.time:6.1f}s, detected {event.detected_at:6.1f}s "
+                      f"({manual}), confidence {event.confidence:.2f}: {event.reason}")
+
+    latencies, missed, unmarked = backtest(args.logs)
+    print(f"{'stage':<17} {'n':>3} {'mean':>8} {'median':>8} {'mean |x|':>9} {'missed':>7} {'unmarked':>9}")
+    for stage, values in latencies.items():
+        lat = sorted(v for _, v in values)
+        if lat:
+            mean = sum(lat) / len(lat)
+            median = lat[len(lat) // 2]
+            mean_abs = sum(abs(v) for v in lat) / len(lat)
+            stats = f"{mean:7.1f}s {median:7.1f}s {mean_abs:8.1f}s"
+        else:
+            stats = f"{'-':>8} {'-':>8} {'-':>9}"
+        print(f"{stage:<17} {len(lat):>3} {stats} {missed[stage]:>7} {unmarked[stage]:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,117 @@
 #!/usr/bin/env python3
+import time
 from simple_pid import PID
+from .iio import SysfsTemperatureSource, IIOBufferedTemperatureSource
+from .sensing import SensorSampler
+from utils.console import post
 
 class TemperatureController:
     def __init__(
         self,
-        temp_raw_path="/sys/bus/iio/devices/iio:device0/in_temp_raw",
-        temp_scale_path="/sys/bus/iio/devices/iio:device0/in_temp_scale",
+        temp_raw_path=None,
+        temp_scale_path=None,
         initial_setpoint=60.0,
         pwm_period=0.5,
-        pid_gains=(2.3, 0.25, 2.5)
+        pid_gains=(2.3, 0.25, 2.5),
+        acquisition="sysfs",
+        source=None,
+        time_fn=None,
+        iio_device=0
     ):
-        self.temp_raw_path = temp_raw_path
-        self.temp_scale_path = temp_scale_path
+        # Paths default to the given IIO device (iio:device0 unless a second ADC is in use)
+        device_dir = f"/sys/bus/iio/devices/iio:device{iio_device}"
+        self.temp_raw_path = temp_raw_path or f"{device_dir}/in_temp_raw"
+        self.temp_scale_path = temp_scale_path or f"{device_dir}/in_temp_scale"
         self.setpoint = initial_setpoint
+        self.pwm_period = pwm_period
+        # Precomputed on-time from the profile's plant model; PID adds the correction
+        self.feedforward = 0.0
+        
+        # Sensor acquisition backend
+        if source is not None:
+            self.source = source
+        elif acquisition == "buffered":
+            self.source = IIOBufferedTemperatureSource(device_dir, f"/dev/iio:device{iio_device}")
+        else:
+            self.source = SysfsTemperatureSource(self.temp_raw_path, self.temp_scale_path)
+        self.sampler = None
+        self.stale_after = 1.0
         
         # PID setup
         Kp, Ki, Kd = pid_gains
-        self.pid = PID(Kp, Ki, Kd, setpoint=self.setpoint)
+        if time_fn:
+            self.pid = PID(Kp, Ki, Kd, setpoint=self.setpoint, time_fn=time_fn)
+        else:
+            self.pid = PID(Kp, Ki, Kd, setpoint=self.setpoint)
         self.pid.output_limits = (0, pwm_period)
     
+    def start_sampling(self, sample_rate_hz=20.0, filters=None, ror_window_s=15.0, stale_after=1.0, threaded=True):
+        """
+        Sample and filter on a background thread; read_temperature then returns the newest filtered value.
+        With threaded=False the sampler is created but not started, for a caller that schedules sampler.poll() itself.
+        """
+        self.sampler = SensorSampler(self.source, sample_rate_hz, filters, ror_window_s)
+        self.stale_after = stale_after
+        if threaded:
+            self.sampler.start()
+    
     def read_temperature(self):
         """Read temperature from sensor with retry logic"""
-        import time
+        if self.sampler:
+            return self._latest_sample()[1]
         
         for attempt in range(5):
             try:
-                with open(self.temp_raw_path) as f:
-                    raw = int(f.read().strip())
-                with open(self.temp_scale_path) as f:
-                    scale = int(f.read().strip())
-                return raw * scale / 1000.0
+                return self.source.read()
             except Exception as e:
                 if attempt < 4:  # Don't print warning on last attempt
-                    print(f"[WARN] Temperature read attempt {attempt + 1} failed: {e}")
-                    time.sleep(0.1)  # Brief delay before retry
+                    post(f"[WARN] Temperature read attempt {attempt + 1} failed: {e}")
+                    # Reopen the handle and retry immediately rather than sleeping in the control loop
+                    try:
+                        self.source.reopen()
+                    except Exception:
+                        pass
                 else:
-                    print(f"[ERROR] Temperature sensor failed after 5 attempts: {e}")
+                    post(f"[ERROR] Temperature sensor failed after 5 attempts: {e}")
                     raise
     
+    def _latest_sample(self):
+        deadline = time.monotonic() + self.stale_after
+        reading = self.sampler.latest
+        while reading is None or time.monotonic() - reading[0] > self.stale_after:
+            if time.monotonic() > deadline:
+                post(f"[ERROR] Temperature sampler stalled: {self.sampler.last_error}")
+                raise RuntimeError(f"No temperature sample within {self.stale_after}s")
+            time.sleep(self.sampler.period)
+            reading = self.sampler.latest
+        return reading
+    
+    def rate_of_rise(self):
+        """Filtered rate of rise in °C/min, or None when not sampling in the background"""
+        if not self.sampler or not self.sampler.latest:
+            return None
+        return self.sampler.latest[2]
+    
     def set_target(self, target_temp):
         """Update target temperature"""
         self.setpoint = target_temp
         self.pid.setpoint = target_temp
     
+    def set_feedforward(self, duty):
+        """
+        Set the feedforward heater duty (0-1) for the next output. PID limits are
+        shifted so feedforward plus correction stays within one PWM window and
+        the integral winds up only against the heater's real limits.
+        """
+        self.feedforward = duty * self.pwm_period
+        self.pid.output_limits = (-self.feedforward, self.pwm_period - self.feedforward)
+    
     def calculate_output(self, current_temp):
-        """Calculate PID output for current temperature"""
-        return self.pid(current_temp)
\ No newline at end of file
+        """Calculate PID output (plus any feedforward) for current temperature"""
+        return self.feedforward + self.pid(current_temp)
+    
+    def close(self):
+        """Release the sensor handle"""
+        if self.sampler:
+            self.sampler.stop()
+        self.source.close()
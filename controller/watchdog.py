@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import multiprocessing
+import os
+import signal
+import time
+from utils.console import post
+
+# Shared slots (one RawArray of doubles). The controller writes the heartbeat
+# slots, the watchdog process writes the status slots and its own heartbeat.
+SEQ, BEAT_TIME, TEMP, STOP = 0, 1, 2, 3
+TRIPPED, TRIP_TIME, REACTION, POLLS, MAX_POLL_GAP = 4, 5, 6, 7, 8
+READY, ALIVE_TIME = 9, 10
+SLOTS = 11
+
+TRIP_REASONS = {1: "control loop missed its deadline", 2: "over-temperature", 3: "controller process exited",
+                4: "watchdog process stopped"}
+WATCHDOG_LOST = 4
+
+class WatchdogTripped(RuntimeError):
+    """Raised in the control loop once the watchdog has cut the heater"""
+
+
+class _GPIOOutput:
+    def __init__(self, pin):
+        import RPi.GPIO as GPIO
+        self.gpio = GPIO
+        self.pin = pin
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        # No initial level: the controller process owns the pin until the watchdog trips
+        GPIO.setup(pin, GPIO.OUT)
+
+    def force_low(self):
+        self.gpio.output(self.pin, self.gpio.LOW)
+
+    def close(self):
+        pass  # no GPIO.cleanup(): that would float the pin the controller is still driving
+
+
+class _PigpioOutput:
+    def __init__(self, pin):
+        import pigpio
+        self.pi = pigpio.pi()
+        if not self.pi.connected:
+            raise RuntimeError("pigpio daemon not running")
+        self.pin = pin
+
+    def force_low(self):
+        self.pi.wave_tx_stop()
+        self.pi.write(self.pin, 0)
+
+    def close(self):
+        self.pi.stop()
+
+
+def run_watchdog(shared, pin, backend, deadline, max_temp, poll_interval, parent_pid):
+    """
+    Watchdog process entry point: drive the SSR pin low as soon as the heartbeat
+    is late, the reported temperature is over the limit or the controller dies.
+    Once tripped it keeps the pin low until told to stop.
+    """
+    # Ctrl+C goes to the controller, which stops the watchdog once the SSR is off
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    output = _PigpioOutput(pin) if backend == "pigpio" else _GPIOOutput(pin)
+    clock = time.monotonic
+    shared[ALIVE_TIME] = clock()
+    shared[READY] = 1
+    reason = 0
+    last_poll = clock()
+    try:
+        while not shared[STOP]:
+            now = clock()
+            gap = now - last_poll
+            last_poll = now
+            shared[ALIVE_TIME] = now
+            if gap > shared[MAX_POLL_GAP]:
+                shared[MAX_POLL_GAP] = gap
+            shared[POLLS] += 1
+
+            orphaned = os.getppid() != parent_pid
+            if reason:
+                output.force_low()  # hold it low against a PWM loop that may still be running
+            else:
+                armed = shared[SEQ] > 0
+                beat = shared[BEAT_TIME]
+                if orphaned:
+                    reason, due = 3, now
+                elif armed and now - beat > deadline:
+                    reason, due = 1, beat + deadline
+                elif armed and shared[TEMP] > max_temp:
+                    reason, due = 2, beat
+                if reason:
+                    output.force_low()
+                    forced = clock()
+                    shared[TRIP_TIME] = forced
+                    shared[REACTION] = forced - due
+                    shared[TRIPPED] = reason
+            if orphaned:
+                break  # the controller is gone; the pin stays low
+            time.sleep(poll_interval)
+    finally:
+        output.close()
+
+
+class Watchdog:
+    """
+    Out-of-process heater watchdog.
+
+    The control step calls beat() with each temperature reading; that is a few
+    stores into shared memory. A separate process polls the heartbeat every
+    poll_interval and drives the SSR pin low itself when no beat arrives within
+    deadline seconds, the temperature exceeds max_temp, or the controller process
+    dies, so a stalled sensor read, a hung VISA call or a crash cannot leave the
+    heater on. The trip is latched and reported back through the same memory.
+    The watchdog process keeps its own heartbeat there too, so a watchdog that
+    has died stops the roast instead of leaving it unprotected.
+    """
+    def __init__(self, ssr_pin=26, backend="gpio", deadline=1.0, max_temp=300.0, poll_interval=0.002,
+                 start_timeout=10.0):
+        """
+        Args:
+            ssr_pin (int): BCM pin of the SSR
+            backend (str): "gpio" (RPi.GPIO) or "pigpio", as used by the SSR
+            deadline (float): Longest gap between heartbeats before the heater is cut (s)
+            max_temp (float): Temperature that cuts the heater (°C)
+            poll_interval (float): Watchdog polling period (s); bounds the reaction time
+            start_timeout (float): Longest wait for the watchdog process to take the pin (s)
+        """
+        self.ssr_pin = ssr_pin
+        self.backend = backend
+        self.deadline = deadline
+        self.max_temp = max_temp
+        self.poll_interval = poll_interval
+        self.start_timeout = start_timeout
+        self.context = multiprocessing.get_context("spawn")
+        self.shared = self.context.RawArray('d', SLOTS)
+        self.process = None
+        self.seq = 0
+
+    def start(self):
+        self.process = self.context.Process(
+            target=run_watchdog, name="ssr-watchdog",
+            args=(self.shared, self.ssr_pin, self.backend, self.deadline, self.max_temp,
+                  self.poll_interval, os.getpid()))
+        self.process.daemon = True
+        self.process.start()
+        # Not armed until the child holds the pin: a missing GPIO library or daemon must fail startup
+        deadline = time.monotonic() + self.start_timeout
+        while not self.shared[READY]:
+            if not self.process.is_alive():
+                code = self.process.exitcode
+                self.process = None
+                raise RuntimeError(f"Watchdog process exited during startup (exit code {code})")
+            if time.monotonic() > deadline:
+                self.stop(timeout=0.5)
+                raise RuntimeError(f"Watchdog process not ready within {self.start_timeout:.0f}s")
+            time.sleep(0.01)
+        post(f"[INFO] Watchdog armed on GPIO {self.ssr_pin}: {self.deadline * 1000:.0f}ms deadline, "
+             f"{self.max_temp:.0f}°C limit")
+
+    def beat(self, temp):
+        """Record a heartbeat; returns the trip reason code (0 while not tripped)"""
+        shared = self.shared
+        now = time.monotonic()
+        shared[TEMP] = temp
+        shared[BEAT_TIME] = now
+        self.seq += 1
+        shared[SEQ] = self.seq
+        if now - shared[ALIVE_TIME] > self.deadline:
+            raise WatchdogTripped("Watchdog process stopped responding - heater unprotected, stopping roast")
+        return int(shared[TRIPPED])
+
+    def tripped(self):
+        """Trip reason code (0 while not tripped); cheap enough to check every PWM window"""
+        shared = self.shared
+        if shared[TRIPPED]:
+            return int(shared[TRIPPED])
+        # A dead watchdog cannot cut the heater, so the SSR must stay off without it
+        if time.monotonic() - shared[ALIVE_TIME] > self.deadline:
+            return WATCHDOG_LOST
+        return 0
+
+    def trip_reason(self):
+        return TRIP_REASONS.get(self.tripped())
+
+    def stats(self):
+        shared = self.shared
+        return {
+            "tripped": int(shared[TRIPPED]),
+            "reaction_s": shared[REACTION],
+            "polls": int(shared[POLLS]),
+            "max_poll_gap_s": shared[MAX_POLL_GAP],
+        }
+
+    def stop(self, timeout=2.0):
+        """Stop watching (call after the SSR is off); a tripped pin stays low"""
+        self.shared[STOP] = 1
+        if self.process:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
@@ -1,23 +1,73 @@
 #!/usr/bin/env python3
+import argparse
+import os
 import sys
-import threading
 from datetime import datetime
 from roast_controller import RoastController
+from profiles.library import ProfileLibrary
+from profiles.profile_loader import ProfileError, MAX_TEMP_C
+from utils.telemetry import parse_address
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 main.py <roast_profile.json>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(usage="python3 main.py <roast_profile.json> [options]")
+    parser.add_argument("roast_profile", help="Roast profile JSON")
+    # Binary logs can be converted back to CSV with: python3 -m utils.logging <log.rlog>
+    parser.add_argument("--binary-log", action="store_true", help="Write a compact binary log instead of CSV")
+    parser.add_argument("--dashboard", choices=["line", "curses", "none"], default="line",
+                        help="Status display: periodic status line, full-screen curses UI, or none")
+    parser.add_argument("--runtime", choices=["threads", "asyncio"], default="threads",
+                        help="Run the control loop on threads (default) or as tasks on one asyncio event loop")
+    parser.add_argument("--watch", action="store_true",
+                        help="Reload the profile into the running roast when its file changes")
+    parser.add_argument("--metrics-file", default=None, help="Write loop timing metrics to a Prometheus textfile")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve loop timing metrics on localhost:PORT")
+    # Watch a running roast with: python3 -m utils.telemetry [HOST:PORT]
+    parser.add_argument("--telemetry-port", type=int, default=None,
+                        help="Stream live telemetry to WebSocket clients on PORT")
+    parser.add_argument("--telemetry-host", default="127.0.0.1",
+                        help="Address the telemetry server listens on (0.0.0.0 for the LAN)")
+    parser.add_argument("--telemetry-multicast", default=None, metavar="GROUP:PORT",
+                        help="Also send each telemetry record to a UDP multicast group")
+    parser.add_argument("--watchdog-deadline", type=float, default=None,
+                        help="Seconds without a control step before the watchdog cuts the heater (default 2 periods)")
+    parser.add_argument("--max-temp", type=float, default=MAX_TEMP_C,
+                        help=f"Temperature at which the watchdog cuts the heater (default {MAX_TEMP_C:.0f}°C)")
+    parser.add_argument("--no-watchdog", action="store_true", help="Run without the heater watchdog process")
+    args = parser.parse_args()
     
-    roast_profile_file = f"{sys.argv[1]}"
     timestamp = datetime.now().strftime("%y-%m-%d-%H%M%S")
-    log_file = f"{timestamp}-roast.csv"
+    log_extension = "rlog" if args.binary_log else "csv"
+    log_file = f"{timestamp}-roast.{log_extension}"
     
-    controller = RoastController(
-        roast_profile_file=roast_profile_file,
-        log_file=log_file
+    library = ProfileLibrary(os.path.dirname(args.roast_profile) or ".")
+    try:
+        profile = library.load(args.roast_profile)
+    except ProfileError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    
+    controller_class = RoastController
+    if args.runtime == "asyncio":
+        from async_controller import AsyncRoastController
+        controller_class = AsyncRoastController
+    controller = controller_class(
+        profile=profile,
+        log_file=log_file,
+        dashboard=None if args.dashboard == "none" else args.dashboard,
+        metrics_file=args.metrics_file,
+        metrics_port=args.metrics_port,
+        telemetry_port=args.telemetry_port,
+        telemetry_host=args.telemetry_host,
+        telemetry_multicast=parse_address(args.telemetry_multicast, 8766) if args.telemetry_multicast else None,
+        watchdog=not args.no_watchdog,
+        watchdog_deadline=args.watchdog_deadline,
+        max_temp=args.max_temp
     )
     
+    if args.watch:
+        library.subscribe(args.roast_profile, controller.reload_profile)
+        library.watch()
+    
     try:
         controller.start()
         
@@ -25,6 +75,7 @@ def main():
         print("\n[INFO] Stopping by user request...")
     
     finally:
+        library.stop()
         controller.shutdown()
 
 if __name__ == "__main__":
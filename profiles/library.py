@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+from .profile_loader import RoastProfile, ProfileError
+from .log_profile import is_roast_log
+from utils.console import post
+
+class ProfileLibrary:
+    """
+    Validated, compiled roast profiles from one directory, cached by content hash.
+
+    load() only parses and compiles a file whose bytes have not been seen before.
+    watch() polls the directory's mtimes on a background thread; when a file
+    changes to a new valid profile, subscribers for that path are called with the
+    compiled RoastProfile. An invalid edit is reported and the last good version
+    stays in use. Every caller and subscriber gets its own fork() of the cached
+    profile, since trajectory lookups keep per-roast cursors.
+    """
+    def __init__(self, directory="profiles", poll_interval=1.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.compiled = {}   # content sha256 -> RoastProfile
+        self.files = {}      # path -> (mtime_ns, size, sha256 of last good version)
+        self.errors = {}     # path -> last validation error
+        self.subscribers = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _key(self, path):
+        return os.path.abspath(path)
+
+    def _compile(self, path):
+        """(digest, profile) for the file's current contents"""
+        if is_roast_log(path):
+            # Logs can be large and do not change once written: key them by stat rather than hashing them
+            stat = os.stat(path)
+            digest = f"log:{self._key(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+            profile = self.compiled.get(digest)
+            if profile is None:
+                profile = self.compiled[digest] = RoastProfile.from_data({"source_log": {"path": self._key(path)}}, path)
+            return digest, profile
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        profile = self.compiled.get(digest)
+        if profile is None:
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                raise ProfileError(f"{path}: invalid JSON: {e}") from None
+            profile = RoastProfile.from_data(data, path)
+            self.compiled[digest] = profile
+        return digest, profile
+
+    def load(self, path):
+        """Compiled profile for a file; raises ProfileError if it is missing or invalid"""
+        key = self._key(path)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise ProfileError(f"Roast profile file not found: {path}") from None
+        with self._lock:
+            digest, profile = self._compile(path)
+            self.files[key] = (stat.st_mtime_ns, stat.st_size, digest)
+            self.errors.pop(key, None)
+        post(f"[INFO] Loaded profile '{profile.name}': {len(profile.profile_data)} points ({profile.interpolation})")
+        return profile.fork()
+
+    def profiles(self):
+        """Every valid profile in the directory, by path"""
+        self.scan()
+        with self._lock:
+            return {path: self.compiled[digest].fork() for path, (_, _, digest) in self.files.items() if digest}
+
+    def scan(self, report=True):
+        """Recompile files that changed since the last scan and notify subscribers; returns changed paths"""
+        changed = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            key = self._key(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                previous = self.files.get(key)
+                if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    digest, profile = self._compile(path)
+                except (OSError, ProfileError) as e:
+                    # Keep the last good version; remember the stat so the error is reported once per edit
+                    self.files[key] = (stat.st_mtime_ns, stat.st_size, previous[2] if previous else None)
+                    self.errors[key] = str(e)
+                    if report:
+                        post(f"[WARN] Ignoring invalid profile: {e}")
+                    continue
+                self.files[key] = (stat.st_mtime_ns, stat.st_size, digest)
+                self.errors.pop(key, None)
+                if previous and previous[2] == digest:
+                    continue  # touched but unchanged
+                callbacks = list(self.subscribers.get(key, ()))
+            changed.append(path)
+            if previous:
+                for callback in callbacks:
+                    callback(profile.fork())
+        return changed
+
+    def subscribe(self, path, callback):
+        """Call callback(profile) whenever the file at path changes to a new valid profile"""
+        with self._lock:
+            self.subscribers.setdefault(self._key(path), []).append(callback)
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.scan()
+            except Exception as e:
+                post(f"[WARN] Profile scan failed: {e}")
+
+    def watch(self):
+        """Start polling the directory for changes"""
+        self.scan()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="profile-watch")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1.0)
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate every roast profile in a directory")
+    parser.add_argument("directory", nargs="?", default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args()
+
+    library = ProfileLibrary(args.directory)
+    library.scan(report=False)
+    for path, (_, _, digest) in sorted(library.files.items()):
+        if path in library.errors:
+            print(f"INVALID {os.path.basename(path)}: {library.errors[path]}")
+        else:
+            profile = library.compiled[digest]
+            print(f"ok      {os.path.basename(path)}: '{profile.name}', {len(profile.profile_data)} points, "
+                  f"{profile.profile_data[-1][0]:.0f}s")
+    if library.errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import re
+from utils.logging import stream_log, BINARY_EXTENSION
+
+# Compiled log profiles, keyed by log path, size, mtime and compile options
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aetherroast", "log_profiles")
+CACHE_VERSION = 1
+LOG_SUFFIXES = (".csv", BINARY_EXTENSION)
+
+def is_roast_log(path):
+    return path.endswith(LOG_SUFFIXES)
+
+
+def decimate(points, tolerance):
+    """
+    Ramer-Douglas-Peucker on (t, value) points: the fewest points that keep every
+    dropped point within tolerance (vertical distance) of the resulting polyline.
+    """
+    if len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        t0, v0 = points[first]
+        t1, v1 = points[last]
+        slope = (v1 - v0) / (t1 - t0) if t1 > t0 else 0.0
+        worst, worst_index = tolerance, None
+        for i in range(first + 1, last):
+            t, v = points[i]
+            distance = abs(v - (v0 + slope * (t - t0)))
+            if distance > worst:
+                worst, worst_index = distance, i
+        if worst_index is not None:
+            keep[worst_index] = True
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def compile_log(path, tolerance_c=0.5, resolution_s=1.0, replay_fan=False):
+    """
+    Turn a roast log into profile JSON data.
+
+    Records are streamed, so the log is never held in memory. Roast-phase probe
+    temperatures are averaged into resolution_s bins (which also takes out
+    sensor noise) and decimated to a compact curve with Ramer-Douglas-Peucker.
+    The preheat temperature, the time each stage was first entered and, with
+    replay_fan, every logged fan change come along.
+    """
+    profile_name, records = stream_log(path)
+    bins = []
+    bin_start, bin_sum, bin_count = None, 0.0, 0
+    preheat_target = None
+    stage_times = {}
+    fan_changes = []
+    for elapsed, stage, _, target, actual, _, fan in records:
+        if stage == "Preheating":
+            preheat_target = target
+            continue
+        if stage not in stage_times:
+            stage_times[stage] = elapsed
+        if fan is not None and (not fan_changes or fan_changes[-1][1] != fan):
+            fan_changes.append((elapsed, fan))
+        if bin_start is None or elapsed >= bin_start + resolution_s:
+            if bin_count:
+                bins.append((bin_start, bin_sum / bin_count))
+            bin_start, bin_sum, bin_count = elapsed, 0.0, 0
+        bin_sum += actual
+        bin_count += 1
+    if bin_count:
+        bins.append((bin_start, bin_sum / bin_count))
+    if len(bins) < 2:
+        raise ValueError(f"{path}: no roast phase to follow")
+
+    curve = decimate(bins, tolerance_c)
+    data = {
+        "name": f"{profile_name or 'Roast'} (from {os.path.basename(path)})",
+        "description": f"Followed from roast log {os.path.basename(path)}",
+        "roast_profile": [[round(t, 2), round(temp, 2)] for t, temp in curve],
+        "stage_times": {stage: round(t, 2) for stage, t in stage_times.items()},
+    }
+    if preheat_target is not None:
+        data["preheat"] = {"temp_c": round(preheat_target, 1)}
+    if replay_fan and fan_changes:
+        # Steps, not ramps: hold each speed until just before the next change
+        points = [[round(fan_changes[0][0], 2), fan_changes[0][1]]]
+        for (_, previous), (t, fan) in zip(fan_changes, fan_changes[1:]):
+            points.append([round(t - 0.01, 2), previous])
+            points.append([round(t, 2), fan])
+        data["fan"] = {"curve": points, "step_pct": 1}
+    return data
+
+
+def _cache_path(path, options, cache_dir):
+    stat = os.stat(path)
+    key = json.dumps([CACHE_VERSION, os.path.abspath(path), stat.st_size, stat.st_mtime_ns, options], sort_keys=True)
+    return os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+
+def load_log_profile_data(path, tolerance_c=0.5, resolution_s=1.0, replay_fan=False, cache_dir=CACHE_DIR):
+    """
+    Profile data for a roast log, compiled once and then read from the cache
+    (keyed by the log's path, size and mtime and the options), so even a large
+    high-rate log loads instantly at roast start.
+    """
+    options = {"tolerance_c": tolerance_c, "resolution_s": resolution_s, "replay_fan": replay_fan}
+    cached = _cache_path(path, options, cache_dir) if cache_dir else None
+    if cached:
+        try:
+            with open(cached) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    data = compile_log(path, tolerance_c, resolution_s, replay_fan)
+    if cached:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = cached + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, cached)
+        except OSError:
+            pass
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a roast log into a roast profile JSON")
+    parser.add_argument("log", help="Roast log (*-roast.csv or *.rlog)")
+    parser.add_argument("output", nargs="?", help="Profile JSON to write (default: print)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Largest deviation from the log's curve (°C)")
+    parser.add_argument("--replay-fan", action="store_true", help="Copy the logged fan changes into a fan curve")
+    args = parser.parse_intermixed_args()
+
+    data = compile_log(args.log, args.tolerance, replay_fan=args.replay_fan)
+    # One [seconds, value] point per line, like the hand-written profiles
+    text = re.sub(r"\[\s+([^\[\]{}]+?)\s+\]", lambda m: "[" + re.sub(r",\s+", ", ", m.group(1)) + "]",
+                  json.dumps(data, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"[INFO] Wrote {args.output}: {len(data['roast_profile'])} points")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
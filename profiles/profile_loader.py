@@ -1,42 +1,301 @@
 #!/usr/bin/env python3
+import copy
 import json
 import os
-import sys
+from .trajectory import SetpointTrajectory, FeedforwardTrajectory, FanSchedule, INTERPOLATIONS
+from .log_profile import is_roast_log, load_log_profile_data
+from controller.sensing import build_filter_chain
+from utils.console import post
+from utils.helpers import ROAST_STAGES
+
+# Highest setpoint any profile may ask for (°C)
+MAX_TEMP_C = 300.0
+# Numeric StageDetector settings a profile's stage_detection block may set
+STAGE_DETECTION_PARAMS = ("ror_window_s", "trend_time_constant", "cusum_slack", "cusum_threshold",
+                          "min_stage_s", "turning_point_rise")
+
+class ProfileError(ValueError):
+    """A roast profile that is missing or does not match the profile format"""
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _positive(value):
+    return None if _number(value) and value > 0 else "must be a positive number"
+
+def _text(value):
+    return None if isinstance(value, str) else "must be a string"
+
+def _choice(*options):
+    def check(value):
+        return None if value in options else f"must be one of {', '.join(options)}"
+    return check
+
+def _pid_gains(value):
+    if isinstance(value, list) and len(value) == 3 and all(_number(g) and g >= 0 for g in value):
+        return None
+    return "must be [Kp, Ki, Kd] with non-negative numbers"
+
+def _preheat(value):
+    if not isinstance(value, dict) or not _number(value.get("temp_c")):
+        return "must be an object with a numeric temp_c"
+    if not 0 < value["temp_c"] <= MAX_TEMP_C:
+        return f"temp_c must be between 0 and {MAX_TEMP_C}°C"
+    return None
+
+def _sensing(value):
+    if not isinstance(value, dict):
+        return "must be an object"
+    unknown = set(value) - {"sample_rate_hz", "filters", "ror_window_s", "stale_after"}
+    if unknown:
+        return f"has unknown keys: {', '.join(sorted(unknown))}"
+    for key in ("sample_rate_hz", "ror_window_s", "stale_after"):
+        if key in value and _positive(value[key]):
+            return f"{key} must be a positive number"
+    try:
+        build_filter_chain(value.get("filters"))
+    except (TypeError, ValueError, KeyError) as e:
+        return f"has an invalid filter: {e}"
+    return None
+
+def _stage_detection(value):
+    if not isinstance(value, dict):
+        return "must be an object"
+    unknown = set(value) - {"mode", "rules"} - set(STAGE_DETECTION_PARAMS)
+    if unknown:
+        return f"has unknown keys: {', '.join(sorted(unknown))}"
+    if value.get("mode", "assist") not in ("assist", "auto"):
+        return "mode must be one of assist, auto"
+    for key in STAGE_DETECTION_PARAMS:
+        if key in value and _positive(value[key]):
+            return f"{key} must be a positive number"
+    rules = value.get("rules", {})
+    if not isinstance(rules, dict):
+        return "rules must be an object of stage: [min_temp, fallback_temp, signal]"
+    for stage, rule in rules.items():
+        if stage not in ROAST_STAGES[1:]:
+            return f"rules has unknown stage '{stage}' (expected one of {', '.join(ROAST_STAGES[1:])})"
+        if not (isinstance(rule, list) and len(rule) in (2, 3) and all(map(_number, rule[:2]))
+                and (len(rule) == 2 or rule[2] in ("dip", "flick", None))):
+            return f"rule for '{stage}' must be [min_temp, fallback_temp] or [min_temp, fallback_temp, \"dip\"|\"flick\"|null]"
+    return None
+
+def _percent(value):
+    return _number(value) and 0 <= value <= 100
+
+def _fan(value):
+    if not isinstance(value, dict):
+        return "must be an object"
+    unknown = set(value) - {"curve", "step_pct", "min_interval_s", "preheat_pct", "preheat_hold_pct"}
+    if unknown:
+        return f"has unknown keys: {', '.join(sorted(unknown))}"
+    for key in ("preheat_pct", "preheat_hold_pct"):
+        if key in value and not _percent(value[key]):
+            return f"{key} must be between 0 and 100"
+    if "step_pct" in value and not (_number(value["step_pct"]) and 0 < value["step_pct"] <= 100):
+        return "step_pct must be between 0 and 100"
+    if "min_interval_s" in value and not (_number(value["min_interval_s"]) and value["min_interval_s"] >= 0):
+        return "min_interval_s must be a non-negative number"
+    curve = value.get("curve", [])
+    if not isinstance(curve, list):
+        return "curve must be a list of [seconds, %] points"
+    for point in curve:
+        if not (isinstance(point, list) and len(point) == 2 and _number(point[0]) and point[0] >= 0
+                and _percent(point[1])):
+            return f"curve has an invalid point {point!r} (expected [seconds, 0-100 %])"
+    return None
+
+def _plant_model(value):
+    if isinstance(value, dict) and all(_number(v) for v in value.values()):
+        return None
+    return "must be an object of numeric parameters"
+
+def _roast_curve(value):
+    if not isinstance(value, list) or not value:
+        return "must be a non-empty list of [seconds, °C] points"
+    times = set()
+    for point in value:
+        if not (isinstance(point, list) and len(point) == 2 and all(map(_number, point))):
+            return f"has a malformed point {point!r} (expected [seconds, °C])"
+        t, temp = point
+        if t < 0 or not 0 <= temp <= MAX_TEMP_C:
+            return f"has an out-of-range point {point!r}"
+        if t in times:
+            return f"has more than one point at {t}s"
+        times.add(t)
+    return None
+
+def _stage_times(value):
+    if not isinstance(value, dict):
+        return "must be an object of stage: seconds"
+    for stage, t in value.items():
+        if stage not in ROAST_STAGES:
+            return f"has unknown stage '{stage}' (expected one of {', '.join(ROAST_STAGES)})"
+        if not (_number(t) and t >= 0):
+            return f"time for '{stage}' must be a non-negative number"
+    return None
+
+def _source_log(value):
+    if not isinstance(value, dict) or not isinstance(value.get("path"), str):
+        return "must be an object with a log file 'path'"
+    unknown = set(value) - {"path", "tolerance_c", "resolution_s", "replay_fan"}
+    if unknown:
+        return f"has unknown keys: {', '.join(sorted(unknown))}"
+    for key in ("tolerance_c", "resolution_s"):
+        if key in value and _positive(value[key]):
+            return f"{key} must be a positive number"
+    if not isinstance(value.get("replay_fan", False), bool):
+        return "replay_fan must be true or false"
+    return None
+
+# Top-level profile keys and their checks; every other key is rejected so typos do not go unnoticed
+PROFILE_SCHEMA = {
+    "name": _text,
+    "description": _text,
+    "pid_gains": _pid_gains,
+    "pwm_period": _positive,
+    "control_period": _positive,
+    "preheat": _preheat,
+    "acquisition": _choice("sysfs", "buffered"),
+    "sensing": _sensing,
+    "plant_model": _plant_model,
+    "control_mode": _choice("pid", "feedforward"),
+    "stage_detection": _stage_detection,
+    "fan": _fan,
+    "interpolation": _choice(*INTERPOLATIONS),
+    "roast_profile": _roast_curve,
+    "stage_times": _stage_times,
+    "source_log": _source_log,
+}
+REQUIRED_KEYS = ("roast_profile",)
+
+def validate_profile(data):
+    """List of problems with parsed profile JSON (empty when valid)"""
+    if not isinstance(data, dict):
+        return ["profile must be a JSON object"]
+    # A profile following a roast log gets its curve from the log
+    errors = [f"missing '{key}'" for key in REQUIRED_KEYS if key not in data and "source_log" not in data]
+    for key, value in data.items():
+        check = PROFILE_SCHEMA.get(key)
+        if check is None:
+            errors.append(f"unknown key '{key}'")
+            continue
+        problem = check(value)
+        if problem:
+            errors.append(f"'{key}' {problem}")
+    if data.get("control_mode") == "feedforward":
+        plant = data.get("plant_model")
+        if not isinstance(plant, dict) or _positive(plant.get("gain")) or _positive(plant.get("time_constant")):
+            errors.append("'control_mode' feedforward needs a plant_model with a positive gain and time_constant")
+    return errors
+
 
 class RoastProfile:
     def __init__(self, profile_file=None):
+        self.source = None
         if profile_file:
             self.load_profile(profile_file)
     
+    @classmethod
+    def from_data(cls, data, source=None):
+        """Validate and compile already-parsed profile JSON"""
+        profile = cls()
+        profile.apply(data, source)
+        return profile
+    
     def load_profile(self, file_path):
-        """Load roast profile from JSON file"""
-        if not os.path.exists(file_path):
-            print(f"[ERROR] Roast profile file not found: {file_path}")
-            sys.exit(1)
-        
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        """Load roast profile from JSON file, or follow a roast log (*.csv, *.rlog) directly"""
+        if is_roast_log(file_path):
+            if not os.path.exists(file_path):
+                raise ProfileError(f"Roast log not found: {file_path}")
+            self.apply({"source_log": {"path": os.path.abspath(file_path)}}, file_path)
+            post(f"[INFO] Loaded profile '{self.name}': {len(self.profile_data)} points ({self.interpolation})")
+            return
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise ProfileError(f"Roast profile file not found: {file_path}") from None
+        except json.JSONDecodeError as e:
+            raise ProfileError(f"{file_path}: invalid JSON: {e}") from None
+        self.apply(data, file_path)
+        post(f"[INFO] Loaded profile '{self.name}': {len(self.profile_data)} points ({self.interpolation})")
+    
+    def apply(self, data, source=None):
+        """Populate from parsed profile JSON, rejecting it if it does not validate"""
+        errors = validate_profile(data)
+        if errors:
+            raise ProfileError(f"{source or 'profile'}: " + "; ".join(errors))
+        self.source_log = None
+        if "source_log" in data:
+            data = self._follow_log(data, source)
         
+        self.source = source
+        # The resolved JSON (a followed log filled in), so a variant can be rebuilt with from_data
+        self.data = data
         self.name = data.get("name", "")
         self.description = data.get("description", "")
         self.pid_gains = tuple(data.get("pid_gains", [2.3, 0.25, 2.5]))
         self.pwm_period = data.get("pwm_period", 0.5)
+        self.control_period = data.get("control_period", self.pwm_period)
         self.preheat = data.get("preheat")
+        self.acquisition = data.get("acquisition", "sysfs")
+        self.sensing = data.get("sensing")
+        self.plant_model = data.get("plant_model")
+        self.stage_detection = data.get("stage_detection")
+        # When each stage began in the reference roast (s), for comparison while roasting
+        self.stage_times = data.get("stage_times", {})
         self.profile_data = [(float(point[0]), float(point[1])) for point in data["roast_profile"]]
         
         self.profile_data.sort(key=lambda x: x[0])
-        print(f"[INFO] Loaded profile '{self.name}': {len(self.profile_data)} points")
+        self.interpolation = data.get("interpolation", "linear")
+        self.trajectory = SetpointTrajectory(self.profile_data, self.interpolation)
+        # "feedforward" precomputes the heater duty the plant model needs; PID then only corrects the residual
+        self.control_mode = data.get("control_mode", "pid")
+        self.feedforward = None
+        if self.control_mode == "feedforward":
+            self.feedforward = FeedforwardTrajectory(self.trajectory, self.plant_model, self.control_period)
+        
+        # Fan: fixed speeds around preheat, then an optional curve over the roast
+        fan = data.get("fan", {})
+        self.preheat_fan_pct = fan.get("preheat_pct", 100)
+        self.preheat_hold_fan_pct = fan.get("preheat_hold_pct", 20)
+        self.fan_min_interval = fan.get("min_interval_s", 2.0)
+        self.fan_schedule = None
+        if fan.get("curve"):
+            self.fan_schedule = FanSchedule(fan["curve"], fan.get("step_pct", 5.0))
+    
+    def fork(self):
+        """
+        A profile sharing this one's compiled, read-only data with its own trajectory
+        cursors, so two roasts (or a roast and a reload) never move each other's lookups
+        """
+        profile = copy.copy(self)
+        profile.trajectory = self.trajectory.fork()
+        if self.fan_schedule:
+            profile.fan_schedule = self.fan_schedule.fork()
+        return profile
+    
+    def _follow_log(self, data, source):
+        """Fill in the curve, stage times, preheat and (optionally) fan curve from a roast log; keys in data win"""
+        settings = dict(data["source_log"])
+        path = os.path.join(os.path.dirname(source or ""), settings.pop("path"))
+        try:
+            followed = load_log_profile_data(path, **settings)
+        except (OSError, ValueError) as e:
+            raise ProfileError(f"{source or 'profile'}: cannot follow roast log: {e}") from None
+        followed.update((key, value) for key, value in data.items() if key != "source_log")
+        errors = validate_profile(followed)
+        if errors:
+            raise ProfileError(f"{source or 'profile'}: roast log {path}: " + "; ".join(errors))
+        self.source_log = path
+        return followed
     
     def interpolate_setpoint(self, elapsed):
         """Interpolate target temperature for given elapsed time"""
-        if not self.profile_data or elapsed <= self.profile_data[0][0]:
-            return self.profile_data[0][1] if self.profile_data else 60.0
-        
-        for i in range(1, len(self.profile_data)):
-            t0, temp0 = self.profile_data[i - 1]
-            t1, temp1 = self.profile_data[i]
-            if elapsed <= t1:
-                ratio = (elapsed - t0) / (t1 - t0)
-                return temp0 + ratio * (temp1 - temp0)
-        
-        return self.profile_data[-1][1]
\ No newline at end of file
+        return self.trajectory.setpoint(elapsed)
+    
+    def target_rate_of_rise(self, elapsed):
+        """Target rate of rise (°C/min) for given elapsed time"""
+        return self.trajectory.rate_of_rise(elapsed)
\ No newline at end of file
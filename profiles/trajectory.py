@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import copy
+import math
+from bisect import bisect_right
+
+INTERPOLATIONS = ("linear", "monotone_cubic")
+
+class SetpointTrajectory:
+    """
+    Roast profile compiled into per-segment cubic coefficients.
+
+    Each segment stores temp(t) = a + b*dt + c*dt^2 + d*dt^3 with dt = t - t0
+    (c = d = 0 for linear). Lookups remember the last segment, so the usual
+    monotonically increasing elapsed time costs O(1); random access falls back
+    to bisect.
+    """
+    def __init__(self, points, interpolation="linear"):
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation '{interpolation}' (expected one of {', '.join(INTERPOLATIONS)})")
+        self.interpolation = interpolation
+
+        # Later points win on duplicate times, so every segment has a non-zero width
+        merged = {}
+        for t, temp in points:
+            merged[float(t)] = float(temp)
+        self.times = sorted(merged)
+        self.temps = [merged[t] for t in self.times]
+        self.coefficients = self._compile()
+        self.cursor = 0
+
+    def fork(self):
+        """A trajectory sharing the compiled segments with its own lookup cursor (one per roast)"""
+        trajectory = copy.copy(self)
+        trajectory.cursor = 0
+        return trajectory
+
+    def _compile(self):
+        times, temps = self.times, self.temps
+        n = len(times)
+        if n < 2:
+            return []
+        widths = [times[i + 1] - times[i] for i in range(n - 1)]
+        slopes = [(temps[i + 1] - temps[i]) / widths[i] for i in range(n - 1)]
+
+        if self.interpolation == "linear":
+            return [(temps[i], slopes[i], 0.0, 0.0) for i in range(n - 1)]
+
+        # Fritsch-Carlson knot derivatives keep the curve monotone between points (no overshoot)
+        derivatives = [slopes[0]] + [0.0] * (n - 2) + [slopes[-1]]
+        for i in range(1, n - 1):
+            s0, s1 = slopes[i - 1], slopes[i]
+            if s0 * s1 > 0:
+                w0 = 2 * widths[i] + widths[i - 1]
+                w1 = widths[i] + 2 * widths[i - 1]
+                derivatives[i] = (w0 + w1) / (w0 / s0 + w1 / s1)
+
+        coefficients = []
+        for i in range(n - 1):
+            h, m0, m1, s = widths[i], derivatives[i], derivatives[i + 1], slopes[i]
+            c = (3 * s - 2 * m0 - m1) / h
+            d = (m0 + m1 - 2 * s) / (h * h)
+            coefficients.append((temps[i], m0, c, d))
+        return coefficients
+
+    def _segment(self, elapsed):
+        i = self.cursor
+        times = self.times
+        if times[i] <= elapsed < times[i + 1]:
+            return i
+        if i + 2 < len(times) and times[i + 1] <= elapsed < times[i + 2]:
+            self.cursor = i + 1
+            return self.cursor
+        self.cursor = min(max(bisect_right(times, elapsed) - 1, 0), len(times) - 2)
+        return self.cursor
+
+    def setpoint(self, elapsed):
+        """Target temperature (°C) at elapsed seconds"""
+        if not self.times:
+            return 60.0
+        if elapsed <= self.times[0]:
+            return self.temps[0]
+        if elapsed >= self.times[-1]:
+            return self.temps[-1]
+        i = self._segment(elapsed)
+        a, b, c, d = self.coefficients[i]
+        dt = elapsed - self.times[i]
+        return a + dt * (b + dt * (c + dt * d))
+
+    def rate_of_rise(self, elapsed):
+        """Analytic target rate of rise (°C/min) at elapsed seconds"""
+        if len(self.times) < 2 or elapsed < self.times[0] or elapsed >= self.times[-1]:
+            return 0.0
+        i = self._segment(elapsed)
+        _, b, c, d = self.coefficients[i]
+        dt = elapsed - self.times[i]
+        return (b + dt * (2 * c + dt * 3 * d)) * 60.0
+
+
+class FeedforwardTrajectory:
+    """
+    Heater duty that makes an identified plant follow a setpoint trajectory,
+    tabulated once when the profile is compiled.
+
+    Inverting the first-order-plus-dead-time model
+    dT/dt = (ambient + gain * duty(t - dead_time) - T) / time_constant
+    along the target curve r gives
+    duty(t) = (time_constant * r'(t + dead_time) + r(t + dead_time) - ambient) / gain,
+    clipped to 0-1. Lookups interpolate the table linearly, so a control step
+    pays an index and a few flops.
+    """
+    def __init__(self, trajectory, plant_model, step=0.5):
+        gain = plant_model["gain"]
+        time_constant = plant_model["time_constant"]
+        dead_time = plant_model.get("dead_time", 0.0)
+        ambient = plant_model.get("ambient", 25.0)
+        self.step = step
+        self.inverse_step = 1.0 / step
+
+        end = trajectory.times[-1] if trajectory.times else 0.0
+        self.duties = []
+        for k in range(int(math.ceil(end / step)) + 1):
+            # Ask for the temperature dead_time ahead: that is when this step's heat arrives
+            t = k * step + dead_time
+            rate = trajectory.rate_of_rise(t) / 60.0
+            duty = (time_constant * rate + trajectory.setpoint(t) - ambient) / gain
+            self.duties.append(min(max(duty, 0.0), 1.0))
+        self.last = len(self.duties) - 1
+
+    def duty(self, elapsed):
+        """Feedforward heater duty (0-1) at elapsed seconds"""
+        x = elapsed * self.inverse_step
+        if x <= 0:
+            return self.duties[0]
+        i = int(x)
+        if i >= self.last:
+            return self.duties[self.last]
+        low = self.duties[i]
+        return low + (x - i) * (self.duties[i + 1] - low)
+
+
+class FanSchedule:
+    """
+    Fan-speed curve compiled like the temperature curve and quantized to step_pct,
+    so small movements along the curve do not each become a power supply command.
+    """
+    def __init__(self, points, step_pct=5.0):
+        self.trajectory = SetpointTrajectory(points, "linear")
+        self.step_pct = step_pct
+
+    def fork(self):
+        """A schedule sharing the compiled curve with its own lookup cursor"""
+        schedule = copy.copy(self)
+        schedule.trajectory = self.trajectory.fork()
+        return schedule
+
+    def speed(self, elapsed):
+        """Quantized fan speed (%) for the given elapsed roast time"""
+        raw = self.trajectory.setpoint(elapsed)
+        quantized = round(raw / self.step_pct) * self.step_pct
+        return int(min(max(quantized, 0.0), 100.0))
@@ -4,78 +4,219 @@ import threading
 from controller.ssr import SSRController
 from controller.temperature import TemperatureController
 from controller.fan import FanController
+from controller.watchdog import Watchdog, WatchdogTripped
 from utils.logging import RoastLogger
-from utils.helpers import get_roast_stage, get_stage_duration, advance_roast_stage, format_elapsed_time, reset_roast_stage
-from profiles.profile_loader import RoastProfile
+from utils.helpers import StageTracker, format_elapsed_time
+from controller.stage_detection import StageDetector
+from utils.timing import PeriodicTimer, SystemClock
+from utils.instrumentation import LoopProfiler, MetricsExporter
+from utils.telemetry import TelemetryRing, TelemetryServer
+from utils.startup import StartupReport, bring_up
+from utils.console import console, post
+from utils.dashboard import LineDashboard, CursesDashboard
+from profiles.profile_loader import RoastProfile, MAX_TEMP_C
 
 class RoastController:
-    def __init__(self, ssr_pin=26, roast_profile_file=None, log_file="roast_log.csv"):
+    # Background sampling runs on its own thread; the asyncio runtime schedules it as a task instead
+    threaded_sampling = True
+    
+    def __init__(self, ssr_pin=26, roast_profile_file=None, log_file="roast_log.csv", ssr_backend="gpio",
+                 profile=None, ssr=None, temp_controller=None, fan=None, logger=None, clock=None, dashboard="line",
+                 metrics_file=None, metrics_port=None, iio_device=0, fan_channel=1, psu_address=None, keyboard=True,
+                 psu_serial=None, telemetry_port=None, telemetry_host="127.0.0.1", telemetry_multicast=None,
+                 watchdog=True, watchdog_deadline=None, max_temp=MAX_TEMP_C):
+        self.startup = StartupReport()
         # Load profile first to get PID gains and PWM period
-        self.profile = RoastProfile(roast_profile_file)
+        self.profile = profile or self.startup.run("profile", lambda: RoastProfile(roast_profile_file))
+        # A reloaded profile waiting to be swapped in at the start of the next step
+        self.next_profile = self.profile
+        self.clock = clock or SystemClock()
+        self.dashboard_mode = dashboard
+        self.dashboard = None
+        # Local terminal input; off when keys arrive another way (e.g. from the multi-roaster supervisor)
+        self.keyboard = keyboard
         
-        self.ssr = SSRController(ssr_pin, self.profile.pwm_period)
-        self.temp_controller = TemperatureController(
-            pwm_period=self.profile.pwm_period,
-            pid_gains=self.profile.pid_gains
-        )
-        self.logger = RoastLogger(log_file, self.profile.name)
-        self.fan = FanController()
+        # Hardware components can be injected (e.g. by the simulator); otherwise the real devices are
+        # brought up concurrently, so GPIO and the sensor are ready while the power supply is still on USB
+        steps = {}
+        if ssr is None:
+            steps["ssr"] = (lambda: SSRController(ssr_pin, self.profile.pwm_period, backend=ssr_backend),
+                            lambda ssr: ssr.cleanup())
+        if temp_controller is None:
+            steps["sensor"] = (lambda: self._create_temperature_controller(iio_device),
+                               lambda temp_controller: temp_controller.close())
+        if fan is None:
+            steps["power supply"] = (lambda: FanController(channel=fan_channel, resource_address=psu_address,
+                                                           serial=psu_serial),
+                                     lambda fan: fan.shutdown())
+        if ssr is None and watchdog:
+            # Cuts the heater from another process if the steps stop (default: two missed periods)
+            deadline = watchdog_deadline or 2.0 * max(self.profile.pwm_period, self.profile.control_period)
+            steps["watchdog"] = (lambda: self._start_watchdog(ssr_pin, ssr_backend, deadline, max_temp),
+                                 lambda watchdog: watchdog.stop())
+        hardware = bring_up(steps, self.startup)
+        self.ssr = ssr or hardware["ssr"]
+        self.temp_controller = temp_controller or hardware["sensor"]
+        self.fan = fan or hardware["power supply"]
+        self.watchdog = hardware.get("watchdog")
+        if self.watchdog:
+            self.ssr.interlock = self.watchdog.tripped
+        self.loop_timer = PeriodicTimer(self.profile.control_period, self.clock.monotonic, self.clock.sleep)
+        self.logger = logger or self.startup.run("logger", lambda: RoastLogger(log_file, self.profile.name))
+        
+        # Per-phase latency; steps longer than one PWM window count as overruns
+        self.profiler = LoopProfiler(self.profile.control_period, overrun_s=self.profile.pwm_period)
+        self.metrics_exporter = None
+        if metrics_file or metrics_port:
+            self.metrics_exporter = MetricsExporter(self.profiler, metrics_file, metrics_port,
+                                                    collect=self._collect_metrics)
+            self.metrics_exporter.start()
+        
+        # Live telemetry: the control step only appends to the ring; the server streams it on its own thread
+        self.telemetry = None
+        self.telemetry_server = None
+        if telemetry_port is not None:
+            self.telemetry = TelemetryRing()
+            self.telemetry_server = TelemetryServer(self.telemetry, telemetry_host, telemetry_port,
+                                                    multicast=telemetry_multicast)
+            self.telemetry_server.start()
         
         self.running = False
+        # shutdown() can arrive from the control, keyboard, dashboard or supervisor thread at once
+        self._shutdown_lock = threading.Lock()
         self.start_time = None
         self.roast_start_time = None
         self.preheat_complete = False
         self.temp_offset = 0.0
         self.manual_fan_speed = None
+        self.fan_speed = None
+        self.last_fan_command = None
+        self.stages = StageTracker()
+        
+        # Optional automatic stage detection: "assist" reports detected stages, "auto" also advances to them
+        self.stage_detector = None
+        self.stage_detection_mode = None
+        if self.profile.stage_detection:
+            settings = dict(self.profile.stage_detection)
+            self.stage_detection_mode = settings.pop("mode", "assist")
+            self.stage_detector = StageDetector(**settings)
+        
+        # Latest state for the dashboard; replaced (never mutated) once per step
+        self.status = None
+        
+        self.startup.finish()
+        if steps:
+            post(self.startup.report())
+    
+    def _start_watchdog(self, ssr_pin, ssr_backend, deadline, max_temp):
+        watchdog = Watchdog(ssr_pin, ssr_backend, deadline, max_temp)
+        watchdog.start()
+        return watchdog
+    
+    def _create_temperature_controller(self, iio_device):
+        temp_controller = TemperatureController(
+            pwm_period=self.profile.pwm_period,
+            pid_gains=self.profile.pid_gains,
+            acquisition=self.profile.acquisition,
+            iio_device=iio_device
+        )
+        if self.profile.sensing:
+            temp_controller.start_sampling(**self.profile.sensing, threaded=self.threaded_sampling)
+        return temp_controller
     
     def control_step(self):
         """Execute one control step"""
-        roast_elapsed = time.time() - self.roast_start_time if self.roast_start_time else 0
+        profiler = self.profiler
+        profiler.start_step(self.clock.monotonic())
+        if self.next_profile is not self.profile:
+            self._swap_profile(self.next_profile)
+        roast_elapsed = self.clock.time() - self.roast_start_time if self.roast_start_time else 0
         
         # Update setpoint from profile if available
         if self.profile.profile_data:
             base_target = self.profile.interpolate_setpoint(roast_elapsed)
             target_temp = base_target + self.temp_offset
             self.temp_controller.set_target(target_temp)
+        if self.profile.feedforward:
+            self.temp_controller.set_feedforward(self.profile.feedforward.duty(roast_elapsed))
+        if self.profile.fan_schedule and self.manual_fan_speed is None:
+            self._follow_fan_schedule(roast_elapsed)
+        profiler.lap("setpoint")
         
         # Read temperature and calculate output
         current_temp = self.temp_controller.read_temperature()
+        if self.watchdog and self.watchdog.beat(current_temp):
+            self._watchdog_tripped()
+        profiler.lap("sensor")
         on_time = self.temp_controller.calculate_output(current_temp)
-        stage = get_roast_stage()
-        stage_duration = get_stage_duration(time.time())
+        profiler.lap("pid")
+        if self.stage_detector:
+            for event in self.stage_detector.update(roast_elapsed, current_temp):
+                self._on_stage_event(event)
+        stage = self.stages.current()
+        stage_duration = self.stages.duration(self.clock.time())
+        profiler.lap("stage")
         
-        # Console output
-        mmss = format_elapsed_time(roast_elapsed)
-        stage_mmss = format_elapsed_time(stage_duration)
-        print(f"\rElapsed: {mmss} | Stage: {stage} ({stage_mmss}) | Temp: {current_temp:.2f}°C | "
-              f"Target: {self.temp_controller.setpoint:.2f}°C | SSR ON: {on_time:.2f}s")
+        # Publish state for the dashboard (rendered on its own thread)
+        self.status = {
+            "stage": stage, "elapsed": roast_elapsed, "stage_elapsed": stage_duration,
+            "temp": current_temp, "target": self.temp_controller.setpoint, "on_time": on_time,
+            "ror": self.temp_controller.rate_of_rise(), "target_ror": self.profile.target_rate_of_rise(roast_elapsed),
+            "fan": self.fan_speed, "offset": self.temp_offset,
+        }
+        if self.telemetry:
+            self.telemetry.append_status(self.status, self.clock.time())
+        profiler.lap("display")
         
         # Log data
-        self.logger.log_step(roast_elapsed, stage, stage_duration, self.temp_controller.setpoint, current_temp, on_time)
+        self.logger.log_step(roast_elapsed, stage, stage_duration, self.temp_controller.setpoint, current_temp, on_time,
+                             self.fan_speed)
+        profiler.lap("log")
         
-        # Control SSR
-        self.ssr.control_output(on_time)
+        # Control SSR (picked up by the PWM thread at its next window)
+        self.ssr.set_duty(on_time)
+        profiler.lap("ssr")
+        profiler.end_step()
     
     def preheat_step(self, target_temp):
         """Execute one preheat control step"""
-        elapsed = time.time() - self.start_time if self.start_time else 0
+        profiler = self.profiler
+        profiler.start_step(self.clock.monotonic())
+        if self.next_profile is not self.profile:
+            self._swap_profile(self.next_profile)
+        elapsed = self.clock.time() - self.start_time if self.start_time else 0
         current_temp = self.temp_controller.read_temperature()
+        if self.watchdog and self.watchdog.beat(current_temp):
+            self._watchdog_tripped()
+        profiler.lap("sensor")
         on_time = self.temp_controller.calculate_output(current_temp)
+        profiler.lap("pid")
         
-        # Console output
-        mmss = format_elapsed_time(elapsed)
-        print(f"\rElapsed: {mmss} | Stage: Preheating ({mmss}) | Temp: {current_temp:.2f}°C | "
-              f"Target: {target_temp:.1f}°C | SSR ON: {on_time:.2f}s")
+        # Publish state for the dashboard (rendered on its own thread)
+        self.status = {
+            "stage": "Preheating", "elapsed": elapsed, "stage_elapsed": elapsed,
+            "temp": current_temp, "target": target_temp, "on_time": on_time,
+            "ror": self.temp_controller.rate_of_rise(), "target_ror": None,
+            "fan": self.fan_speed, "offset": 0.0,
+        }
+        if self.telemetry:
+            self.telemetry.append_status(self.status, self.clock.time())
+        profiler.lap("display")
         
         # Log preheat data (no stage duration for preheating)
-        self.logger.log_step(elapsed, "Preheating", elapsed, target_temp, current_temp, on_time)
+        self.logger.log_step(elapsed, "Preheating", elapsed, target_temp, current_temp, on_time, self.fan_speed)
+        profiler.lap("log")
         
-        self.ssr.control_output(on_time)
+        self.ssr.set_duty(on_time)
+        profiler.lap("ssr")
+        profiler.end_step()
         return current_temp >= target_temp - 2.0  # Within 2°C tolerance
     
     def start(self):
         """Start the roasting control loop"""
         self.running = True
+        self.start_dashboard()
+        self.ssr.start()
         
         try:
             # Preheat phase if configured
@@ -86,57 +227,71 @@ class RoastController:
             if not self.running:
                 return
             
-            # Start roast timer when beans drop
-            self.roast_start_time = time.time()
-                
-            reset_roast_stage(time.time())  # Reset stage tracking for new roast
-            self.fan.set_speed(100)  # Set fan to 100% for roasting
-            print(f"[INFO] Starting roast phase for '{self.profile.name}'")
-            print(f"[INFO] Controls: 1-9=Fan%, 0=100%, +/-=Temp±5°C, ENTER=Next Stage, r=Reset, q=Quit")
+            self.begin_roast()
             
-            # Start keyboard thread for roast controls
-            keyboard_thread = threading.Thread(target=self.keyboard_loop)
-            keyboard_thread.daemon = True
-            keyboard_thread.start()
+            # Start keyboard thread for roast controls (curses reads keys itself)
+            if self.keyboard and self.dashboard_mode != "curses":
+                keyboard_thread = threading.Thread(target=self.keyboard_loop)
+                keyboard_thread.daemon = True
+                keyboard_thread.start()
             
+            self.loop_timer.reset()
             while self.running:
                 self.control_step()
+                self.loop_timer.wait()
         except KeyboardInterrupt:
-            print("\n[INFO] KeyboardInterrupt detected - stopping roast...")
+            post("[INFO] KeyboardInterrupt detected - stopping roast...")
         except Exception as e:
-            print(f"[ERROR] {e}")
+            post(f"[ERROR] {e}")
         finally:
             self.shutdown()
     
-    def preheat_phase(self):
-        """Handle preheat phase"""
+    def begin_roast(self):
+        """Start the roast timer and stage tracking when the beans drop"""
+        self.roast_start_time = self.clock.time()
+        self.stages.reset(self.clock.time())  # Reset stage tracking for new roast
+        if self.stage_detector:
+            self.stage_detector.reset()
+        self.set_fan_speed(self.roast_fan_speed(0.0))
+        mode = " with feedforward control" if self.profile.feedforward else ""
+        post(f"[INFO] Starting roast phase for '{self.profile.name}'{mode}")
+        post(f"[INFO] Controls: 1-9=Fan%, 0=100%, +/-=Temp±5°C, ENTER=Next Stage, r=Reset, q=Quit")
+    
+    def begin_preheat(self):
+        """Set the preheat target and start timing; returns the preheat temperature"""
         preheat_temp = self.profile.preheat["temp_c"]
         self.temp_controller.set_target(preheat_temp)
-        self.fan.set_speed(100)  # Start fan at 100% for heating
-        print(f"[INFO] Starting preheat to {preheat_temp}°C... Press ENTER when beans are dropped.")
+        self.set_fan_speed(self.profile.preheat_fan_pct)  # Full airflow while heating unless the profile says otherwise
+        post(f"[INFO] Starting preheat to {preheat_temp}°C... Press ENTER when beans are dropped.")
         
         # Start timing from preheat
-        self.start_time = time.time()
+        self.start_time = self.clock.time()
+        return preheat_temp
+    
+    def preheat_phase(self):
+        """Handle preheat phase"""
+        preheat_temp = self.begin_preheat()
         
-        # Start bean drop thread
-        input_thread = threading.Thread(target=self.wait_for_bean_drop)
-        input_thread.daemon = True
-        input_thread.start()
+        # Start bean drop thread (curses reads keys itself)
+        if self.keyboard and self.dashboard_mode != "curses":
+            input_thread = threading.Thread(target=self.wait_for_bean_drop)
+            input_thread.daemon = True
+            input_thread.start()
         
         # Continue heating until target reached or user presses enter
         target_reached = False
+        self.loop_timer.reset()
         while self.running and not self.preheat_complete:
             if self.preheat_step(preheat_temp) and not target_reached:
-                self.fan.set_speed(20)  # Reduce to 20% when target reached
+                self.set_fan_speed(self.profile.preheat_hold_fan_pct)  # Reduce airflow once the target is reached
                 target_reached = True
+            self.loop_timer.wait()
     
     def wait_for_bean_drop(self):
         """Wait for ENTER during preheat"""
         try:
             input()
-            if self.running:
-                self.preheat_complete = True
-                print("[INFO] Beans dropped! Starting roast profile...")
+            self.drop_beans()
         except (EOFError, KeyboardInterrupt):
             self.shutdown()
     
@@ -152,56 +307,190 @@ class RoastController:
             tty.setraw(sys.stdin.fileno())
             while self.running:
                 if select.select([sys.stdin], [], [], 0.1)[0]:
-                    key = sys.stdin.read(1)
-                    if ord(key) == 3:  # Ctrl+C
-                        self.shutdown()
-                        break
-                    elif ord(key) == 13:  # ENTER
-                        new_stage = advance_roast_stage(time.time())
-                        print(f"\n[STAGE] Advanced to: {new_stage}")
-                    else:
-                        self.handle_keypress(key)
+                    self.handle_key(sys.stdin.read(1))
         except:
             pass
         finally:
             termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
     
+    def drop_beans(self):
+        """End preheat and start the roast profile"""
+        if self.running and not self.preheat_complete:
+            self.preheat_complete = True
+            post("[INFO] Beans dropped! Starting roast profile...")
+    
+    def handle_key(self, key):
+        """Dispatch a single key from the terminal or the dashboard"""
+        if ord(key) == 3:  # Ctrl+C
+            self.shutdown()
+        elif key == '\r':  # ENTER
+            if self.profile.preheat and not self.preheat_complete:
+                self.drop_beans()
+            elif self.roast_start_time:
+                new_stage = self.stages.advance(self.clock.time())
+                post(f"[STAGE] Advanced to: {new_stage}{self._reference_stage_note(new_stage)}")
+        elif self.roast_start_time:
+            self.handle_keypress(key)
+    
+    def submit_key(self, key):
+        """Deliver a key from another thread (the curses dashboard or a supervisor command)"""
+        self.handle_key(key)
+    
     def handle_keypress(self, key):
         """Process keyboard input for real-time adjustments"""
         if key in '123456789':
             fan_speed = int(key) * 10
             self.manual_fan_speed = fan_speed
-            self.fan.set_speed(fan_speed)
-            print(f"[MANUAL] Fan speed: {fan_speed}%")
+            self.set_fan_speed(fan_speed)
+            post(f"[MANUAL] Fan speed: {fan_speed}%")
         elif key == '0':
             self.manual_fan_speed = 100
-            self.fan.set_speed(100)
-            print(f"[MANUAL] Fan speed: 100%")
+            self.set_fan_speed(100)
+            post(f"[MANUAL] Fan speed: 100%")
         elif key == '+':
             self.temp_offset += 5.0
-            print(f"[MANUAL] Temp offset: {self.temp_offset:+.1f}°C")
+            post(f"[MANUAL] Temp offset: {self.temp_offset:+.1f}°C")
         elif key == '-':
             self.temp_offset -= 5.0
-            print(f"[MANUAL] Temp offset: {self.temp_offset:+.1f}°C")
+            post(f"[MANUAL] Temp offset: {self.temp_offset:+.1f}°C")
         elif key == 'r':
             self.temp_offset = 0.0
             self.manual_fan_speed = None
-            self.fan.set_speed(100)
-            print(f"[MANUAL] Reset - Fan: 100%, Temp offset: 0°C")
+            fan_speed = self.roast_fan_speed(self.clock.time() - self.roast_start_time)
+            self.set_fan_speed(fan_speed)
+            post(f"[MANUAL] Reset - Fan: {fan_speed}%{' (schedule)' if self.profile.fan_schedule else ''}, Temp offset: 0°C")
         elif key == 'q':
-            print(f"[MANUAL] Quit requested")
+            post(f"[MANUAL] Quit requested")
             self.shutdown()
     
+    def _on_stage_event(self, event):
+        """Report a detected stage and, in auto mode, move the stage tracker to it"""
+        post(f"[STAGE] Detected {event.stage} at {event.time:.0f}s, {event.temp:.1f}°C, "
+             f"confidence {event.confidence:.2f} ({event.reason})")
+        if self.stage_detection_mode == "auto" and event.stage in self.stages.stages:
+            new_stage = self.stages.advance_to(event.stage, self.clock.time())
+            post(f"[STAGE] Advanced to: {new_stage}{self._reference_stage_note(new_stage)}")
+    
+    def _reference_stage_note(self, stage):
+        """How the stage's timing compares with the reference roast the profile was taken from"""
+        reference = self.profile.stage_times.get(stage)
+        if reference is None or not self.roast_start_time:
+            return ""
+        elapsed = self.clock.time() - self.roast_start_time
+        return f" (reference roast {format_elapsed_time(reference)}, {elapsed - reference:+.0f}s)"
+    
+    def _watchdog_tripped(self):
+        """The watchdog has already cut the heater; abort the step so the roast shuts down"""
+        stats = self.watchdog.stats()
+        raise WatchdogTripped(f"Watchdog tripped ({self.watchdog.trip_reason()}): heater forced off "
+                              f"{stats['reaction_s'] * 1000:.1f}ms after the fault - stopping roast")
+    
+    def reload_profile(self, profile):
+        """Use a new profile from the next control step on; safe to call from any thread"""
+        self.next_profile = profile
+    
+    def _swap_profile(self, profile):
+        """Switch curve and PID gains between steps; loop timing and sensing keep their startup settings"""
+        previous = self.profile
+        self.profile = profile
+        if profile.pid_gains != previous.pid_gains:
+            self.temp_controller.pid.tunings = profile.pid_gains
+        if previous.feedforward and not profile.feedforward:
+            self.temp_controller.set_feedforward(0.0)
+        post(f"[PROFILE] Reloaded '{profile.name}': {len(profile.profile_data)} points, PID {profile.pid_gains}, "
+             f"{profile.control_mode} control")
+        fixed = [key for key in ("pwm_period", "control_period", "acquisition", "sensing")
+                 if getattr(profile, key) != getattr(previous, key)]
+        if fixed:
+            post(f"[PROFILE] Changes to {', '.join(fixed)} take effect on the next roast")
+    
+    def roast_fan_speed(self, roast_elapsed):
+        """Fan speed the profile asks for during the roast (100% without a fan curve)"""
+        if self.profile.fan_schedule:
+            return self.profile.fan_schedule.speed(roast_elapsed)
+        return 100
+    
+    def _follow_fan_schedule(self, roast_elapsed):
+        """Command the scheduled speed only when its quantized value changes, at most once per min_interval_s"""
+        speed = self.profile.fan_schedule.speed(roast_elapsed)
+        if speed == self.fan_speed:
+            return
+        now = self.clock.monotonic()
+        if self.last_fan_command is not None and now - self.last_fan_command < self.profile.fan_min_interval:
+            return
+        self.set_fan_speed(speed)
+    
+    def set_fan_speed(self, percentage):
+        """Command the fan and record how long the call blocked the caller"""
+        started = time.perf_counter_ns()
+        self.fan.set_speed(percentage)
+        self.fan_speed = percentage
+        self.last_fan_command = self.clock.monotonic()
+        self.profiler.record("fan_command", time.perf_counter_ns() - started)
+    
+    def _collect_metrics(self):
+        """Refresh metrics that live outside the profiler before export"""
+        stats = self.ssr.timing_stats()
+        self.profiler.extra_metrics.update({
+            "ssr_cycles_total": stats["cycles"],
+            "ssr_missed_cycles_total": stats["missed_cycles"],
+            "ssr_cycle_error_max_seconds": stats["max_error_s"],
+            "ssr_cycle_error_mean_seconds": stats["mean_error_s"],
+        })
+        if self.watchdog:
+            watchdog = self.watchdog.stats()
+            self.profiler.extra_metrics.update({
+                "watchdog_tripped": watchdog["tripped"],
+                "watchdog_reaction_seconds": watchdog["reaction_s"],
+                "watchdog_poll_gap_max_seconds": watchdog["max_poll_gap_s"],
+            })
+        worker = getattr(self.fan, "worker", None)
+        if worker:
+            self.profiler.extra_metrics.update({
+                "psu_connected": int(worker.connected),
+                "psu_disconnects_total": worker.disconnects,
+                "psu_reconnects_total": worker.reconnects,
+                "psu_probe_failures_total": worker.probe_failures,
+            })
+    
+    def start_dashboard(self):
+        """Start rendering status off the control thread"""
+        if self.dashboard_mode == "curses":
+            self.dashboard = CursesDashboard(lambda: self.status, on_key=self.submit_key)
+        elif self.dashboard_mode == "line":
+            self.dashboard = LineDashboard(lambda: self.status)
+        if self.dashboard:
+            self.dashboard.start()
+    
     def shutdown(self):
         """Shutdown the controller safely"""
-        if not self.running:
-            return
+        with self._shutdown_lock:
+            if not self.running:
+                return
+            self.running = False
         
-        print("[INFO] Shutting down controller...")
-        self.running = False
+        post("[INFO] Shutting down controller...")
         self.ssr.turn_off()
+        if self.watchdog:
+            self.watchdog.stop()
+            watchdog = self.watchdog.stats()
+            post(f"[INFO] Watchdog: {watchdog['polls']} polls, max poll gap {watchdog['max_poll_gap_s'] * 1000:.1f}ms"
+                 + (f", tripped with {watchdog['reaction_s'] * 1000:.1f}ms reaction" if watchdog["tripped"] else ""))
+        stats = self.ssr.timing_stats()
+        post(f"[INFO] SSR timing: {stats['cycles']} cycles, {stats['missed_cycles']} missed, "
+              f"max error {stats['max_error_s'] * 1000:.1f}ms, mean {stats['mean_error_s'] * 1000:.2f}ms")
         self.ssr.cleanup()
+        post(self.profiler.report())
+        if self.metrics_exporter:
+            self._collect_metrics()
+            self.metrics_exporter.stop()
+        if self.telemetry_server:
+            self.telemetry_server.stop()
         self.fan.shutdown()
+        self.temp_controller.close()
         self.logger.close()
-        print(f"[INFO] System shut down safely. SSR OFF. Log saved.")
+        if self.dashboard:
+            self.dashboard.stop()
+        post(f"[INFO] System shut down safely. SSR OFF. Log saved.")
+        console.flush()
     
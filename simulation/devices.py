@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+class VirtualClock:
+    """
+    Simulated time source. sleep() returns immediately after advancing the
+    plant, so a roast runs as fast as the control code can execute.
+    """
+    def __init__(self, plant, ssr, fan, epoch=1_700_000_000.0):
+        self.plant = plant
+        self.ssr = ssr
+        self.fan = fan
+        self.epoch = epoch
+        self.now = 0.0
+
+    def time(self):
+        return self.epoch + self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        self.plant.advance(seconds, self.ssr.duty(), self.fan.current)
+        self.now += seconds
+
+
+class SimSSR:
+    """Stands in for SSRController; the plant sees the window-averaged duty"""
+    def __init__(self, pwm_period=0.5):
+        self.pwm_period = pwm_period
+        self.on_time = 0.0
+        self.windows = 0
+        self.switches = 0
+
+    def duty(self):
+        return min(max(self.on_time / self.pwm_period, 0.0), 1.0)
+
+    def start(self):
+        """No PWM thread: the virtual clock averages the duty over each window"""
+
+    def set_duty(self, on_time):
+        self.on_time = on_time
+        self.windows += 1
+        # A partial window switches the SSR on and off once each
+        if 0 < on_time < self.pwm_period:
+            self.switches += 2
+
+    def control_output(self, on_time):
+        self.set_duty(on_time)
+
+    def timing_stats(self):
+        return {"cycles": self.windows, "missed_cycles": 0, "last_error_s": 0.0, "max_error_s": 0.0, "mean_error_s": 0.0}
+
+    def turn_off(self):
+        self.on_time = 0.0
+
+    def cleanup(self):
+        self.turn_off()
+
+
+class SimTemperatureSource:
+    """Temperature source for TemperatureController reading the plant's probe"""
+    def __init__(self, plant):
+        self.plant = plant
+
+    def read(self):
+        return self.plant.sensor_temperature()
+
+    def reopen(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SimFan:
+    """Stands in for FanController; fan current drives the plant's airflow losses"""
+    def __init__(self, max_current=1.0):
+        self.max_current = max_current
+        self.speed = 0
+        self.current = 0.0
+
+    def available(self):
+        return True
+
+    def set_speed(self, percentage):
+        self.speed = percentage
+        self.current = percentage / 100.0 * self.max_current
+
+    def applied_current(self):
+        return self.current
+
+    def shutdown(self):
+        self.set_speed(0)
+
+
+class MemoryLogger:
+    """RoastLogger replacement that keeps raw records in memory"""
+    def __init__(self):
+        self.records = []
+
+    def log_step(self, elapsed, stage, stage_duration, target_temp, actual_temp, on_time, fan=None):
+        self.records.append((elapsed, stage, stage_duration, target_temp, actual_temp, on_time, fan))
+
+    def close(self):
+        pass
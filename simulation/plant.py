@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import random
+from collections import deque
+
+class ThermalModel:
+    """
+    Lumped thermal model of a hot-air roaster.
+
+    The heater warms the air/drum node, which loses heat to ambient through the
+    chamber walls and through the airflow (proportional to fan current) and
+    transfers heat to the bean mass once beans are charged. The probe sits in
+    the bean mass and reads a blend of air and bean temperature through a
+    first-order lag. Heater power reaches the air after a fixed dead time.
+    """
+    def __init__(self, heater_power=1200.0, dead_time=1.5, air_capacity=250.0,
+                 bean_mass=150.0, bean_specific_heat=1.5, bean_transfer=6.0,
+                 wall_loss=1.5, fan_loss=3.0, max_fan_current=1.0,
+                 probe_bean_weight=0.6, probe_time_constant=2.0,
+                 ambient=25.0, noise=0.0, seed=None, step=0.1):
+        """
+        Args:
+            heater_power (float): Heater power at 100% duty (W)
+            dead_time (float): Transport delay from heater to air (s)
+            air_capacity (float): Heat capacity of air, drum and heater body (J/K)
+            bean_mass (float): Charge weight (g)
+            bean_specific_heat (float): Bean specific heat (J/g/K)
+            bean_transfer (float): Air-to-bean heat transfer coefficient (W/K)
+            wall_loss (float): Loss to ambient through the chamber with the fan off (W/K)
+            fan_loss (float): Additional loss at full fan current (W/K)
+            max_fan_current (float): Fan current treated as full airflow (A)
+            probe_bean_weight (float): Share of bean temperature in the probe reading after charge
+            probe_time_constant (float): Probe lag (s)
+            ambient (float): Ambient and initial temperature (°C)
+            noise (float): Standard deviation of probe noise (°C)
+            seed (int, optional): Seed for reproducible noise
+            step (float): Integration step (s)
+        """
+        self.heater_power = heater_power
+        self.air_capacity = air_capacity
+        self.bean_capacity = bean_mass * bean_specific_heat
+        self.bean_transfer = bean_transfer
+        self.wall_loss = wall_loss
+        self.fan_loss = fan_loss
+        self.max_fan_current = max_fan_current
+        self.probe_bean_weight = probe_bean_weight
+        self.probe_time_constant = probe_time_constant
+        self.ambient = ambient
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.step_size = step
+
+        self.delay_line = deque([0.0] * max(int(round(dead_time / step)), 0))
+        self.time = 0.0
+        self.air_temp = ambient
+        self.bean_temp = ambient
+        self.probe_temp = ambient
+        self.beans_loaded = False
+
+    def charge_beans(self):
+        """Drop a room-temperature charge into the roaster"""
+        self.beans_loaded = True
+        self.bean_temp = self.ambient
+
+    def step(self, dt, duty, fan_current):
+        """Integrate one step with the given heater duty (0-1) and fan current (A)"""
+        if self.delay_line:
+            self.delay_line.append(duty)
+            duty = self.delay_line.popleft()
+
+        airflow = min(max(fan_current / self.max_fan_current, 0.0), 1.0)
+        q_heater = self.heater_power * duty
+        q_loss = (self.wall_loss + self.fan_loss * airflow) * (self.air_temp - self.ambient)
+        q_beans = self.bean_transfer * (self.air_temp - self.bean_temp) if self.beans_loaded else 0.0
+
+        self.air_temp += dt * (q_heater - q_loss - q_beans) / self.air_capacity
+        if self.beans_loaded:
+            self.bean_temp += dt * q_beans / self.bean_capacity
+            probe_target = self.probe_bean_weight * self.bean_temp + (1 - self.probe_bean_weight) * self.air_temp
+        else:
+            probe_target = self.air_temp
+        self.probe_temp += dt / self.probe_time_constant * (probe_target - self.probe_temp)
+        self.time += dt
+
+    def advance(self, seconds, duty, fan_current):
+        """Integrate over an interval in fixed steps"""
+        while seconds > 1e-12:
+            dt = min(self.step_size, seconds)
+            self.step(dt, duty, fan_current)
+            seconds -= dt
+
+    def sensor_temperature(self):
+        """Current probe reading (°C)"""
+        if self.noise:
+            return self.probe_temp + self.random.gauss(0.0, self.noise)
+        return self.probe_temp
+
+
+class FOPDTModel:
+    """
+    First-order-plus-dead-time model identified from roast logs.
+
+    dT/dt = (ambient + gain * duty - T) / time_constant, with duty delayed by
+    dead_time. Fan effects are folded into the fitted parameters. Dropping the
+    beans lowers the probe reading by charge_drop.
+    """
+    def __init__(self, gain=300.0, time_constant=90.0, dead_time=2.0, ambient=25.0,
+                 charge_drop=0.0, step=0.1):
+        self.gain = gain
+        self.time_constant = time_constant
+        self.ambient = ambient
+        self.charge_drop = charge_drop
+        self.step_size = step
+        self.delay_line = deque([0.0] * max(int(round(dead_time / step)), 0))
+        self.time = 0.0
+        self.temp = ambient
+        self.beans_loaded = False
+
+    def charge_beans(self):
+        self.beans_loaded = True
+        self.temp -= self.charge_drop
+
+    def step(self, dt, duty, fan_current):
+        if self.delay_line:
+            self.delay_line.append(duty)
+            duty = self.delay_line.popleft()
+        self.temp += dt * (self.ambient + self.gain * duty - self.temp) / self.time_constant
+        self.time += dt
+
+    def advance(self, seconds, duty, fan_current):
+        while seconds > 1e-12:
+            dt = min(self.step_size, seconds)
+            self.step(dt, duty, fan_current)
+            seconds -= dt
+
+    def sensor_temperature(self):
+        return self.temp
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import json
+import math
+import sys
+import time
+from roast_controller import RoastController
+from controller.temperature import TemperatureController
+from profiles.profile_loader import RoastProfile
+from utils.analytics import DEFAULT_PWM_PERIOD
+from utils.logging import CSVLogWriter
+from utils.console import console, post
+from .plant import ThermalModel, FOPDTModel
+from .devices import VirtualClock, SimSSR, SimTemperatureSource, SimFan, MemoryLogger
+
+# Simulated seconds to reach the preheat temperature before giving up (a plant too weak to get there)
+DEFAULT_PREHEAT_TIMEOUT = 1800.0
+
+class SimulatedRoastController(RoastController):
+    """RoastController on simulated hardware and a virtual clock; beans drop automatically"""
+    def __init__(self, profile, plant=None, preheat_hold=30.0, roast_duration=None,
+                 preheat_timeout=DEFAULT_PREHEAT_TIMEOUT, **kwargs):
+        self.plant = plant or ThermalModel()
+        ssr = SimSSR(profile.pwm_period)
+        fan = SimFan()
+        clock = VirtualClock(self.plant, ssr, fan)
+        temp_controller = TemperatureController(
+            pwm_period=profile.pwm_period,
+            pid_gains=profile.pid_gains,
+            source=SimTemperatureSource(self.plant),
+            time_fn=clock.monotonic
+        )
+        kwargs.setdefault("dashboard", None)
+        super().__init__(profile=profile, ssr=ssr, temp_controller=temp_controller, fan=fan,
+                         logger=kwargs.pop("logger", None) or MemoryLogger(), clock=clock, **kwargs)
+        self.preheat_hold = preheat_hold
+        self.roast_duration = roast_duration if roast_duration is not None else profile.profile_data[-1][0]
+        self.preheat_reached_at = None
+        self.preheat_timeout = preheat_timeout
+        self.preheat_timed_out = False
+
+    def wait_for_bean_drop(self):
+        """Bean drop is triggered by preheat_step after preheat_hold seconds at temperature"""
+
+    def keyboard_loop(self):
+        """No keyboard in simulation"""
+
+    def preheat_step(self, target_temp):
+        reached = super().preheat_step(target_temp)
+        now = self.clock.monotonic()
+        if reached and self.preheat_reached_at is None:
+            self.preheat_reached_at = now
+        if self.preheat_reached_at is None and self.clock.time() - self.start_time >= self.preheat_timeout:
+            self.preheat_timed_out = True
+            post(f"[ERROR] Preheat did not reach {target_temp}°C within {self.preheat_timeout:.0f}s of simulated time")
+            self.shutdown()
+        if self.preheat_reached_at is not None and now - self.preheat_reached_at >= self.preheat_hold:
+            self.preheat_complete = True
+        return reached
+
+    def control_step(self):
+        if not self.plant.beans_loaded:
+            self.plant.charge_beans()
+        super().control_step()
+        if self.clock.time() - self.roast_start_time >= self.roast_duration:
+            self.shutdown()
+
+
+# The charge and turning point are not tracking; metrics start this many seconds after the drop
+DEFAULT_SETTLE_TIME = 60.0
+
+def _discard(message):
+    pass
+
+
+def summarize(records, ssr=None, settle_time=DEFAULT_SETTLE_TIME, pwm_period=None):
+    """
+    Tracking metrics over the roast phase of logged records, skipping the first settle_time seconds.
+    pwm_period defaults to the SSR's; on_time is per PWM window but logged once per control step.
+    """
+    roast = [r for r in records if r[1] != "Preheating" and r[0] >= settle_time]
+    if not roast:
+        return {}
+    if pwm_period is None:
+        pwm_period = getattr(ssr, "pwm_period", DEFAULT_PWM_PERIOD)
+    errors = [r[4] - r[3] for r in roast]
+    summary = {
+        "steps": len(roast),
+        "rms_error_C": math.sqrt(sum(e * e for e in errors) / len(errors)),
+        "mean_abs_error_C": sum(abs(e) for e in errors) / len(errors),
+        "max_overshoot_C": max(0.0, max(errors)),
+        "ssr_on_time_s": sum(r0[5] * (r1[0] - r0[0]) for r0, r1 in zip(roast, roast[1:])) / pwm_period,
+    }
+    if ssr is not None and hasattr(ssr, "switches"):
+        summary["ssr_switches"] = ssr.switches
+    return summary
+
+
+def load_profile(profile_file, control_mode=None):
+    """Load a profile JSON, optionally overriding its control_mode (e.g. to compare against PID only)"""
+    with open(profile_file) as f:
+        data = json.load(f)
+    if control_mode:
+        data["control_mode"] = control_mode
+    return RoastProfile.from_data(data, profile_file)
+
+
+def run_simulation(profile, plant=None, preheat_hold=30.0, roast_duration=None, log_file=None,
+                   settle_time=DEFAULT_SETTLE_TIME):
+    """
+    Run a full preheat and roast against the thermal model.
+
+    Args:
+        profile (RoastProfile or str): Loaded profile or path to a profile JSON
+        plant (ThermalModel, optional): Plant to simulate; defaults to ThermalModel()
+        preheat_hold (float): Seconds at preheat temperature before the beans drop
+        roast_duration (float, optional): Roast length after drop; defaults to the last profile point
+        log_file (str, optional): Write the run in the usual CSV log layout
+        settle_time (float): Seconds after drop left out of the summary
+
+    Returns:
+        tuple: (summary dict, SimulatedRoastController)
+
+    Raises:
+        RuntimeError: The plant never reached the preheat temperature
+    """
+    if isinstance(profile, str):
+        profile = RoastProfile(profile)
+    controller = SimulatedRoastController(profile, plant, preheat_hold, roast_duration)
+    controller.start()
+    if controller.preheat_timed_out:
+        raise RuntimeError(f"Preheat to {profile.preheat['temp_c']}°C timed out after "
+                           f"{controller.preheat_timeout:.0f}s of simulated time; the plant cannot reach it")
+
+    if log_file:
+        with open(log_file, "w", newline="") as f:
+            CSVLogWriter(f, profile.name).write_rows(controller.logger.records)
+    return summarize(controller.logger.records, controller.ssr, settle_time), controller
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a roast profile against the simulated roaster")
+    parser.add_argument("profile", help="Roast profile JSON")
+    parser.add_argument("--duration", type=float, default=None, help="Roast length after bean drop (s)")
+    parser.add_argument("--preheat-hold", type=float, default=30.0, help="Seconds at preheat temperature before drop")
+    parser.add_argument("--noise", type=float, default=0.0, help="Probe noise standard deviation (°C)")
+    parser.add_argument("--log", default=None, help="Write a CSV log of the simulated roast")
+    parser.add_argument("--settle-time", type=float, default=DEFAULT_SETTLE_TIME,
+                        help="Seconds after drop excluded from the summary (charge and turning point)")
+    parser.add_argument("--fitted-plant", action="store_true",
+                        help="Simulate the profile's plant_model (FOPDT) instead of the thermal model")
+    parser.add_argument("--control-mode", choices=("pid", "feedforward"), default=None,
+                        help="Override the profile's control_mode")
+    parser.add_argument("--compare", action="store_true",
+                        help="Run PID only and feedforward (needs a plant_model) and compare tracking")
+    args = parser.parse_args()
+
+    def plant(profile):
+        if args.fitted_plant:
+            if not profile.plant_model:
+                parser.error("--fitted-plant needs a profile with a plant_model")
+            return FOPDTModel(**profile.plant_model)
+        return ThermalModel(noise=args.noise, seed=0)
+
+    if args.compare:
+        if not load_profile(args.profile, "pid").plant_model:
+            parser.error("--compare needs a profile with a plant_model")
+        summaries = {}
+        console.sink = _discard
+        for mode in ("pid", "feedforward"):
+            profile = load_profile(args.profile, mode)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    summaries[mode], _ = run_simulation(profile, plant(profile), args.preheat_hold, args.duration,
+                                                        settle_time=args.settle_time)
+            except RuntimeError as e:
+                print(f"[ERROR] {mode}: {e}")
+                sys.exit(1)
+        print(f"  {'':<20}{'pid':>12}{'feedforward':>14}")
+        for key, value in summaries["pid"].items():
+            other = summaries["feedforward"][key]
+            if isinstance(value, float):
+                print(f"  {key:<20}{value:12.3f}{other:14.3f}")
+            else:
+                print(f"  {key:<20}{value:12}{other:14}")
+        return
+
+    started = time.perf_counter()
+    profile = load_profile(args.profile, args.control_mode)
+    try:
+        summary, _ = run_simulation(profile, plant(profile), args.preheat_hold, args.duration, args.log,
+                                    args.settle_time)
+    except RuntimeError as e:
+        console.flush()
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    wall = time.perf_counter() - started
+
+    print(f"[INFO] Simulated roast finished in {wall:.3f}s wall time")
+    for key, value in summary.items():
+        print(f"  {key}: {value:.3f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
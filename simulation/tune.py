@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from profiles.profile_loader import RoastProfile
+from utils.console import console
+from utils.logging import read_log
+from .plant import FOPDTModel
+from .run import SimulatedRoastController, summarize, DEFAULT_SETTLE_TIME
+
+GAIN_FACTORS = (0.5, 0.75, 1.0, 1.5, 2.0)
+
+def _solve(matrix, vector):
+    """Solve a small dense linear system by Gaussian elimination with partial pivoting"""
+    n = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            raise ValueError("Singular system - logs do not excite the plant enough to fit")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, n + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * n
+    for i in reversed(range(n)):
+        solution[i] = (rows[i][n] - sum(rows[i][c] * solution[c] for c in range(i + 1, n))) / rows[i][i]
+    return solution
+
+
+def split_segments(records):
+    """Split log records into contiguous runs (preheat and roast restart the elapsed clock)"""
+    segments = []
+    current = []
+    for record in records:
+        if current and (record[0] <= current[-1][0] or (record[1] == "Preheating") != (current[-1][1] == "Preheating")):
+            segments.append(current)
+            current = []
+        current.append(record)
+    if current:
+        segments.append(current)
+    return segments
+
+
+def fit_plant(log_files, pwm_period, max_dead_time=10.0, skip_after_drop=30.0):
+    """
+    Fit a first-order-plus-dead-time model to roast logs.
+
+    Least squares on dT/dt = (ambient - T)/tau + (gain/tau) * duty(t - dead_time),
+    accumulated as 3x3 normal equations, for each candidate dead time; the dead
+    time with the smallest residual wins.
+
+    Returns:
+        dict: FOPDTModel parameters plus the fit residual
+    """
+    segments = []
+    charge_drops = []
+    for path in log_files:
+        _, records = read_log(path)
+        parts = split_segments(records)
+        for i, segment in enumerate(parts):
+            preheat = segment[0][1] == "Preheating"
+            if not preheat and i > 0 and parts[i - 1][0][1] == "Preheating":
+                early = [r[4] for r in segment if r[0] <= 60.0]
+                if early:
+                    charge_drops.append(parts[i - 1][-1][4] - min(early))
+            if not preheat:
+                segment = [r for r in segment if r[0] >= skip_after_drop]
+            if len(segment) > 2:
+                segments.append(segment)
+    if not segments:
+        raise ValueError("No usable log data to fit")
+
+    steps = sorted(b[0] - a[0] for segment in segments for a, b in zip(segment, segment[1:]))
+    dt = steps[len(steps) // 2]
+
+    best = None
+    for delay in range(int(max_dead_time / dt) + 1):
+        xtx = [[0.0] * 3 for _ in range(3)]
+        xty = [0.0] * 3
+        count = 0
+        for segment in segments:
+            for k in range(delay, len(segment) - 1):
+                step = segment[k + 1][0] - segment[k][0]
+                if step <= 0:
+                    continue
+                temp = segment[k][4]
+                duty = segment[k - delay][5] / pwm_period
+                x = (1.0, temp, duty)
+                y = (segment[k + 1][4] - temp) / step
+                for i in range(3):
+                    xty[i] += x[i] * y
+                    for j in range(3):
+                        xtx[i][j] += x[i] * x[j]
+                count += 1
+        if count < 10:
+            break
+        try:
+            alpha, beta, gamma = _solve(xtx, xty)
+        except ValueError:
+            continue
+        if beta >= 0:
+            continue  # not a stable first-order response
+
+        residual = 0.0
+        for segment in segments:
+            for k in range(delay, len(segment) - 1):
+                step = segment[k + 1][0] - segment[k][0]
+                if step <= 0:
+                    continue
+                predicted = alpha + beta * segment[k][4] + gamma * segment[k - delay][5] / pwm_period
+                residual += ((segment[k + 1][4] - segment[k][4]) / step - predicted) ** 2
+        residual /= count
+        if best is None or residual < best[0]:
+            best = (residual, delay, alpha, beta, gamma)
+
+    if best is None:
+        raise ValueError("Could not fit a stable plant model to the logs")
+    residual, delay, alpha, beta, gamma = best
+    time_constant = -1.0 / beta
+    return {
+        "gain": gamma * time_constant,
+        "time_constant": time_constant,
+        "dead_time": delay * dt,
+        "ambient": alpha * time_constant,
+        "charge_drop": max(0.0, sum(charge_drops) / len(charge_drops)) if charge_drops else 0.0,
+        "residual": residual,
+    }
+
+
+def _discard(message):
+    pass
+
+
+def _plant_model(plant_params):
+    """Fitted parameters as a profile's plant_model"""
+    return {k: round(v, 3) for k, v in plant_params.items() if k != "residual"}
+
+
+def evaluate_gains(args):
+    """Simulate one candidate; runs in a worker process"""
+    profile_data, source, plant_params, gains, pwm_period, settle_time, weights = args
+    # Compiled from scratch as write_tuned_profile would write it, so the feedforward table
+    # follows the fitted plant and the control period (a distinct control_period is kept)
+    candidate = RoastProfile.from_data(
+        dict(profile_data, pid_gains=list(gains), pwm_period=pwm_period, plant_model=_plant_model(plant_params)),
+        source
+    )
+
+    plant = FOPDTModel(**{k: v for k, v in plant_params.items() if k != "residual"})
+    console.sink = _discard
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller = SimulatedRoastController(candidate, plant)
+        controller.start()
+    summary = summarize(controller.logger.records, controller.ssr, settle_time)
+    if not summary:
+        return float("inf"), gains, pwm_period, summary
+
+    minutes = summary["steps"] * candidate.control_period / 60.0
+    summary["ssr_switches_per_min"] = summary.get("ssr_switches", 0) / minutes if minutes else 0.0
+    score = (summary["rms_error_C"]
+             + weights["overshoot"] * summary["max_overshoot_C"]
+             + weights["wear"] * summary["ssr_switches_per_min"])
+    return score, gains, pwm_period, summary
+
+
+def search_gains(profile, plant_params, pwm_periods=None, factors=GAIN_FACTORS, settle_time=DEFAULT_SETTLE_TIME,
+                 overshoot_weight=0.5, wear_weight=0.01, workers=None):
+    """
+    Grid-search PID gains around the profile's current gains in a process pool.
+
+    Returns:
+        list: (score, gains, pwm_period, summary) sorted best first
+    """
+    kp, ki, kd = profile.pid_gains
+    weights = {"overshoot": overshoot_weight, "wear": wear_weight}
+    candidates = [
+        (profile.data, profile.source, plant_params, (kp * fp, ki * fi, kd * fd), period, settle_time, weights)
+        for fp, fi, fd in itertools.product(factors, repeat=3)
+        for period in (pwm_periods or [profile.pwm_period])
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(evaluate_gains, candidates, chunksize=4))
+    results.sort(key=lambda r: r[0])
+    return results
+
+
+def write_tuned_profile(profile_file, output_file, gains, pwm_period, plant_params):
+    """Copy a profile JSON with new gains, PWM period and the fitted plant model"""
+    with open(profile_file) as f:
+        data = json.load(f)
+    data["name"] = f"{data.get('name', '')} (tuned)".strip()
+    data["pid_gains"] = [round(g, 3) for g in gains]
+    data["pwm_period"] = pwm_period
+    data["plant_model"] = _plant_model(plant_params)
+    with open(output_file, "w") as f:
+        f.write(format_profile_json(data))
+
+
+def format_profile_json(data):
+    """Serialize a profile in the layout of the hand-written profiles (one curve point per line)"""
+    lines = []
+    for key, value in data.items():
+        if isinstance(value, list) and value and isinstance(value[0], list):
+            points = ",\n".join(f"    {json.dumps(point)}" for point in value)
+            text = f"[\n{points}\n  ]"
+        elif isinstance(value, dict):
+            text = json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        else:
+            text = json.dumps(value, ensure_ascii=False)
+        lines.append(f"  {json.dumps(key)}: {text}")
+    return "{\n" + ",\n".join(lines) + "\n}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the roaster from logs and tune PID gains in simulation")
+    parser.add_argument("profile", help="Roast profile JSON to tune")
+    parser.add_argument("logs", nargs="+", help="Roast logs (*-roast.csv or *.rlog) to fit the plant model")
+    parser.add_argument("--output", default=None, help="Tuned profile path (default: <profile>_tuned.json)")
+    parser.add_argument("--pwm-periods", type=float, nargs="*", default=None, help="PWM periods to try")
+    parser.add_argument("--settle-time", type=float, default=DEFAULT_SETTLE_TIME,
+                        help="Seconds after drop excluded from scoring")
+    parser.add_argument("--overshoot-weight", type=float, default=0.5)
+    parser.add_argument("--wear-weight", type=float, default=0.01, help="Score per SSR switch per minute")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    profile = RoastProfile(args.profile)
+    plant_params = fit_plant(args.logs, profile.pwm_period)
+    print(f"[INFO] Plant: gain {plant_params['gain']:.1f}°C, tau {plant_params['time_constant']:.1f}s, "
+          f"dead time {plant_params['dead_time']:.1f}s, ambient {plant_params['ambient']:.1f}°C, "
+          f"charge drop {plant_params['charge_drop']:.1f}°C")
+
+    results = search_gains(profile, plant_params, args.pwm_periods, settle_time=args.settle_time,
+                           overshoot_weight=args.overshoot_weight, wear_weight=args.wear_weight,
+                           workers=args.workers)
+    score, gains, pwm_period, summary = results[0]
+    print(f"[INFO] Evaluated {len(results)} candidates")
+    print(f"[INFO] Best gains {tuple(round(g, 3) for g in gains)} @ {pwm_period}s: score {score:.3f}, "
+          f"RMS {summary['rms_error_C']:.2f}°C, overshoot {summary['max_overshoot_C']:.2f}°C, "
+          f"{summary['ssr_switches_per_min']:.1f} switches/min")
+
+    output = args.output or os.path.splitext(args.profile)[0] + "_tuned.json"
+    write_tuned_profile(args.profile, output, gains, pwm_period, plant_params)
+    print(f"[INFO] Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
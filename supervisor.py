@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import multiprocessing
+import queue
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from utils.console import console, post
+from utils.dashboard import format_status
+
+# Supervisor command words; anything else is passed through as a single key (1-9, 0, +, -, r)
+COMMAND_KEYS = {"drop": "\r", "enter": "\r", "next": "\r", "quit": "q", "stop": "\x03"}
+STOP_KEY = "\x03"
+
+def load_roasters(config_file):
+    """Read and check the roaster list; each roaster must own distinct hardware"""
+    with open(config_file) as f:
+        roasters = json.load(f)["roasters"]
+
+    def unique(label, keys):
+        keys = [k for k in keys if k is not None]
+        duplicates = {k for k in keys if keys.count(k) > 1}
+        if duplicates:
+            raise ValueError(f"Roasters share {label}: {sorted(map(str, duplicates))}")
+
+    for spec in roasters:
+        if "name" not in spec or "profile" not in spec:
+            raise ValueError(f"Roaster entry needs 'name' and 'profile': {spec}")
+    unique("a name", [spec["name"] for spec in roasters])
+    unique("an SSR pin", [spec.get("ssr_pin", 26) for spec in roasters])
+    unique("an IIO device", [spec.get("iio_device", 0) for spec in roasters])
+    # Each roaster process opens its own VISA session, and the SPD1168X has a single channel,
+    # so supplies cannot be shared; with several roasters each must say which supply is its own
+    if len(roasters) > 1:
+        unnamed = [spec["name"] for spec in roasters if not spec.get("psu_address") and not spec.get("psu_serial")]
+        if unnamed:
+            raise ValueError(f"Roasters need a psu_address or psu_serial: {unnamed}")
+    unique("a power supply address", [spec.get("psu_address") for spec in roasters])
+    unique("a power supply serial", [spec.get("psu_serial") for spec in roasters])
+    # pigpio transmits one waveform at a time per host
+    if sum(spec.get("ssr_backend") == "pigpio" for spec in roasters) > 1:
+        raise ValueError("Only one roaster can use the pigpio SSR backend")
+    return roasters
+
+
+def run_roaster(spec, log_file, commands, events, status_interval=1.0):
+    """Worker process entry point: runs one RoastController, taking keys from commands and reporting on events"""
+    name = spec["name"]
+    console.sink = lambda message: events.put(("message", name, message))
+    # Ctrl+C is handled by the supervisor, which stops each roaster in turn; SIGTERM stops this one
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    from roast_controller import RoastController
+    from async_controller import AsyncRoastController
+    controller_class = AsyncRoastController if spec.get("runtime") == "asyncio" else RoastController
+    controller = None
+    try:
+        controller = controller_class(
+            ssr_pin=spec.get("ssr_pin", 26),
+            roast_profile_file=spec["profile"],
+            log_file=log_file,
+            ssr_backend=spec.get("ssr_backend", "gpio"),
+            iio_device=spec.get("iio_device", 0),
+            fan_channel=spec.get("fan_channel", 1),
+            psu_address=spec.get("psu_address"),
+            psu_serial=spec.get("psu_serial"),
+            dashboard=None,
+            keyboard=False,
+        )
+        relay = threading.Thread(target=_relay, args=(controller, commands, events, name, status_interval),
+                                 name="supervisor-relay")
+        relay.daemon = True
+        relay.start()
+        events.put(("started", name, log_file))
+        controller.start()
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        post(f"[ERROR] {e}")
+    finally:
+        if controller:
+            controller.shutdown()
+        console.flush()
+        events.put(("exited", name, None))
+
+
+def _relay(controller, commands, events, name, status_interval):
+    """Hand supervisor keys to the controller and publish its status snapshot"""
+    last = None
+    while True:
+        try:
+            key = commands.get(timeout=status_interval)
+        except queue.Empty:
+            key = None
+        if key is not None:
+            controller.submit_key(key)
+        status = controller.status
+        if status is not None and status is not last:
+            events.put(("status", name, status))
+            last = status
+
+
+class Supervisor:
+    """
+    Runs several roasters on one host, each RoastController in its own process.
+
+    A slow or failing device only stalls the process that owns it. Keys are sent
+    to a roaster through its command queue; messages and status snapshots from
+    every roaster arrive on one event queue and are printed (and optionally
+    written to an event log) with the roaster's name.
+    """
+    def __init__(self, roasters, event_log=None, status_interval=1.0):
+        self.roasters = roasters
+        self.event_log = event_log
+        self.status_interval = status_interval
+        self.context = multiprocessing.get_context("spawn")
+        self.events = self.context.Queue()
+        self.workers = {}
+        self.commands = {}
+        self.status = {}
+        self.exited = set()
+        self._log_fh = None
+
+    def start(self):
+        timestamp = datetime.now().strftime("%y-%m-%d-%H%M%S")
+        if self.event_log:
+            self._log_fh = open(self.event_log, "a")
+        for spec in self.roasters:
+            name = spec["name"]
+            log_file = spec.get("log_file") or f"{timestamp}-{name}-roast.csv"
+            self.commands[name] = self.context.Queue()
+            worker = self.context.Process(target=run_roaster, name=f"roaster-{name}",
+                                          args=(spec, log_file, self.commands[name], self.events,
+                                                self.status_interval))
+            worker.start()
+            self.workers[name] = worker
+        post(f"[INFO] Supervising {len(self.workers)} roasters: {', '.join(self.workers)}")
+        post("[INFO] Commands: <name|all> <drop|1-9|0|+|-|r|next|quit|stop>, 'status'")
+
+    def send(self, target, command):
+        """Send a command word or key to one roaster, or to all"""
+        key = COMMAND_KEYS.get(command, command)
+        names = list(self.workers) if target == "all" else [target]
+        for name in names:
+            if name not in self.commands:
+                post(f"[WARN] Unknown roaster '{name}'")
+            elif name not in self.exited:
+                self.commands[name].put(key)
+
+    def handle_line(self, line):
+        words = line.split()
+        if not words:
+            return
+        if words == ["status"]:
+            for name, status in sorted(self.status.items()):
+                post(f"[{name}] {format_status(status)}")
+        elif len(words) == 2:
+            self.send(*words)
+        else:
+            post(f"[WARN] Expected '<name|all> <command>', got: {line.strip()}")
+
+    def _read_stdin(self):
+        for line in sys.stdin:
+            self.handle_line(line)
+
+    def _record(self, name, text):
+        lines = str(text).split("\n")
+        post("\n".join(f"[{name}] {line}" for line in lines))
+        if self._log_fh:
+            stamp = datetime.now().isoformat(timespec="milliseconds")
+            for line in lines:
+                self._log_fh.write(f"{stamp} {name} {line}\n")
+
+    def _handle_event(self, event):
+        kind, name, payload = event
+        if kind == "message":
+            self._record(name, payload)
+        elif kind == "status":
+            self.status[name] = payload
+            self._record(name, format_status(payload))
+        elif kind == "started":
+            self._record(name, f"started (pid {self.workers[name].pid}), logging to {payload}")
+        elif kind == "exited":
+            self.exited.add(name)
+
+    def _check_workers(self):
+        """Notice workers that died without reporting (e.g. killed)"""
+        for name, worker in self.workers.items():
+            if name not in self.exited and not worker.is_alive():
+                self.exited.add(name)
+                self._record(name, f"[ERROR] Worker exited unexpectedly (code {worker.exitcode})")
+
+    def run(self):
+        """Dispatch events until every roaster has exited"""
+        reader = threading.Thread(target=self._read_stdin, name="supervisor-stdin")
+        reader.daemon = True
+        reader.start()
+        try:
+            while len(self.exited) < len(self.workers):
+                try:
+                    self._handle_event(self.events.get(timeout=1.0))
+                except queue.Empty:
+                    self._check_workers()
+        except KeyboardInterrupt:
+            post("[INFO] KeyboardInterrupt detected - stopping all roasters...")
+        finally:
+            self.stop()
+
+    def stop(self, timeout=15.0):
+        """Stop every roaster, escalating to SIGTERM and then SIGKILL for any that do not exit"""
+        self.send("all", STOP_KEY)
+        deadline = time.monotonic() + timeout
+        for name, worker in self.workers.items():
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                post(f"[WARN] Roaster '{name}' did not stop in time; terminating")
+                worker.terminate()
+                worker.join(5.0)
+            if worker.is_alive():
+                worker.kill()
+                worker.join()
+        # Drain whatever the workers reported while stopping
+        while True:
+            try:
+                self._handle_event(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if self._log_fh:
+            self._log_fh.close()
+            self._log_fh = None
+        console.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several roasters from one host")
+    parser.add_argument("config", help="JSON file with a 'roasters' list")
+    parser.add_argument("--event-log", default=None, help="Append every roaster's messages to this file")
+    parser.add_argument("--status-interval", type=float, default=1.0, help="Seconds between status reports")
+    args = parser.parse_args()
+
+    supervisor = Supervisor(load_roasters(args.config), args.event_log, args.status_interval)
+    supervisor.start()
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
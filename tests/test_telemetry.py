@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import threading
+import unittest
+from utils.telemetry import TelemetryRing
+
+def append(ring, n):
+    # elapsed carries the sequence number, so a record can be checked against the row it came from
+    ring.append(1000.0 + n, float(n), 180.0, 180.0, 0.25, None, 40, "Drying")
+
+
+class TelemetryRingTest(unittest.TestCase):
+    def assert_intact(self, records):
+        for record in records:
+            self.assertEqual(record["elapsed"], record["seq"])
+            self.assertEqual(record["t"], 1000.0 + record["seq"])
+
+    def test_since_after_lapping(self):
+        ring = TelemetryRing(size=8)
+        for n in range(20):
+            append(ring, n)
+        records, end = ring.since(0)
+        self.assertEqual(end, 20)
+        self.assertEqual([r["seq"] for r in records], list(range(13, 20)))
+        self.assert_intact(records)
+
+        records, end = ring.since(17)
+        self.assertEqual([r["seq"] for r in records], [17, 18, 19])
+        records, end = ring.since(0, limit=2)
+        self.assertEqual([r["seq"] for r in records], [18, 19])
+
+    def test_row_being_written_is_not_returned(self):
+        ring = TelemetryRing(size=8)
+        for n in range(20):
+            append(ring, n)
+        # A writer half way through the next append: its row holds the oldest record, seq not yet bumped
+        row = (ring.seq % ring.size) * ring.width
+        ring.data[row] = 1000.0 + ring.seq
+        records, _ = ring.since(0)
+        self.assertNotIn(ring.seq - ring.size, [r["seq"] for r in records])
+        self.assert_intact(records)
+
+    def test_concurrent_writer(self):
+        ring = TelemetryRing(size=16)
+        stop = threading.Event()
+
+        def writer():
+            n = 0
+            while not stop.is_set():
+                append(ring, n)
+                n += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            next_seq = 0
+            for _ in range(2000):
+                records, end = ring.since(next_seq)
+                self.assert_intact(records)
+                seqs = [r["seq"] for r in records]
+                self.assertEqual(seqs, sorted(set(seqs)))
+                self.assertTrue(all(next_seq <= seq < end for seq in seqs))
+                next_seq = end
+        finally:
+            stop.set()
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
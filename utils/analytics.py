@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import math
+import os
+import pickle
+from array import array
+from datetime import datetime
+from controller.sensing import RateOfRise
+from utils.console import console, post
+from utils.helpers import format_elapsed_time
+from utils.logging import read_log
+
+LOG_PATTERNS = ("*-roast.csv", "*-roast.rlog")
+INDEX_FILE = ".roast_index.pickle"
+INDEX_VERSION = 2
+# Logs do not record the PWM window; this is the profile default
+DEFAULT_PWM_PERIOD = 0.5
+
+class RoastColumns:
+    """Columnar view of one roast log, preheat rows split from roast rows"""
+    def __init__(self, records):
+        self.elapsed = array('d')
+        self.stage_duration = array('d')
+        self.target = array('d')
+        self.actual = array('d')
+        self.on_time = array('d')
+        self.stage_codes = array('B')
+        self.stage_names = []
+        self.preheat_rows = 0
+        self.preheat_elapsed = 0.0
+
+        codes = {}
+        for elapsed, stage, stage_duration, target, actual, on_time in records:
+            if stage == "Preheating":
+                self.preheat_rows += 1
+                self.preheat_elapsed = elapsed
+                continue
+            if stage not in codes:
+                codes[stage] = len(self.stage_names)
+                self.stage_names.append(stage)
+            self.elapsed.append(elapsed)
+            self.stage_duration.append(stage_duration)
+            self.target.append(target)
+            self.actual.append(actual)
+            self.on_time.append(on_time)
+            self.stage_codes.append(codes[stage])
+
+    def __len__(self):
+        return len(self.elapsed)
+
+
+def roast_timestamp(path):
+    """Roast start time from a main.py log name (YY-MM-DD-HHMMSS-roast.csv), or None"""
+    try:
+        return datetime.strptime(os.path.basename(path)[:15], "%y-%m-%d-%H%M%S")
+    except ValueError:
+        return None
+
+
+def ror_curve(elapsed, temps, window_s=30.0, resolution_s=5.0):
+    """Rate of rise (°C/min) sampled every resolution_s seconds"""
+    estimator = RateOfRise(window_s)
+    curve = array('d')
+    times = array('d')
+    next_sample = 0.0
+    for t, temp in zip(elapsed, temps):
+        ror = estimator.update(t, temp)
+        if ror is not None and t >= next_sample:
+            times.append(t)
+            curve.append(ror)
+            next_sample = t + resolution_s
+    return times, curve
+
+
+def compute_metrics(path, profile_name, columns, pwm_period=DEFAULT_PWM_PERIOD):
+    """Per-roast summary metrics from a RoastColumns (pwm_period: the SSR window the roast ran with)"""
+    n = len(columns)
+    metrics = {
+        "path": path,
+        "file": os.path.basename(path),
+        "timestamp": roast_timestamp(path),
+        "profile": profile_name,
+        "preheat_s": columns.preheat_elapsed,
+        "roast_s": columns.elapsed[-1] if n else 0.0,
+        "stages": {},
+        "rms_error_C": None,
+        "max_error_C": None,
+        "ssr_on_s": 0.0,
+        "ror_times": array('d'),
+        "ror_curve": array('d'),
+        "peak_ror": None,
+    }
+    if n < 2:
+        return metrics
+
+    # Time spent per stage: each row's interval is attributed to that row's stage
+    durations = [0.0] * len(columns.stage_names)
+    elapsed = columns.elapsed
+    for code, t0, t1 in zip(columns.stage_codes, elapsed, elapsed[1:]):
+        durations[code] += t1 - t0
+    metrics["stages"] = dict(zip(columns.stage_names, durations))
+
+    # on_time is per PWM window but logged once per control step, so integrate the duty over each step
+    metrics["ssr_on_s"] = sum(on_time * (t1 - t0) for on_time, t0, t1
+                              in zip(columns.on_time, elapsed, elapsed[1:])) / pwm_period
+
+    errors = [actual - target for actual, target in zip(columns.actual, columns.target)]
+    metrics["rms_error_C"] = math.sqrt(sum(e * e for e in errors) / n)
+    metrics["max_error_C"] = max(map(abs, errors))
+
+    times, curve = ror_curve(elapsed, columns.actual)
+    metrics["ror_times"], metrics["ror_curve"] = times, curve
+    # Skip the turning point right after the charge when reporting peak RoR
+    settled = [ror for t, ror in zip(times, curve) if t >= 60.0]
+    metrics["peak_ror"] = max(settled) if settled else None
+    return metrics
+
+
+class RoastLogIndex:
+    """
+    Metrics for every roast log in a directory, cached on disk keyed by file mtime and size.
+
+    refresh() only reparses logs that are new or changed since the last run, so
+    queries over a large log directory only pay for loading the index.
+    """
+    def __init__(self, log_dir=".", patterns=LOG_PATTERNS, cache_file=None, pwm_period=DEFAULT_PWM_PERIOD):
+        self.log_dir = log_dir
+        self.pwm_period = pwm_period
+        self.patterns = patterns
+        self.cache_file = cache_file or os.path.join(log_dir, INDEX_FILE)
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.entries = data["entries"]
+
+    def _save(self):
+        tmp = self.cache_file + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": INDEX_VERSION, "entries": self.entries},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.cache_file)
+
+    def log_files(self):
+        files = set()
+        for pattern in self.patterns:
+            files.update(glob.glob(os.path.join(self.log_dir, pattern)))
+        return sorted(files)
+
+    def refresh(self):
+        """Reparse new or changed logs and drop deleted ones; returns (parsed, removed) counts"""
+        parsed = 0
+        current = {}
+        for path in self.log_files():
+            stat = os.stat(path)
+            key = (stat.st_mtime_ns, stat.st_size, self.pwm_period)
+            entry = self.entries.get(path)
+            if entry is None or entry["key"] != key:
+                try:
+                    profile_name, records = read_log(path)
+                except (OSError, ValueError) as e:
+                    post(f"[WARN] Skipping unreadable log {path}: {e}")
+                    continue
+                entry = {"key": key, "metrics": compute_metrics(path, profile_name, RoastColumns(records),
+                                                                self.pwm_period)}
+                parsed += 1
+            current[path] = entry
+
+        removed = len(set(self.entries) - set(current))
+        if parsed or removed or not os.path.exists(self.cache_file):
+            self.entries = current
+            self._save()
+        return parsed, removed
+
+    def roasts(self, profile=None, since=None):
+        """Metrics for indexed roasts, optionally filtered by profile name (substring) and start date"""
+        results = []
+        for entry in self.entries.values():
+            metrics = entry["metrics"]
+            if profile and profile.lower() not in (metrics["profile"] or "").lower():
+                continue
+            if since and (metrics["timestamp"] is None or metrics["timestamp"] < since):
+                continue
+            results.append(metrics)
+        results.sort(key=lambda m: (m["timestamp"] or datetime.min, m["file"]))
+        return results
+
+    def columns(self, path):
+        """Full column data for one log (parsed on demand, not cached)"""
+        _, records = read_log(path)
+        return RoastColumns(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize roast logs")
+    parser.add_argument("log_dir", nargs="?", default=".", help="Directory containing *-roast.csv logs")
+    parser.add_argument("--profile", default=None, help="Only roasts whose profile name contains this text")
+    parser.add_argument("--since", default=None, help="Only roasts on or after YYYY-MM-DD")
+    parser.add_argument("--heater-power", type=float, default=None, help="Heater power (W) to report energy in kWh")
+    parser.add_argument("--pwm-period", type=float, default=DEFAULT_PWM_PERIOD,
+                        help="SSR PWM window the roasts ran with (s), to turn on-times into heater time")
+    args = parser.parse_args()
+
+    index = RoastLogIndex(args.log_dir, pwm_period=args.pwm_period)
+    parsed, removed = index.refresh()
+    console.flush()  # warnings about skipped logs come before the report
+    since = datetime.strptime(args.since, "%Y-%m-%d") if args.since else None
+    roasts = index.roasts(args.profile, since)
+    print(f"[INFO] {len(roasts)} roasts ({parsed} parsed, {removed} removed from index)")
+
+    for m in roasts:
+        stages = ", ".join(f"{name} {format_elapsed_time(d)[:5]}" for name, d in m["stages"].items())
+        rms = f"{m['rms_error_C']:.2f}°C" if m["rms_error_C"] is not None else "-"
+        peak = f"{m['peak_ror']:.1f}°C/min" if m["peak_ror"] is not None else "-"
+        energy = f" | {m['ssr_on_s'] * args.heater_power / 3.6e6:.3f}kWh" if args.heater_power else ""
+        print(f"{m['file']} | {m['profile'] or '-'} | roast {format_elapsed_time(m['roast_s'])[:5]} | "
+              f"RMS {rms} | peak RoR {peak} | SSR {m['ssr_on_s']:.0f}s{energy} | {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+class Console:
+    """
+    Non-blocking diagnostic output.
+
+    post() only enqueues; a background thread writes messages out, so a slow
+    terminal never stalls the caller. When the queue is full new messages are
+    dropped and counted. A dashboard can take over output by setting sink.
+    """
+    def __init__(self, stream=None, max_pending=1000):
+        self.stream = stream
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.sink = None
+        self._reset()
+
+    def _reset(self):
+        self.messages = queue.Queue(maxsize=self.max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def after_fork(self):
+        """A forked child (e.g. a process pool worker) has no writer thread; start over with an empty queue"""
+        self._reset()
+
+    def post(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="console")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _write(self, message):
+        sink = self.sink
+        if sink:
+            sink(message)
+            return
+        stream = self.stream or sys.stdout
+        # Leading carriage return keeps lines aligned while the keyboard thread has the tty in raw mode
+        stream.write("".join(f"\r{line}\n" for line in str(message).split("\n")))
+        stream.flush()
+
+    def _run(self):
+        while True:
+            message = self.messages.get()
+            try:
+                self._write(message)
+            except Exception:
+                pass
+            finally:
+                self.messages.task_done()
+
+    def flush(self, timeout=2.0):
+        """Wait (bounded) until queued messages have been written"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        while self.messages.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+console = Console()
+# Messages still queued when the interpreter exits (e.g. a startup error) are written out first
+atexit.register(console.flush)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=console.after_fork)
+
+def post(message):
+    """Queue a diagnostic message for output without blocking"""
+    console.post(message)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import threading
+import time
+from collections import deque
+from utils.console import console
+from utils.helpers import format_elapsed_time
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def format_status(status):
+    """One-line status in the classic console layout"""
+    mmss = format_elapsed_time(status["elapsed"])
+    stage_mmss = format_elapsed_time(status["stage_elapsed"])
+    line = (f"Elapsed: {mmss} | Stage: {status['stage']} ({stage_mmss}) | Temp: {status['temp']:.2f}°C | "
+            f"Target: {status['target']:.2f}°C | SSR ON: {status['on_time']:.2f}s")
+    if status.get("ror") is not None:
+        line += f" | RoR: {status['ror']:.1f}/{status.get('target_ror') or 0.0:.1f}°C/min"
+    elif status.get("target_ror") is not None:
+        line += f" | Target RoR: {status['target_ror']:.1f}°C/min"
+    return line
+
+
+def sparkline(values, low, high):
+    """Render values as block characters scaled between low and high"""
+    span = (high - low) or 1.0
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(max(int((v - low) / span * top + 0.5), 0), top)] for v in values)
+
+
+class LineDashboard:
+    """Prints the latest status snapshot at a fixed frame rate, off the control thread"""
+    def __init__(self, source, fps=2.0):
+        """
+        Args:
+            source (callable): Returns the latest status dict (or None)
+            fps (float): Maximum status lines per second
+        """
+        self.source = source
+        self.period = 1.0 / fps
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dashboard")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        last = None
+        while not self._stop_event.wait(self.period):
+            status = self.source()
+            if status is not None and status is not last:
+                console.post(format_status(status))
+                last = status
+
+    def stop(self):
+        self._stop_event.set()
+        # A key handled on the dashboard thread (q, Ctrl+C) can stop the dashboard from inside it
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+
+class CursesDashboard:
+    """
+    Full-screen terminal UI redrawn at a fixed frame rate.
+
+    Shows the latest status, a sparkline of temperature against target, and the
+    most recent diagnostic messages (taken over from the console). Keys are
+    forwarded to on_key, since curses owns the terminal while it runs.
+    """
+    def __init__(self, source, fps=5.0, on_key=None, history=600):
+        self.source = source
+        self.period = 1.0 / fps
+        self.on_key = on_key
+        self.temps = deque(maxlen=history)
+        self.targets = deque(maxlen=history)
+        self.messages = deque(maxlen=200)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+    def start(self):
+        console.sink = self.add_message
+        self._thread = threading.Thread(target=self._run, name="dashboard")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        import curses
+        try:
+            curses.wrapper(self._main)
+        finally:
+            console.sink = None
+            # Whatever scrolled by in the message pane is printed once curses is gone
+            for message in self.messages:
+                console.post(message)
+
+    def _main(self, screen):
+        import curses
+        curses.curs_set(0)
+        screen.nodelay(True)
+        last = None
+        while not self._stop_event.is_set():
+            frame_start = time.monotonic()
+            status = self.source()
+            if status is not None and status is not last:
+                self.temps.append(status["temp"])
+                self.targets.append(status["target"])
+                last = status
+            self._draw(screen, status)
+
+            key = screen.getch()
+            while key != -1:
+                if self.on_key and 0 <= key < 256:
+                    self.on_key("\r" if key in (10, 13) else chr(key))
+                key = screen.getch()
+            self._stop_event.wait(max(0.0, self.period - (time.monotonic() - frame_start)))
+
+    def _draw(self, screen, status):
+        import curses
+        screen.erase()
+        height, width = screen.getmaxyx()
+
+        def put(row, text, attr=0):
+            if 0 <= row < height:
+                try:
+                    screen.addnstr(row, 0, text, width - 1, attr)
+                except curses.error:
+                    pass
+
+        put(0, "AetherRoast  |  1-9=Fan%  0=100%  +/-=Temp±5°C  ENTER=Next Stage/Drop  r=Reset  q=Quit", curses.A_BOLD)
+        if status is None:
+            put(2, "Waiting for first control step...")
+        else:
+            put(2, f"Stage: {status['stage']:<18} Elapsed: {format_elapsed_time(status['elapsed'])}   "
+                   f"In stage: {format_elapsed_time(status['stage_elapsed'])}")
+            ror = f"{status['ror']:.1f}" if status.get("ror") is not None else "-"
+            target_ror = f"{status['target_ror']:.1f}" if status.get("target_ror") is not None else "-"
+            put(3, f"Temp: {status['temp']:7.2f}°C   Target: {status['target']:7.2f}°C   "
+                   f"RoR: {ror}/{target_ror}°C/min")
+            fan = f"{status['fan']}%" if status.get("fan") is not None else "-"
+            put(4, f"SSR ON: {status['on_time']:.2f}s   Fan: {fan}   Offset: {status.get('offset', 0.0):+.1f}°C")
+
+            span = max(width - 10, 10)
+            temps = list(self.temps)[-span:]
+            targets = list(self.targets)[-span:]
+            if temps:
+                low = min(min(temps), min(targets))
+                high = max(max(temps), max(targets))
+                put(6, f"Temp   {sparkline(temps, low, high)}")
+                put(7, f"Target {sparkline(targets, low, high)}")
+                put(8, f"       {low:.0f}°C .. {high:.0f}°C")
+
+        rows = max(height - 11, 0)
+        for i, message in enumerate(list(self.messages)[-rows:] if rows else []):
+            put(10 + i, message)
+        screen.refresh()
+
+    def stop(self):
+        self._stop_event.set()
+        # A key handled on the dashboard thread (q, Ctrl+C) can stop the dashboard from inside it
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
@@ -1,38 +1,53 @@
 #!/usr/bin/env python3
-import time
-
-# Global variables for stage tracking
-_current_stage_index = 0
-_stage_start_time = None
-_stages = ["Drying", "Maillard", "First Crack", "First Crack End", "Second Crack", "Second Crack End"]
-
-def get_roast_stage():
-    """Get current roast stage (user-controlled)"""
-    return _stages[_current_stage_index]
-
-def get_stage_duration(current_time):
-    """Get how long current stage has been running"""
-    if _stage_start_time is None:
-        return 0
-    return current_time - _stage_start_time
-
-def advance_roast_stage(current_time):
-    """Advance to next roast stage"""
-    global _current_stage_index, _stage_start_time
-    if _current_stage_index < len(_stages) - 1:
-        _current_stage_index += 1
-        _stage_start_time = current_time
-    return _stages[_current_stage_index]
-
-def reset_roast_stage(current_time):
-    """Reset stage tracking for new roast"""
-    global _current_stage_index, _stage_start_time
-    _current_stage_index = 0
-    _stage_start_time = current_time
+
+ROAST_STAGES = ("Drying", "Maillard", "First Crack", "First Crack End", "Second Crack", "Second Crack End")
+
+class StageTracker:
+    """User-controlled roast stage for one roaster"""
+    def __init__(self, stages=ROAST_STAGES):
+        self.stages = stages
+        self.index = 0
+        self.stage_start_time = None
+
+    def current(self):
+        """Get current roast stage"""
+        return self.stages[self.index]
+
+    def duration(self, current_time):
+        """Get how long current stage has been running"""
+        if self.stage_start_time is None:
+            return 0
+        return current_time - self.stage_start_time
+
+    def advance(self, current_time):
+        """Advance to next roast stage"""
+        if self.index < len(self.stages) - 1:
+            self.index += 1
+            self.stage_start_time = current_time
+        return self.stages[self.index]
+
+    def advance_to(self, stage, current_time):
+        """Jump forward to a named stage (e.g. one detected automatically); earlier stages are ignored"""
+        index = self.stages.index(stage)
+        if index > self.index:
+            self.index = index
+            self.stage_start_time = current_time
+        return self.stages[self.index]
+
+    def reset(self, current_time):
+        """Reset stage tracking for new roast"""
+        self.index = 0
+        self.stage_start_time = current_time
+
 
 def format_elapsed_time(elapsed_seconds):
     """Format elapsed time as MM:SS.mmm"""
     minutes = int(elapsed_seconds // 60)
     seconds = int(elapsed_seconds % 60)
     milliseconds = int((elapsed_seconds % 1) * 1000)
-    return f"{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
\ No newline at end of file
+    return f"{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def parse_elapsed_time(text):
+    """Parse MM:SS.mmm back to seconds"""
+    minutes, seconds = text.split(":")
+    return int(minutes) * 60 + float(seconds)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from utils.console import post
+
+# Bucket upper bounds in nanoseconds (10 µs .. 5 s, then +Inf)
+DEFAULT_BUCKETS_NS = tuple(int(v * 1000) for v in (
+    10, 20, 50, 100, 200, 500,
+    1_000, 2_000, 5_000, 10_000, 20_000, 50_000,
+    100_000, 200_000, 500_000, 1_000_000, 2_000_000, 5_000_000,
+))
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording is a bisect and two adds"""
+    def __init__(self, bounds_ns=DEFAULT_BUCKETS_NS):
+        self.bounds_ns = bounds_ns
+        self.counts = array('Q', [0]) * (len(bounds_ns) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, ns):
+        if ns < 0:
+            ns = 0
+        self.counts[bisect_left(self.bounds_ns, ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+
+    def percentile(self, pct):
+        """Upper bound (ns) of the bucket containing the given percentile, capped at the observed max"""
+        if not self.count:
+            return 0
+        rank = self.count * pct / 100.0
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(self.bounds_ns[i], self.max_ns) if i < len(self.bounds_ns) else self.max_ns
+        return self.max_ns
+
+    def mean_ns(self):
+        return self.total_ns / self.count if self.count else 0.0
+
+
+class LoopProfiler:
+    """
+    Per-phase latency and loop-period jitter for the control loop.
+
+    Call start_step() at the top of a step and lap(name) after each phase; each
+    lap records the time since the previous mark. record() takes latencies
+    measured elsewhere (e.g. fan commands from the keyboard thread). Steps
+    longer than overrun_s are counted and the most recent are kept.
+    """
+    def __init__(self, period_s, overrun_s=None, keep_overruns=20):
+        self.period_s = period_s
+        self.overrun_ns = int((overrun_s or period_s) * 1e9)
+        self.phases = {}
+        self.step = LatencyHistogram()
+        self.loop_period = LatencyHistogram()
+        self.jitter = LatencyHistogram()
+        self.steps = 0
+        self.overruns = 0
+        self.recent_overruns = deque(maxlen=keep_overruns)
+        self.extra_metrics = {}
+        self._step_start = None
+        self._mark = None
+        self._laps = []
+        self._last_period_start = None
+
+    def _histogram(self, name):
+        histogram = self.phases.get(name)
+        if histogram is None:
+            histogram = self.phases[name] = LatencyHistogram()
+        return histogram
+
+    def start_step(self, loop_time=None):
+        """Begin a step; loop_time is the controller clock (s) used for period jitter"""
+        self._finish_step()
+        now = time.perf_counter_ns()
+        self._step_start = self._mark = now
+        self._laps = []
+        loop_time = now / 1e9 if loop_time is None else loop_time
+        if self._last_period_start is not None:
+            period_ns = int((loop_time - self._last_period_start) * 1e9)
+            self.loop_period.record(period_ns)
+            self.jitter.record(abs(period_ns - int(self.period_s * 1e9)))
+        self._last_period_start = loop_time
+
+    def lap(self, name):
+        now = time.perf_counter_ns()
+        elapsed = now - self._mark
+        self._histogram(name).record(elapsed)
+        self._laps.append((name, elapsed))
+        self._mark = now
+
+    def end_step(self):
+        self._finish_step()
+
+    def _finish_step(self):
+        if self._step_start is None:
+            return
+        total = self._mark - self._step_start
+        self.step.record(total)
+        self.steps += 1
+        if total > self.overrun_ns:
+            self.overruns += 1
+            self.recent_overruns.append((time.time(), total, tuple(self._laps)))
+        self._step_start = None
+
+    def record(self, name, ns):
+        self._histogram(name).record(ns)
+
+    def report(self):
+        """Human-readable summary"""
+        lines = [f"[PERF] {self.steps} steps, {self.overruns} over {self.overrun_ns / 1e6:.0f}ms"]
+        rows = [("step", self.step), ("loop_period", self.loop_period), ("jitter", self.jitter)]
+        # Snapshot first: the control loop may add a phase while this runs on another thread
+        rows += sorted(list(self.phases.items()))
+        for name, h in rows:
+            if not h.count:
+                continue
+            lines.append(f"[PERF]   {name:<12} n={h.count:<6} mean={h.mean_ns() / 1e6:8.3f}ms "
+                         f"p50<={h.percentile(50) / 1e6:8.3f}ms p99<={h.percentile(99) / 1e6:8.3f}ms "
+                         f"max={h.max_ns / 1e6:8.3f}ms")
+        for _, total, laps in list(self.recent_overruns)[-3:]:
+            detail = ", ".join(f"{name} {ns / 1e6:.1f}ms" for name, ns in laps)
+            lines.append(f"[PERF]   overrun {total / 1e6:.1f}ms: {detail}")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Metrics in Prometheus text exposition format"""
+        lines = []
+
+        def histogram(metric, h, labels=""):
+            cumulative = 0
+            for bound, count in zip(h.bounds_ns, h.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels}le="{bound / 1e9:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels}le="+Inf"}} {h.count}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {h.total_ns / 1e9:.9f}")
+            lines.append(f"{metric}_count{suffix} {h.count}")
+
+        lines.append("# TYPE aetherroast_phase_seconds histogram")
+        for name, h in sorted(list(self.phases.items())):
+            histogram("aetherroast_phase_seconds", h, f'phase="{name}",')
+        for metric, h in (("aetherroast_step_seconds", self.step),
+                          ("aetherroast_loop_period_seconds", self.loop_period),
+                          ("aetherroast_loop_jitter_seconds", self.jitter)):
+            lines.append(f"# TYPE {metric} histogram")
+            histogram(metric, h)
+        lines.append("# TYPE aetherroast_overruns_total counter")
+        lines.append(f"aetherroast_overruns_total {self.overruns}")
+        for name, value in self.extra_metrics.items():
+            lines.append(f"aetherroast_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Publishes profiler metrics to a Prometheus textfile and/or a localhost HTTP endpoint"""
+    def __init__(self, profiler, path=None, port=None, interval=5.0, collect=None):
+        self.profiler = profiler
+        self.path = path
+        self.port = port
+        self.interval = interval
+        self.collect = collect
+        self.server = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _render(self):
+        if self.collect:
+            self.collect()
+        return self.profiler.prometheus()
+
+    def write_file(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self._render())
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.write_file()
+            except OSError as e:
+                post(f"[WARN] Metrics export failed: {e}")
+
+    def start(self):
+        if self.path:
+            self._thread = threading.Thread(target=self._run, name="metrics-export")
+            self._thread.daemon = True
+            self._thread.start()
+        if self.port:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = exporter._render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.path:
+            try:
+                self.write_file()
+            except OSError:
+                pass
@@ -1,44 +1,287 @@
 #!/usr/bin/env python3
 import csv
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
 import time
+from utils.helpers import format_elapsed_time, parse_elapsed_time
+from utils.console import post
+
+CSV_HEADER = [
+    "elapsed_mmss_mmm",
+    "stage",
+    "stage_duration_mmss_mmm",
+    "target_temp_C",
+    "actual_temp_C",
+    "pid_on_time_s",
+    "fan_pct"
+]
+
+# Binary log layout (little endian):
+#   header  : magic, version, record size, profile name, stage name table (fixed size)
+#   records : elapsed, stage_duration, target, actual, on_time (f64), stage index (u8),
+#             fan % + 1 (u8, 0 = not recorded, as in logs written before fan logging)
+BINARY_MAGIC = b"AROASTLG"
+BINARY_VERSION = 1
+BINARY_EXTENSION = ".rlog"
+HEADER_FORMAT = "<8sHH64s"
+STAGE_SLOT_FORMAT = "<24s"
+MAX_STAGES = 32
+RECORD_FORMAT = "<dddddBB6x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT) + MAX_STAGES * struct.calcsize(STAGE_SLOT_FORMAT)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+DEFAULT_STAGES = ["Preheating", "Drying", "Maillard", "First Crack", "First Crack End", "Second Crack", "Second Crack End"]
+
+
+class BinaryLogWriter:
+    """Append-only fixed-width record file, readable with mmap while being written"""
+    def __init__(self, fh, profile_name=None):
+        self.fh = fh
+        self.stages = list(DEFAULT_STAGES)
+        self.stage_index = {name: i for i, name in enumerate(self.stages)}
+        self.record = struct.Struct(RECORD_FORMAT)
+        name = (profile_name or "").encode("utf-8")[:64]
+        self.fh.write(struct.pack(HEADER_FORMAT, BINARY_MAGIC, BINARY_VERSION, RECORD_SIZE, name))
+        self.stage_table_offset = self.fh.tell()
+        for slot in range(MAX_STAGES):
+            self.fh.write(struct.pack(STAGE_SLOT_FORMAT, self._stage_bytes(slot)))
+
+    def _stage_bytes(self, slot):
+        return self.stages[slot].encode("utf-8")[:24] if slot < len(self.stages) else b""
+
+    def _stage_id(self, stage):
+        if stage in self.stage_index:
+            return self.stage_index[stage]
+        if len(self.stages) >= MAX_STAGES:
+            raise ValueError(f"Binary log stage table full, cannot add '{stage}'")
+        # The header is fixed size, so a new stage name is patched into its slot in place
+        slot = len(self.stages)
+        self.stages.append(stage)
+        self.stage_index[stage] = slot
+        end = self.fh.tell()
+        self.fh.seek(self.stage_table_offset + slot * struct.calcsize(STAGE_SLOT_FORMAT))
+        self.fh.write(struct.pack(STAGE_SLOT_FORMAT, self._stage_bytes(slot)))
+        self.fh.seek(end)
+        return slot
+
+    def write_rows(self, rows):
+        data = bytearray()
+        for row in rows:
+            elapsed, stage, stage_duration, target_temp, actual_temp, on_time = row[:6]
+            fan = row[6] if len(row) > 6 and row[6] is not None else -1
+            data += self.record.pack(elapsed, stage_duration, target_temp, actual_temp, on_time, self._stage_id(stage),
+                                     round(fan) + 1)
+        self.fh.write(data)
+
+
+class CSVLogWriter:
+    def __init__(self, fh, profile_name=None):
+        self.fh = fh
+        self.csv_writer = csv.writer(fh)
+
+        # Add profile name as comment if available
+        if profile_name:
+            self.fh.write(f"# Profile: {profile_name}\n")
+        self.csv_writer.writerow(CSV_HEADER)
+
+    def write_rows(self, rows):
+        self.csv_writer.writerows(format_csv_row(*row) for row in rows)
+
+
+def format_csv_row(elapsed, stage, stage_duration, target_temp, actual_temp, on_time, fan=None):
+    """Format one raw record in the CSV log layout"""
+    return [
+        format_elapsed_time(elapsed), stage, format_elapsed_time(stage_duration),
+        round(target_temp, 1), round(actual_temp, 2), round(on_time, 2), "" if fan is None else round(fan)
+    ]
+
 
 class RoastLogger:
-    def __init__(self, log_file="roast_log.csv", profile_name=None):
+    def __init__(self, log_file="roast_log.csv", profile_name=None, log_format=None,
+                 flush_interval=1.0, batch_size=64, fsync_interval=10.0):
         self.log_file = log_file
         self.profile_name = profile_name
+        self.log_format = log_format or ("binary" if log_file.endswith(BINARY_EXTENSION) else "csv")
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
         self.log_fh = None
-        self.csv_writer = None
+        self.writer = None
+        self.records = queue.SimpleQueue()
+        self.rows_written = 0
+        self.last_error = None
+        self._thread = None
         self.init_log()
-    
+
     def init_log(self):
-        """Initialize CSV log file with headers"""
-        self.log_fh = open(self.log_file, "w", newline="")
-        self.csv_writer = csv.writer(self.log_fh)
-        
-        # Add profile name as comment if available
-        if self.profile_name:
-            self.log_fh.write(f"# Profile: {self.profile_name}\n")
-        
-        self.csv_writer.writerow([
-            "elapsed_mmss_mmm",
-            "stage",
-            "stage_duration_mmss_mmm",
-            "target_temp_C",
-            "actual_temp_C",
-            "pid_on_time_s"
-        ])
-    
-    def log_step(self, elapsed, stage, stage_duration, target_temp, actual_temp, on_time):
-        """Log a single roasting step"""
-        from utils.helpers import format_elapsed_time
-        mmss_mmm = format_elapsed_time(elapsed)
-        stage_mmss_mmm = format_elapsed_time(stage_duration)
-        self.csv_writer.writerow([
-            mmss_mmm, stage, stage_mmss_mmm, round(target_temp, 1), round(actual_temp, 2), round(on_time, 2)
-        ])
+        """Initialize log file with headers and start the writer thread"""
+        if self.log_format == "binary":
+            self.log_fh = open(self.log_file, "wb")
+            self.writer = BinaryLogWriter(self.log_fh, self.profile_name)
+        else:
+            self.log_fh = open(self.log_file, "w", newline="")
+            self.writer = CSVLogWriter(self.log_fh, self.profile_name)
         self.log_fh.flush()
-    
+
+        self._thread = threading.Thread(target=self._write_loop, name="roast-logger")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def log_step(self, elapsed, stage, stage_duration, target_temp, actual_temp, on_time, fan=None):
+        """Queue a single roasting step; formatting and disk I/O happen on the writer thread"""
+        self.records.put((elapsed, stage, stage_duration, target_temp, actual_temp, on_time, fan))
+
+    def _write_loop(self):
+        last_fsync = time.monotonic()
+        running = True
+        while running:
+            # Block for the first record, then gather whatever arrives within the flush budget
+            batch = []
+            record = self.records.get()
+            deadline = time.monotonic() + self.flush_interval
+            while record is not None:
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.records.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if record is None:
+                running = False
+
+            try:
+                if batch:
+                    self.writer.write_rows(batch)
+                    self.rows_written += len(batch)
+                self.log_fh.flush()
+                if not running or time.monotonic() - last_fsync >= self.fsync_interval:
+                    os.fsync(self.log_fh.fileno())
+                    last_fsync = time.monotonic()
+            except Exception as e:
+                self.last_error = e
+                post(f"[ERROR] Roast log write failed: {e}")
+
     def close(self):
-        """Close log file"""
+        """Flush queued records and close log file"""
+        if self._thread:
+            self.records.put(None)
+            self._thread.join()
+            self._thread = None
         if self.log_fh:
-            self.log_fh.close()
\ No newline at end of file
+            self.log_fh.close()
+            self.log_fh = None
+
+
+def _stream_binary_log(file_path):
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            raise ValueError(f"Not a binary roast log: {file_path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, record_size, name = struct.unpack_from(HEADER_FORMAT, mm, 0)
+            if magic != BINARY_MAGIC or version != BINARY_VERSION or record_size != RECORD_SIZE:
+                raise ValueError(f"Unsupported binary roast log: {file_path}")
+            offset = struct.calcsize(HEADER_FORMAT)
+            slot_size = struct.calcsize(STAGE_SLOT_FORMAT)
+            stages = [
+                struct.unpack_from(STAGE_SLOT_FORMAT, mm, offset + i * slot_size)[0].rstrip(b"\0").decode("utf-8")
+                for i in range(MAX_STAGES)
+            ]
+            yield name.rstrip(b"\0").decode("utf-8")
+            # Ignore a trailing partial record from a log that is still being written
+            end = HEADER_SIZE + (len(mm) - HEADER_SIZE) // RECORD_SIZE * RECORD_SIZE
+            record = struct.Struct(RECORD_FORMAT)
+            for position in range(HEADER_SIZE, end, RECORD_SIZE):
+                elapsed, stage_duration, target_temp, actual_temp, on_time, stage, fan = record.unpack_from(mm, position)
+                yield (elapsed, stages[stage], stage_duration, target_temp, actual_temp, on_time,
+                       fan - 1 if fan else None)
+
+
+def _stream_csv_log(file_path):
+    with open(file_path, newline="") as f:
+        profile_name = None
+        rows = csv.reader(f)
+        for row in rows:
+            if not row:
+                continue
+            if row[0].startswith("#"):
+                if row[0].startswith("# Profile:"):
+                    # Profile names may contain commas
+                    profile_name = ",".join(row)[len("# Profile:"):].strip()
+                continue
+            if row[0] == CSV_HEADER[0]:
+                break
+        yield profile_name
+        for row in rows:
+            if not row or row[0].startswith("#") or row[0] == CSV_HEADER[0]:
+                continue
+            # Logs written before fan logging have no fan column
+            # Whole percent; logs written before rounding can hold fractional speeds
+            fan = round(float(row[6])) if len(row) > 6 and row[6] else None
+            yield (
+                parse_elapsed_time(row[0]), row[1], parse_elapsed_time(row[2]),
+                float(row[3]), float(row[4]), float(row[5]), fan
+            )
+
+
+def stream_log(file_path):
+    """
+    Read a CSV or binary roast log one record at a time.
+
+    Returns:
+        tuple: (profile_name, iterator of (elapsed, stage, stage_duration, target_temp,
+               actual_temp, on_time, fan) tuples; fan is None where it was not logged)
+    """
+    stream = _stream_binary_log(file_path) if file_path.endswith(BINARY_EXTENSION) else _stream_csv_log(file_path)
+    return next(stream), stream
+
+
+def read_binary_log(file_path):
+    """
+    Read a binary roast log.
+
+    Returns:
+        tuple: (profile_name, records) where records are
+               (elapsed, stage, stage_duration, target_temp, actual_temp, on_time) tuples
+    """
+    profile_name, records = stream_log(file_path)
+    return profile_name, [record[:6] for record in records]
+
+
+def read_csv_log(file_path):
+    """
+    Read a CSV roast log back into raw records.
+
+    Returns:
+        tuple: (profile_name, records) in the same form as read_binary_log
+    """
+    profile_name, records = stream_log(file_path)
+    return profile_name, [record[:6] for record in records]
+
+
+def read_log(file_path):
+    """Read a CSV or binary roast log"""
+    if file_path.endswith(BINARY_EXTENSION):
+        return read_binary_log(file_path)
+    return read_csv_log(file_path)
+
+
+def convert_binary_log(binary_path, csv_path=None):
+    """Convert a binary roast log to the CSV layout; returns the CSV path"""
+    if csv_path is None:
+        csv_path = os.path.splitext(binary_path)[0] + ".csv"
+    profile_name, records = stream_log(binary_path)
+    with open(csv_path, "w", newline="") as f:
+        CSVLogWriter(f, profile_name).write_rows(records)
+    return csv_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 -m utils.logging <log.rlog> [output.csv]")
+        sys.exit(1)
+    output = convert_binary_log(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"[INFO] Wrote {output}")
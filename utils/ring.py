@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+from array import array
+
+class SampleRing:
+    """Fixed-size ring buffer of floats backed by a preallocated array"""
+    def __init__(self, size=1024, typecode='d'):
+        self.size = size
+        self.data = array(typecode, [0]) * size
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.index] = value
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def latest(self):
+        if not self.count:
+            return None
+        return self.data[self.index - 1]
+
+    def last(self, n=None):
+        """Return up to the n most recent values, oldest first"""
+        n = self.count if n is None else min(n, self.count)
+        start = (self.index - n) % self.size
+        if start + n <= self.size:
+            return self.data[start:start + n].tolist()
+        return self.data[start:].tolist() + self.data[:self.index].tolist()
+
+    def __len__(self):
+        return self.count
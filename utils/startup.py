@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import threading
+import time
+
+class StartupReport:
+    """Wall time of each hardware bring-up step, measured from when the controller started building"""
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.ready = None
+        self.steps = {}  # name -> (start offset, duration, error)
+
+    def run(self, name, build):
+        """Call build(), recording when it started and how long it took"""
+        started = self.clock()
+        error = None
+        try:
+            return build()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.steps[name] = (started - self.started, self.clock() - started, error)
+
+    def finish(self):
+        self.ready = self.clock() - self.started
+        return self.ready
+
+    def report(self):
+        lines = [f"[INFO] Ready in {self.ready * 1000:.0f}ms"]
+        for name, (offset, duration, error) in sorted(self.steps.items(), key=lambda item: item[1][0]):
+            status = f" FAILED: {error}" if error else ""
+            lines.append(f"[INFO]   {name:<14} +{offset * 1000:5.0f}ms  {duration * 1000:6.0f}ms{status}")
+        return "\n".join(lines)
+
+
+def bring_up(steps, report):
+    """
+    Build independent components concurrently, one thread per step.
+
+    steps maps a name to (build, release). Returns the built objects by name.
+    If any build fails, the components that did come up are released and the
+    first error is raised.
+    """
+    results = {}
+    errors = []
+
+    def run(name, build):
+        try:
+            results[name] = report.run(name, build)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(name, build), name=f"startup-{name}")
+               for name, (build, _) in steps.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        for name, component in results.items():
+            try:
+                steps[name][1](component)
+            except Exception:
+                pass
+        raise errors[0]
+    return results
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from array import array
+from utils.console import post
+
+# Per-record columns; the stage is stored as an index into TelemetryRing.stage_names
+FIELDS = ("t", "elapsed", "temp", "target", "on_time", "ror", "fan", "stage")
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+HISTORY_CHUNK = 200
+
+class TelemetryRing:
+    """
+    Fixed-size ring of telemetry records in one preallocated array (row-major, one row per record).
+
+    There is a single writer (the control loop). Readers never take a lock: each
+    record has a sequence number, and since() re-checks the write position after
+    copying so that rows overwritten in the meantime are discarded. The row the
+    writer fills next is never read, so the newest size - 1 records are available.
+    """
+    def __init__(self, size=4096):
+        self.size = size
+        self.width = len(FIELDS)
+        self.data = array('d', [math.nan]) * (size * self.width)
+        self.seq = 0
+        self.stage_names = []
+        self._stage_codes = {}
+
+    def append(self, t, elapsed, temp, target, on_time, ror, fan, stage):
+        code = self._stage_codes.get(stage)
+        if code is None:
+            code = self._stage_codes[stage] = len(self.stage_names)
+            self.stage_names.append(stage)
+        row = (self.seq % self.size) * self.width
+        data = self.data
+        data[row] = t
+        data[row + 1] = elapsed
+        data[row + 2] = temp
+        data[row + 3] = target
+        data[row + 4] = on_time
+        data[row + 5] = math.nan if ror is None else ror
+        data[row + 6] = math.nan if fan is None else fan
+        data[row + 7] = code
+        # Publish only after the row is complete
+        self.seq += 1
+
+    def append_status(self, status, t=None):
+        """Record a controller status snapshot"""
+        self.append(time.time() if t is None else t, status["elapsed"], status["temp"], status["target"],
+                    status["on_time"], status.get("ror"), status.get("fan"), status["stage"])
+
+    def since(self, seq, limit=None):
+        """Records with sequence number >= seq as dicts, oldest first, and the next sequence number"""
+        end = self.seq
+        start = max(seq, end - self.size + 1)
+        if limit is not None:
+            start = max(start, end - limit)
+        rows = []
+        for n in range(start, end):
+            row = (n % self.size) * self.width
+            rows.append((n, self.data[row:row + self.width]))
+        # Anything the writer lapped while we were copying is dropped, including the row it may be
+        # writing right now (append fills row seq % size before it bumps seq)
+        oldest_valid = self.seq - self.size + 1
+        records = [self._record(n, values) for n, values in rows if n >= oldest_valid]
+        return records, end
+
+    def _record(self, n, values):
+        record = {"seq": n}
+        for name, value in zip(FIELDS, values):
+            record[name] = None if math.isnan(value) else value
+        record["stage"] = self.stage_names[int(values[7])]
+        if record["fan"] is not None:
+            record["fan"] = int(record["fan"])
+        return record
+
+
+def ws_accept_key(key):
+    return base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest()).decode()
+
+
+def ws_frame(payload, opcode=0x1, mask=False):
+    """Encode one final WebSocket frame (clients must mask, servers must not)"""
+    n = len(payload)
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        header += bytes([mask_bit | n])
+    elif n < 65536:
+        header += bytes([mask_bit | 126]) + struct.pack(">H", n)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack(">Q", n)
+    if mask:
+        key = os.urandom(4)
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+        header += key
+    return header + payload
+
+
+def ws_parse(buffer):
+    """(opcode, payload, bytes consumed) for the first complete frame in buffer, or None"""
+    if len(buffer) < 2:
+        return None
+    opcode = buffer[0] & 0x0F
+    masked = buffer[1] & 0x80
+    n = buffer[1] & 0x7F
+    offset = 2
+    if n == 126:
+        if len(buffer) < 4:
+            return None
+        n = struct.unpack(">H", buffer[2:4])[0]
+        offset = 4
+    elif n == 127:
+        if len(buffer) < 10:
+            return None
+        n = struct.unpack(">Q", buffer[2:10])[0]
+        offset = 10
+    if masked:
+        key = buffer[offset:offset + 4]
+        offset += 4
+    if len(buffer) < offset + n:
+        return None
+    payload = bytes(buffer[offset:offset + n])
+    if masked:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return opcode, payload, offset + n
+
+
+class _Client:
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.upgraded = False
+        # First record not yet sent to this client (its history may run ahead of the last publish)
+        self.next_seq = 0
+
+
+class TelemetryServer:
+    """
+    Streams telemetry from a TelemetryRing to any number of subscribers.
+
+    WebSocket clients connect to ws://host:port/ and get the recent history, then
+    every new record as a JSON text message. With a multicast group set, each
+    record is also sent as a JSON datagram to the group; a datagram saying
+    "history" sent to the server's UDP port (same number as the TCP port) is
+    answered with the recent history. Everything runs on one selector thread,
+    and the control loop only writes to the ring. A client whose unsent data
+    grows past max_buffer is dropped rather than slowing anything down.
+    """
+    def __init__(self, ring, host="127.0.0.1", port=8765, multicast=None, history=600,
+                 interval=0.25, max_buffer=256 * 1024, multicast_ttl=1):
+        """
+        Args:
+            ring (TelemetryRing): Records written by the control loop
+            host (str): Address to listen on ("0.0.0.0" for the LAN)
+            port (int): WebSocket (TCP) and history request (UDP) port
+            multicast (tuple, optional): (group, port) to send each record to
+            history (int): Records sent to a new subscriber
+            interval (float): Seconds between checks for new records
+            max_buffer (int): Unsent bytes after which a slow client is dropped
+        """
+        self.ring = ring
+        self.host = host
+        self.port = port
+        self.multicast = multicast
+        self.history = history
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.multicast_ttl = multicast_ttl
+        self.clients = {}
+        self.clients_dropped = 0
+        self.records_sent = 0
+        self.next_seq = 0
+        self.selector = None
+        self.listener = None
+        self.udp = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen(16)
+        self.listener.setblocking(False)
+        self.port = self.listener.getsockname()[1]
+        self.selector.register(self.listener, selectors.EVENT_READ, "accept")
+        if self.multicast:
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.multicast_ttl)
+            if self.host not in ("", "0.0.0.0"):
+                # Send the group traffic out of the interface we listen on (e.g. loopback for local testing)
+                self.udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.host))
+            self.udp.bind((self.host, self.port))
+            self.udp.setblocking(False)
+            self.selector.register(self.udp, selectors.EVENT_READ, "udp")
+        self.next_seq = self.ring.seq
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry")
+        self._thread.daemon = True
+        self._thread.start()
+        post(f"[INFO] Telemetry on ws://{self.host}:{self.port}/"
+             + (f" and udp://{self.multicast[0]}:{self.multicast[1]}" if self.multicast else ""))
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            for key, events in self.selector.select(self.interval):
+                try:
+                    if key.data == "accept":
+                        self._accept()
+                    elif key.data == "udp":
+                        self._udp_request()
+                    elif events & selectors.EVENT_READ:
+                        self._read(key.data)
+                    if isinstance(key.data, _Client) and events & selectors.EVENT_WRITE:
+                        self._flush(key.data)
+                except OSError:
+                    if isinstance(key.data, _Client):
+                        self._drop(key.data)
+            self._publish()
+
+    def _accept(self):
+        sock, address = self.listener.accept()
+        sock.setblocking(False)
+        client = _Client(sock, address)
+        self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def _read(self, client):
+        data = client.sock.recv(4096)
+        if not data:
+            self._drop(client)
+            return
+        client.inbuf += data
+        if not client.upgraded:
+            self._handshake(client)
+            return
+        while True:
+            frame = ws_parse(client.inbuf)
+            if frame is None:
+                break
+            opcode, payload, consumed = frame
+            del client.inbuf[:consumed]
+            if opcode == 0x8:  # close
+                self._drop(client)
+                return
+            if opcode == 0x9:  # ping
+                self._send(client, ws_frame(payload, 0xA))
+
+    def _handshake(self, client):
+        end = client.inbuf.find(b"\r\n\r\n")
+        if end < 0:
+            if len(client.inbuf) > 8192:
+                self._drop(client)
+            return
+        headers = {}
+        for line in bytes(client.inbuf[:end]).decode("latin-1").split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        del client.inbuf[:end + 4]
+        key = headers.get("sec-websocket-key")
+        if not key:
+            client.sock.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            self._drop(client)
+            return
+        self._send(client, ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                            f"Sec-WebSocket-Accept: {ws_accept_key(key)}\r\n\r\n").encode())
+        client.upgraded = True
+        records, client.next_seq = self.ring.since(0, limit=self.history)
+        self._send(client, ws_frame(json.dumps({"type": "history", "records": records}).encode()))
+
+    def _udp_request(self):
+        data, address = self.udp.recvfrom(512)
+        if data.strip() != b"history":
+            return
+        records, _ = self.ring.since(0, limit=self.history)
+        for i in range(0, len(records), HISTORY_CHUNK):
+            chunk = {"type": "history", "records": records[i:i + HISTORY_CHUNK]}
+            try:
+                self.udp.sendto(json.dumps(chunk).encode(), address)
+            except BlockingIOError:
+                break
+
+    def _send(self, client, data):
+        """Queue data for a client; never blocks, drops the client if it has fallen too far behind"""
+        if client.sock not in self.clients:
+            return
+        if not client.outbuf:
+            try:
+                sent = client.sock.send(data)
+            except BlockingIOError:
+                sent = 0
+            data = data[sent:]
+            if not data:
+                return
+        client.outbuf += data
+        if len(client.outbuf) > self.max_buffer:
+            self.clients_dropped += 1
+            post(f"[WARN] Telemetry client {client.address[0]}:{client.address[1]} too slow; dropped")
+            self._drop(client)
+            return
+        self.selector.modify(client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client)
+
+    def _flush(self, client):
+        if client.sock not in self.clients:
+            return
+        try:
+            sent = client.sock.send(client.outbuf)
+        except BlockingIOError:
+            return
+        del client.outbuf[:sent]
+        if not client.outbuf:
+            self.selector.modify(client.sock, selectors.EVENT_READ, client)
+
+    def _drop(self, client):
+        if self.clients.pop(client.sock, None) is None:
+            return
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def _publish(self):
+        if self.ring.seq == self.next_seq:
+            return
+        records, self.next_seq = self.ring.since(self.next_seq)
+        if not records:
+            return
+        messages = [json.dumps(record).encode() for record in records]
+        frames = [ws_frame(message) for message in messages]
+        for client in list(self.clients.values()):
+            if not client.upgraded or client.next_seq >= self.next_seq:
+                continue
+            # Skip records this client already got in its history
+            skip = max(0, client.next_seq - records[0]["seq"])
+            client.next_seq = self.next_seq
+            self._send(client, b"".join(frames[skip:]))
+        if self.udp:
+            for message in messages:
+                try:
+                    self.udp.sendto(message, self.multicast)
+                except OSError:
+                    break
+        self.records_sent += len(records)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
+        for client in list(self.clients.values()):
+            self._drop(client)
+        for sock in (self.listener, self.udp):
+            if sock:
+                sock.close()
+        if self.selector:
+            self.selector.close()
+
+
+def subscribe(host="127.0.0.1", port=8765, timeout=5.0):
+    """Minimal WebSocket client: yields decoded messages from a TelemetryServer"""
+    sock = socket.create_connection((host, port), timeout=timeout)
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    buffer = bytearray()
+    while b"\r\n\r\n" not in buffer:
+        data = sock.recv(4096)
+        if not data:
+            raise ConnectionError("Telemetry server closed the connection during the handshake")
+        buffer += data
+    end = buffer.find(b"\r\n\r\n")
+    if ws_accept_key(key) not in buffer[:end].decode("latin-1"):
+        raise ConnectionError("Telemetry server did not accept the WebSocket handshake")
+    del buffer[:end + 4]
+    try:
+        while True:
+            frame = ws_parse(buffer)
+            if frame is None:
+                data = sock.recv(65536)
+                if not data:
+                    return
+                buffer += data
+                continue
+            opcode, payload, consumed = frame
+            del buffer[:consumed]
+            if opcode == 0x8:
+                return
+            if opcode == 0x1:
+                yield json.loads(payload)
+    finally:
+        sock.close()
+
+
+def listen_multicast(group, port, server=None, interface="0.0.0.0"):
+    """Yields records from a multicast group joined on interface; with server=(host, port) asks it for history first"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("", port))
+    membership = socket.inet_aton(group) + socket.inet_aton(interface)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    try:
+        if server:
+            sock.sendto(b"history", server)
+        while True:
+            yield json.loads(sock.recv(65536))
+    finally:
+        sock.close()
+
+
+def parse_address(text, default_port):
+    host, _, port = text.rpartition(":")
+    return (host, int(port)) if host else (text, default_port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print live roast telemetry")
+    parser.add_argument("server", nargs="?", default="127.0.0.1:8765", help="Telemetry server HOST:PORT")
+    parser.add_argument("--multicast", default=None, help="Listen on multicast GROUP:PORT instead of WebSocket")
+    parser.add_argument("--interface", default="0.0.0.0", help="Local address of the interface to join the group on")
+    args = parser.parse_args()
+
+    host, port = parse_address(args.server, 8765)
+    if args.multicast:
+        messages = listen_multicast(*parse_address(args.multicast, 8766), server=(host, port),
+                                    interface=args.interface)
+    else:
+        messages = subscribe(host, port)
+    try:
+        for message in messages:
+            records = message["records"] if message.get("type") == "history" else [message]
+            for r in records:
+                ror = f"{r['ror']:.1f}" if r["ror"] is not None else "-"
+                print(f"#{r['seq']:<6} {r['elapsed']:7.1f}s {r['stage']:<16} {r['temp']:6.1f}°C "
+                      f"→ {r['target']:6.1f}°C  RoR {ror:>5}  SSR {r['on_time']:.2f}s  fan {r['fan']}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import time
+
+class SystemClock:
+    """Wall-clock time source; swapped for a virtual clock in simulation"""
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class PeriodicTimer:
+    """Fixed-rate loop pacing on monotonic deadlines"""
+    def __init__(self, period, clock=time.monotonic, sleep=time.sleep):
+        self.period = period
+        self.clock = clock
+        self.sleep = sleep
+        self.next_deadline = None
+        self.missed_cycles = 0
+        self.last_error = 0.0
+
+    def reset(self):
+        """Restart the schedule from the current time"""
+        self.next_deadline = self.clock() + self.period
+
+    def wait(self):
+        """Sleep until the next deadline; returns the lateness of the wakeup in seconds"""
+        if self.next_deadline is None:
+            self.reset()
+
+        remaining = self.next_deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+        return self._advance()
+
+    def _advance(self):
+        now = self.clock()
+        self.last_error = now - self.next_deadline
+
+        # Deadlines are absolute, so short overruns are absorbed by the next cycle.
+        # If we fell behind by whole periods, skip them instead of bursting to catch up.
+        if self.last_error >= self.period:
+            skipped = int(self.last_error // self.period)
+            self.missed_cycles += skipped
+            self.next_deadline += skipped * self.period
+        self.next_deadline += self.period
+        return self.last_error
+
+
+class AsyncPeriodicTimer(PeriodicTimer):
+    """PeriodicTimer for asyncio tasks: waits with asyncio.sleep so the event loop keeps running"""
+    def __init__(self, period, clock=time.monotonic):
+        import asyncio  # imported here so the threaded runtime never loads asyncio
+        super().__init__(period, clock)
+        self._sleep = asyncio.sleep
+
+    async def wait(self):
+        if self.next_deadline is None:
+            self.reset()
+
+        remaining = self.next_deadline - self.clock()
+        if remaining > 0:
+            await self._sleep(remaining)
+        return self._advance()